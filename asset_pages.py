@@ -0,0 +1,174 @@
+import os
+import json
+import glob
+import argparse
+import datetime
+import metrics
+import json_io
+
+# --- CONFIGURATION ---
+# Every per-language lesson file (e.g. assets/course_videos/fr.json) gets a
+# sibling folder of fixed-size pages plus a small manifest:
+#
+#   assets/course_videos/fr/manifest.json
+#   assets/course_videos/fr/page-0001.json
+#   assets/course_videos/fr/page-0002.json ...
+#
+# The app decodes the manifest and the first page only, so first-screen
+# load and memory stay flat no matter how large a library grows.
+#
+# pubspec.yaml bundles the page folders of BUNDLED_DIRECTORIES instead of
+# the folders themselves (Flutter only bundles files directly inside a
+# listed folder), so the app ships pages and not the monolithic files.
+# `--pubspec` rewrites that list after paging. course_videos stays
+# monolithic: CourseService filters the whole file.
+PAGE_SIZE = 50
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+ASSET_DIRECTORIES = [
+    "assets/guided_courses",
+    "assets/native_videos",
+    "assets/course_videos",
+    "assets/storybooks_lessons",
+    "assets/audio_library",
+    "assets/youtube_audio_library",
+    "assets/text_lessons",
+    "assets/beginner_books",
+]
+
+# Read through HybridLessonService._loadFirstPage and bundled as pages only
+BUNDLED_DIRECTORIES = [
+    "assets/guided_courses",
+    "assets/native_videos",
+    "assets/storybooks_lessons",
+]
+
+PUBSPEC_PATH = "pubspec.yaml"
+PUBSPEC_BEGIN = "# BEGIN lesson pages"
+PUBSPEC_END = "# END lesson pages"
+
+# Values the app already assumes when a field is missing (see
+# HybridLessonService._mapJsonToLesson / LessonModel.fromMap)
+DEFAULT_FIELDS = {
+    "isFavorite": False,
+    "progress": 0,
+}
+
+def canonical_lesson(lesson):
+    """Drops null, empty-list/dict and default-valued fields; keys are sorted on write."""
+    return {
+        key: value for key, value in lesson.items()
+        if value is not None
+        and not (isinstance(value, (list, dict)) and not value)
+        and not (key in DEFAULT_FIELDS and value == DEFAULT_FIELDS[key] and type(value) is type(DEFAULT_FIELDS[key]))
+    }
+
+def pages_dir_for(filepath):
+    """assets/course_videos/fr.json -> assets/course_videos/fr"""
+    return os.path.splitext(filepath)[0]
+
+def page_name(number):
+    return f"page-{number:04d}.json"
+
+def write_json(path, data):
+    """Atomic minified write. Identical content is not rewritten, so mtimes (and change detection) stay put."""
+    encoded = json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    if os.path.exists(path) and os.path.getsize(path) == len(encoded):
+        with open(path, 'rb') as f:
+            if f.read() == encoded: return
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(encoded)
+    os.replace(tmp_path, path)
+    metrics.add_bytes("file_write", len(encoded))
+
+def write_lesson_pages(filepath, lessons, page_size=PAGE_SIZE, order="source"):
+    """
+    Writes `lessons` as pages next to `filepath` and returns the manifest.
+    `order` documents how lessons are sorted ("source" = same order as the
+    monolithic file, "newest-first" for generators that insert at the top).
+    Pages are written first and the manifest last, so readers never see a
+    manifest pointing at missing pages.
+    """
+    out_dir = pages_dir_for(filepath)
+    os.makedirs(out_dir, exist_ok=True)
+
+    pages = []
+    for start in range(0, len(lessons), page_size):
+        name = page_name(len(pages) + 1)
+        write_json(os.path.join(out_dir, name), lessons[start:start + page_size])
+        pages.append(name)
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "count": len(lessons),
+        "pageSize": page_size,
+        "pageCount": len(pages),
+        "pages": pages,
+        "order": order,
+        "updatedAt": datetime.datetime.now().isoformat(),
+    }
+    write_json(os.path.join(out_dir, MANIFEST_NAME), manifest)
+
+    # Drop pages left over from a larger previous build
+    for stale in glob.glob(os.path.join(out_dir, "page-*.json")):
+        if os.path.basename(stale) not in pages:
+            os.remove(stale)
+
+    return manifest
+
+def paginate_directory(directory, page_size=PAGE_SIZE):
+    """Pages every monolithic *.json lesson array in `directory`. Returns the paged dirs."""
+    paged = []
+    for filepath in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        try:
+            lessons = json_io.load(filepath)
+        except Exception as e:
+            print(f"   ⚠️ Could not read {filepath}: {e}")
+            continue
+        if not isinstance(lessons, list): continue
+
+        manifest = write_lesson_pages(filepath, lessons, page_size)
+        print(f"   📄 {os.path.basename(filepath)}: {manifest['count']} lessons -> {manifest['pageCount']} pages")
+        paged.append(pages_dir_for(filepath))
+    return paged
+
+def update_pubspec(path=PUBSPEC_PATH, directories=BUNDLED_DIRECTORIES):
+    """Rewrites the asset entries between the lesson-page markers in pubspec.yaml. Returns the folder count."""
+    folders = sorted(os.path.dirname(manifest).replace(os.sep, '/') + '/'
+                     for folder in directories
+                     for manifest in glob.glob(os.path.join(folder, "*", MANIFEST_NAME)))
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = f.read().split('\n')
+    begin = next(i for i, line in enumerate(lines) if line.strip() == PUBSPEC_BEGIN)
+    end = next(i for i, line in enumerate(lines) if line.strip() == PUBSPEC_END)
+    indent = lines[begin][:len(lines[begin]) - len(lines[begin].lstrip())]
+    lines[begin + 1:end] = [f"{indent} - {folder}" for folder in folders]
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines))
+    os.replace(tmp_path, path)
+    return len(folders)
+
+def main():
+    parser = argparse.ArgumentParser(description="Splits per-language lesson JSON files into paged bundles with a manifest.")
+    parser.add_argument("directories", nargs="*", default=ASSET_DIRECTORIES)
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--pubspec", action="store_true", help=f"Rewrite the bundled page folders in {PUBSPEC_PATH}")
+    args = parser.parse_args()
+
+    paged = []
+    for directory in args.directories:
+        if not os.path.isdir(directory): continue
+        print(f"\n📦 Paging: {directory}")
+        paged.extend(paginate_directory(directory, args.page_size))
+
+    print(f"\n✅ Wrote pages for {len(paged)} files.")
+
+    if args.pubspec:
+        count = update_pubspec()
+        print(f"📝 {PUBSPEC_PATH}: {count} page folders bundled.")
+
+if __name__ == "__main__":
+    main()
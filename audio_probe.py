@@ -0,0 +1,267 @@
+import os
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from lazy_imports import lazy_import
+import json_io
+
+requests = lazy_import("requests")
+
+# --- CONFIGURATION ---
+# Probing reads only the head of each MP3 (ID3 tag + first frame header),
+# so accurate durations cost a few KB per track instead of a full download.
+PROBE_BYTES = 16384
+PROBE_WORKERS = 16
+PROBE_TIMEOUT = 10
+PROBE_CACHE_FILE = ".cache/audio_durations.json"
+
+# --- MPEG AUDIO TABLES ---
+# Index: version bits (0 = MPEG 2.5, 2 = MPEG 2, 3 = MPEG 1)
+SAMPLE_RATES = {
+    3: [44100, 48000, 32000],
+    2: [22050, 24000, 16000],
+    0: [11025, 12000, 8000],
+}
+
+# Kbps. Key: (is_mpeg1, layer) where layer is 1, 2 or 3
+BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+
+def get_headers():
+    return {'User-Agent': 'LinguaflowApp/1.0 (Language Learning Research)'}
+
+# --- HTTP ---
+
+def fetch_range(url, start, length, session=None):
+    """
+    Fetches `length` bytes starting at `start` with a Range request.
+    Returns (bytes, total_file_size or None). Servers that ignore Range
+    are handled by reading the body up to the requested window and slicing it.
+    """
+    http = session or requests
+    headers = {**get_headers(), 'Range': f"bytes={start}-{start + length - 1}"}
+    res = http.get(url, headers=headers, timeout=PROBE_TIMEOUT, stream=True, allow_redirects=True)
+    try:
+        if res.status_code not in (200, 206):
+            return b"", None
+
+        total = None
+        content_range = res.headers.get('Content-Range', '')
+        if '/' in content_range:
+            size = content_range.rsplit('/', 1)[1]
+            if size.isdigit(): total = int(size)
+        elif res.status_code == 200 and res.headers.get('Content-Length', '').isdigit():
+            total = int(res.headers['Content-Length'])
+
+        # Range ignored: body starts at 0, so read past `start` and cut
+        skip = start if res.status_code == 200 else 0
+        data = b""
+        for block in res.iter_content(chunk_size=4096):
+            data += block
+            if len(data) >= skip + length: break
+
+        return data[skip:skip + length], total
+    finally:
+        res.close()
+
+# --- HEADER PARSING ---
+
+def syncsafe_int(raw):
+    return (raw[0] << 21) | (raw[1] << 14) | (raw[2] << 7) | raw[3]
+
+def parse_id3v2(data):
+    """
+    Returns (tag_size, tlen_seconds or None). tag_size is 0 when there is no tag.
+    TLEN is the ID3 "length in milliseconds" text frame.
+    """
+    if len(data) < 10 or data[:3] != b"ID3":
+        return 0, None
+
+    major = data[3]
+    flags = data[5]
+    tag_size = 10 + syncsafe_int(data[6:10])
+    if flags & 0x10: tag_size += 10  # Footer present
+
+    tlen = None
+    pos = 10
+    end = min(tag_size, len(data))
+    # ID3v2.2 uses 3-char frame IDs; LibriVox/Archive files are 2.3/2.4
+    while major in (3, 4) and pos + 10 <= end:
+        frame_id = data[pos:pos + 4]
+        if frame_id[0] == 0: break  # Padding
+        if major == 4: frame_size = syncsafe_int(data[pos + 4:pos + 8])
+        else: frame_size = struct.unpack(">I", data[pos + 4:pos + 8])[0]
+        body = data[pos + 10:pos + 10 + frame_size]
+        if frame_id == b"TLEN" and len(body) > 1:
+            text = body[1:].decode('latin-1', errors='ignore').strip('\x00 ')
+            if text.isdigit() and int(text) > 0:
+                tlen = int(text) / 1000.0
+            break
+        pos += 10 + frame_size
+
+    return tag_size, tlen
+
+def parse_frame_header(data, pos):
+    """Parses a 4-byte MPEG audio frame header. Returns a dict or None."""
+    if pos + 4 > len(data): return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    if data[pos] != 0xFF or (b1 & 0xE0) != 0xE0: return None
+
+    version = (b1 >> 3) & 0x03
+    layer_bits = (b1 >> 1) & 0x03
+    bitrate_idx = (b2 >> 4) & 0x0F
+    rate_idx = (b2 >> 2) & 0x03
+    if version == 1 or layer_bits == 0 or bitrate_idx in (0, 15) or rate_idx == 3:
+        return None
+
+    layer = 4 - layer_bits
+    is_mpeg1 = version == 3
+    sample_rate = SAMPLE_RATES[version][rate_idx]
+    bitrate = BITRATES[(is_mpeg1, layer)][bitrate_idx] * 1000
+    padding = (b2 >> 1) & 0x01
+    mono = ((b3 >> 6) & 0x03) == 3
+
+    if layer == 1:
+        samples = 384
+        frame_len = (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if (layer == 2 or is_mpeg1) else 576
+        frame_len = samples // 8 * bitrate // sample_rate + padding
+
+    return {
+        'is_mpeg1': is_mpeg1, 'layer': layer, 'mono': mono,
+        'sample_rate': sample_rate, 'bitrate': bitrate,
+        'samples': samples, 'frame_len': frame_len,
+    }
+
+def find_first_frame(data, start):
+    """Finds the first frame whose successor is also a valid frame (avoids false syncs)."""
+    pos = start
+    while pos + 4 <= len(data):
+        pos = data.find(b"\xFF", pos)
+        if pos < 0: return None, None
+        header = parse_frame_header(data, pos)
+        if header:
+            nxt = pos + header['frame_len']
+            # Can't verify past the probe window, accept the candidate
+            if nxt + 4 > len(data) or parse_frame_header(data, nxt): return pos, header
+        pos += 1
+    return None, None
+
+def parse_vbr_frames(data, pos, header):
+    """Reads the frame count from a Xing/Info or VBRI header inside the first frame."""
+    if header['is_mpeg1']: side_info = 17 if header['mono'] else 32
+    else: side_info = 9 if header['mono'] else 17
+
+    xing = pos + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info") and xing + 12 <= len(data):
+        flags = struct.unpack(">I", data[xing + 4:xing + 8])[0]
+        if flags & 0x01:
+            return struct.unpack(">I", data[xing + 8:xing + 12])[0]
+
+    vbri = pos + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI" and vbri + 18 <= len(data):
+        return struct.unpack(">I", data[vbri + 14:vbri + 18])[0]
+
+    return None
+
+def estimate_duration(data, total_size, fetch_more=None):
+    """
+    Computes duration (seconds) from the head of an MP3.
+    Priority: Xing/VBRI frame count -> ID3 TLEN -> CBR bitrate * file size.
+    `fetch_more(offset)` is used when an ID3 tag (e.g. embedded cover art)
+    is larger than the probe window.
+    """
+    tag_size, tlen = parse_id3v2(data)
+    audio = data
+    offset = tag_size
+
+    if tag_size + 4 > len(data):
+        if tlen: return tlen
+        if not fetch_more: return None
+        audio = fetch_more(tag_size)
+        offset = 0
+
+    pos, header = find_first_frame(audio, offset)
+    if header is None: return tlen
+
+    frames = parse_vbr_frames(audio, pos, header)
+    if frames:
+        return frames * header['samples'] / header['sample_rate']
+    if tlen:
+        return tlen
+    if total_size and header['bitrate']:
+        return (total_size - tag_size) * 8 / header['bitrate']
+    return None
+
+# --- PROBE STAGE ---
+
+def probe_duration(url, session=None):
+    """Returns the duration of a remote MP3 in whole seconds, or None."""
+    data, total = fetch_range(url, 0, PROBE_BYTES, session)
+    if not data: return None
+
+    def fetch_more(offset):
+        more, _ = fetch_range(url, offset, PROBE_BYTES, session)
+        return more
+
+    duration = estimate_duration(data, total, fetch_more)
+    return int(round(duration)) if duration else None
+
+def load_probe_cache():
+    if not os.path.exists(PROBE_CACHE_FILE): return {}
+    try:
+        return json_io.load(PROBE_CACHE_FILE)
+    except: return {}
+
+def save_probe_cache(cache):
+    os.makedirs(os.path.dirname(PROBE_CACHE_FILE), exist_ok=True)
+    json_io.dump(PROBE_CACHE_FILE, cache)
+
+def probe_durations(lessons, max_workers=PROBE_WORKERS):
+    """
+    Fills `duration` on audio lessons with the real MP3 length.
+    Probes run concurrently and results are cached by URL, so re-runs only
+    touch new tracks. Lessons whose probe fails keep their estimate.
+    Returns the number of lessons whose duration changed.
+    """
+    cache = load_probe_cache()
+    targets = {}
+    for lesson in lessons:
+        url = lesson.get('audioUrl') or lesson.get('videoUrl')
+        if url and url.lower().split('?')[0].endswith('.mp3'):
+            targets.setdefault(url, []).append(lesson)
+
+    pending = [url for url in targets if url not in cache]
+    if pending:
+        print(f"    📏 Probing {len(pending)} tracks ({len(targets) - len(pending)} cached)...")
+        local = threading.local()
+
+        def worker(url):
+            if not hasattr(local, 'session'): local.session = requests.Session()
+            try: return probe_duration(url, local.session)
+            except Exception: return None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(worker, url): url for url in pending}
+            for future in as_completed(futures):
+                duration = future.result()
+                # Failures are not cached so they are retried next run
+                if duration: cache[futures[future]] = duration
+        save_probe_cache(cache)
+
+    changed = 0
+    for url, items in targets.items():
+        duration = cache.get(url)
+        if not duration: continue
+        for lesson in items:
+            if lesson.get('duration') != duration:
+                lesson['duration'] = duration
+                changed += 1
+    return changed
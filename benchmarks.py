@@ -0,0 +1,256 @@
+import os
+import sys
+import glob
+import json
+import time
+import hashlib
+import argparse
+import datetime
+import platform
+import tempfile
+import tracemalloc
+import lesson_schema
+
+from generate_course_content import parse_vtt_to_transcript, split_sentences, analyze_difficulty
+from generate_books import clean_gutenberg_text, chunk_text
+from generate_storybook_lessons import parse_markdown
+from sync_to_firebase import get_document_size
+
+# --- CONFIGURATION ---
+# Micro-benchmarks for the hot text-processing functions of the generators,
+# run over a fixed corpus built from the committed assets:
+#
+#   VTT files      rebuilt from course_videos transcripts
+#   Markdown       storybooks lessons written back out as Global Storybooks .md
+#   Gutenberg      storybooks text wrapped in Gutenberg header/footer boilerplate
+#   Lessons        full lesson dicts for the sync size check
+#
+# Results are compared with a stored baseline so slowdowns show up before a
+# multi-hour production run. Timings are machine-specific, so the baseline
+# lives in .cache/ and is only compared when the corpus fingerprint matches.
+BASELINE_FILE = ".cache/benchmark_baseline.json"
+TOLERANCE = 0.15  # slower (or more memory) than baseline by more than this = regression
+REPEAT = 5
+
+VTT_SOURCES = ["assets/course_videos", "assets/guided_courses", "assets/native_videos"]
+STORY_SOURCE = "assets/storybooks_lessons"
+VTT_LESSONS = 100
+STORY_LESSONS = 300
+SIZE_CHECK_LESSONS = 1000
+GUTENBERG_BOOKS = 3
+GUTENBERG_BOOK_CHARS = 400_000
+
+# --- CORPUS ---
+
+def load_lessons(folders):
+    """Lessons from the top-level files of `folders`, in a stable order."""
+    lessons = []
+    for folder in folders:
+        for path in sorted(glob.glob(os.path.join(folder, "*.json"))):
+            with open(path, 'r', encoding='utf-8') as f:
+                lessons.extend(json.load(f))
+    return lessons
+
+def vtt_timestamp(seconds):
+    hours, rest = divmod(float(seconds), 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{secs:06.3f}"
+
+def to_vtt(transcript):
+    lines = ["WEBVTT", "Kind: captions", "Language: xx", ""]
+    for line in transcript:
+        lines.append(f"{vtt_timestamp(line.get('start', 0))} --> {vtt_timestamp(line.get('end', 0))} align:start position:0%")
+        lines.append(line.get('text', ''))
+        lines.append("")
+    return "\n".join(lines)
+
+def to_markdown(lesson):
+    body = "\n\n".join(lesson.get('sentences') or [lesson.get('content', '')])
+    return (f"---\ntitle: {lesson.get('title', '')}\nlevel: 2\nauthor: {lesson.get('author', '')}\n---\n\n"
+            f"# {lesson.get('title', '')}\n\n![cover](cover.jpg)\n\n{body}\n")
+
+def to_gutenberg(title, paragraphs, size):
+    """A Gutenberg-shaped plain-text book (boilerplate header/footer) of about `size` chars."""
+    body, length, i = [], 0, 0
+    while length < size and paragraphs:
+        paragraph = paragraphs[i % len(paragraphs)]
+        body.append(paragraph)
+        length += len(paragraph) + 2
+        i += 1
+    return (f"The Project Gutenberg eBook of {title}\n\nThis eBook is for the use of anyone anywhere.\n\n"
+            f"*** START OF THE PROJECT GUTENBERG EBOOK {title.upper()} ***\n\n"
+            f"Produced by Distributed Proofreaders\n\n" + "\n\n".join(body) +
+            f"\n\n*** END OF THE PROJECT GUTENBERG EBOOK {title.upper()} ***\n\nEnd of license.\n")
+
+def build_corpus(workdir):
+    video_lessons = [l for l in load_lessons(VTT_SOURCES) if l.get('transcript')][:VTT_LESSONS]
+    stories = [l for l in load_lessons([STORY_SOURCE]) if l.get('content')][:STORY_LESSONS]
+
+    md_paths = []
+    for i, lesson in enumerate(stories):
+        path = os.path.join(workdir, f"story-{i:04d}.md")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(to_markdown(lesson))
+        md_paths.append(path)
+
+    paragraphs = [p for l in stories for p in l['content'].split("\n\n") if p.strip()]
+    books = [to_gutenberg(f"Benchmark Book {n + 1}", paragraphs[n::GUTENBERG_BOOKS], GUTENBERG_BOOK_CHARS)
+             for n in range(GUTENBERG_BOOKS)]
+
+    corpus = {
+        'vtt': [to_vtt(l['transcript']) for l in video_lessons],
+        'markdown': md_paths,
+        'texts': [l['content'] for l in stories] + [" ".join(t['text'] for t in l['transcript']) for l in video_lessons],
+        'books': books,
+        'lessons': (video_lessons + load_lessons([STORY_SOURCE]))[:SIZE_CHECK_LESSONS],
+    }
+    corpus['transcripts'] = [parse_vtt_to_transcript(v) for v in corpus['vtt']]
+    corpus['clean_books'] = [clean_gutenberg_text(b) for b in books]
+    return corpus
+
+def corpus_fingerprint(corpus):
+    digest = hashlib.sha1()
+    for key in ('vtt', 'texts', 'books'):
+        for item in corpus[key]:
+            digest.update(item.encode('utf-8'))
+    for path in corpus['markdown']:
+        with open(path, 'rb') as f: digest.update(f.read())
+    digest.update(str(len(corpus['lessons'])).encode())
+    return digest.hexdigest()[:16]
+
+def utf8_len(items):
+    return sum(len(s.encode('utf-8')) for s in items)
+
+# --- BENCHMARKS ---
+
+def benchmarks(corpus):
+    """name -> (callable over the whole corpus slice, bytes processed, items processed)"""
+    md_bytes = sum(os.path.getsize(p) for p in corpus['markdown'])
+    transcript_bytes = utf8_len(t['text'] for tr in corpus['transcripts'] for t in tr)
+    return {
+        'parse_vtt_to_transcript': (lambda: [parse_vtt_to_transcript(v) for v in corpus['vtt']],
+                                    utf8_len(corpus['vtt']), len(corpus['vtt'])),
+        'split_sentences': (lambda: [split_sentences(t) for t in corpus['texts']],
+                            utf8_len(corpus['texts']), len(corpus['texts'])),
+        'analyze_difficulty': (lambda: [analyze_difficulty(t) for t in corpus['transcripts']],
+                               transcript_bytes, len(corpus['transcripts'])),
+        'parse_markdown': (lambda: [parse_markdown(p) for p in corpus['markdown']],
+                           md_bytes, len(corpus['markdown'])),
+        'clean_gutenberg_text': (lambda: [clean_gutenberg_text(b) for b in corpus['books']],
+                                 utf8_len(corpus['books']), len(corpus['books'])),
+        'chunk_text': (lambda: [chunk_text(b) for b in corpus['clean_books']],
+                       utf8_len(corpus['clean_books']), len(corpus['clean_books'])),
+        'sync_size_check': (lambda: [get_document_size(l) for l in corpus['lessons']],
+                            sum(get_document_size(l) for l in corpus['lessons']), len(corpus['lessons'])),
+        'lesson_schema_check': (lambda: [lesson_schema.check(l) for l in corpus['lessons']],
+                                sum(get_document_size(l) for l in corpus['lessons']), len(corpus['lessons'])),
+    }
+
+def measure(fn, repeat=REPEAT):
+    """Best-of-`repeat` wall time, then one extra run under tracemalloc for peak memory."""
+    fn() # warm-up (regex compile caches, file cache)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(times), peak
+
+def run_benchmarks(corpus, only=None, repeat=REPEAT):
+    results = {}
+    for name, (fn, size, items) in benchmarks(corpus).items():
+        if only and name not in only: continue
+        seconds, peak = measure(fn, repeat)
+        results[name] = {
+            'seconds': seconds,
+            'mb_per_s': size / (1024 * 1024) / seconds if seconds else 0.0,
+            'items_per_s': items / seconds if seconds else 0.0,
+            'peak_kb': peak / 1024,
+            'bytes': size,
+            'items': items,
+        }
+    return results
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Returns [(name, message)] for every benchmark that regressed against the baseline."""
+    regressions = []
+    for name, current in results.items():
+        old = baseline.get('results', {}).get(name)
+        if not old: continue
+        if current['mb_per_s'] < old['mb_per_s'] * (1 - tolerance):
+            regressions.append((name, f"throughput {old['mb_per_s']:.2f} -> {current['mb_per_s']:.2f} MB/s"))
+        if current['peak_kb'] > old['peak_kb'] * (1 + tolerance):
+            regressions.append((name, f"peak memory {old['peak_kb']:.0f} -> {current['peak_kb']:.0f} KB"))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the generators' text-processing functions over a fixed corpus.")
+    parser.add_argument("--only", type=str, help="Comma-separated benchmark names")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    only = {n.strip() for n in args.only.split(',')} if args.only else None
+
+    with tempfile.TemporaryDirectory() as workdir:
+        corpus = build_corpus(workdir)
+        fingerprint = corpus_fingerprint(corpus)
+        print(f"📚 Corpus {fingerprint}: {len(corpus['vtt'])} VTT, {len(corpus['markdown'])} markdown, "
+              f"{len(corpus['books'])} Gutenberg books, {len(corpus['lessons'])} lessons\n")
+        results = run_benchmarks(corpus, only, args.repeat)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    comparable = baseline.get('corpus') == fingerprint
+
+    print(f"   {'benchmark':26} {'MB/s':>9} {'items/s':>11} {'peak KB':>9} {'vs base':>8}")
+    for name, r in results.items():
+        old = baseline.get('results', {}).get(name) if comparable else None
+        delta = f"{r['mb_per_s'] / old['mb_per_s'] - 1:+.0%}" if old and old['mb_per_s'] else "-"
+        print(f"   {name:26} {r['mb_per_s']:9.2f} {r['items_per_s']:11.1f} {r['peak_kb']:9.0f} {delta:>8}")
+
+    report = {
+        'corpus': fingerprint,
+        'createdAt': datetime.datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+        return
+
+    if not baseline:
+        print("\nℹ️  No baseline yet (run with --save-baseline).")
+        return
+    if not comparable:
+        print("\nℹ️  Corpus changed since the baseline was saved; not comparing.")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+        for name, message in regressions:
+            print(f"   {name}: {message}")
+        sys.exit(1)
+    print(f"\n✅ No regressions beyond {args.tolerance:.0%}.")
+
+if __name__ == "__main__":
+    main()
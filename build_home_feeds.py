@@ -0,0 +1,164 @@
+import argparse
+import datetime
+import glob
+import os
+import sys
+import time
+import metrics
+import firebase_app
+import json_io
+from lesson_summaries import SUMMARY_COLLECTION, FEED_CATEGORIES, is_pinned, feed_sort_key
+
+# --- CONFIGURATION ---
+SERVICE_ACCOUNT_FILE = "serviceAccountKey.json"
+
+# One document per language + category: home_feeds/{lang}_{category}.
+# Nothing in the app reads these yet: HybridLessonService._loadFromFirestore
+# still runs one query per category. Wiring the home screen to one read per
+# feed document is left for a later app change.
+FEED_COLLECTION = "home_feeds"
+FEED_SIZE = 50
+
+# Local lesson folders, used to discover which languages need a feed
+ASSET_DIRECTORIES = [
+    "assets/guided_courses",
+    "assets/native_videos",
+    "assets/course_videos",
+    "assets/storybooks_lessons",
+    "assets/audio_library",
+    "assets/youtube_audio_library",
+    "assets/text_lessons",
+    "assets/beginner_books",
+]
+
+def initialize_firebase():
+    """Initializes Firebase Admin SDK."""
+    if not os.path.exists(SERVICE_ACCOUNT_FILE):
+        print(f"\n❌ ERROR: '{SERVICE_ACCOUNT_FILE}' not found.")
+        sys.exit(1)
+
+    try:
+        return firebase_app.client(SERVICE_ACCOUNT_FILE)
+    except Exception as e:
+        print(f"\n❌ FIREBASE AUTH ERROR: {e}")
+        sys.exit(1)
+
+def order_feed(summaries, limit=FEED_SIZE):
+    """Final display order: pinned first, then newest first. Returns the top `limit`."""
+    ranked = sorted(summaries, key=feed_sort_key, reverse=True)
+    items = []
+    for summary in ranked[:limit]:
+        item = dict(summary)
+        if isinstance(item.get('createdAt'), datetime.datetime):
+            item['createdAt'] = item['createdAt'].isoformat()
+        item['pinned'] = is_pinned(summary)
+        items.append(item)
+    return items
+
+def discover_languages(db):
+    """Languages present in local assets plus those that already have a feed."""
+    languages = set()
+    for folder in ASSET_DIRECTORIES:
+        for filepath in glob.glob(os.path.join(folder, "*.json")):
+            try:
+                languages.update(l.get('language') for l in json_io.iter_array(filepath) if l.get('language'))
+            except Exception:
+                continue
+
+    with metrics.timer("firestore_read"):
+        docs = list(db.collection(FEED_COLLECTION).select(['language']).stream())
+    metrics.firestore_read(max(len(docs), 1), collection=FEED_COLLECTION)
+    for doc in docs:
+        language = (doc.to_dict() or {}).get('language')
+        if language: languages.add(language)
+    return sorted(languages)
+
+def fetch_top_summaries(db, language, user_ids, limit=FEED_SIZE):
+    """Top-N summaries for one category (one indexed query, N small reads)."""
+    query = (
+        db.collection(SUMMARY_COLLECTION)
+        .where('language', '==', language)
+        .where('userId', 'in', user_ids)
+        .order_by('createdAt', direction="DESCENDING")
+        .limit(limit)
+    )
+    with metrics.timer("firestore_read"):
+        summaries = [doc.to_dict() for doc in query.stream()]
+    # A query is billed at least one read even when it matches nothing
+    metrics.firestore_read(max(len(summaries), 1), collection=SUMMARY_COLLECTION)
+    return summaries
+
+def build_feed(db, language, category, limit=FEED_SIZE):
+    summaries = fetch_top_summaries(db, language, FEED_CATEGORIES[category], limit)
+    items = order_feed(summaries, limit)
+    return {
+        'language': language,
+        'category': category,
+        'items': items,
+        'count': len(items),
+        'updatedAt': datetime.datetime.now().isoformat(),
+    }
+
+def commit_feeds(batch, pending):
+    """Commits `pending` feed documents; they count as written only once the commit succeeds."""
+    writes = {FEED_COLLECTION: pending}
+    try:
+        with metrics.timer("firestore_write"): batch.commit()
+    except Exception:
+        metrics.firestore_commit(writes, committed=False)
+        raise
+    metrics.firestore_commit(writes)
+
+def main():
+    parser = argparse.ArgumentParser(description="Precomputes one home-feed document per language and category.")
+    parser.add_argument("--lang", action="append", help="Only build feeds for this language (repeatable)")
+    parser.add_argument("--limit", type=int, default=FEED_SIZE)
+    args = parser.parse_args()
+    metrics.start_run("build_home_feeds")
+
+    print(f"\n{'='*60}")
+    print("🏠 HOME FEED BUILD STARTED")
+    print(f"{'='*60}\n")
+
+    db = initialize_firebase()
+    start_time = time.time()
+
+    languages = args.lang or discover_languages(db)
+    print(f"🌍 Building feeds for {len(languages)} languages x {len(FEED_CATEGORIES)} categories.")
+
+    written = 0
+    reads = 0
+    batch = db.batch()
+    pending = 0
+
+    for language in languages:
+        for category in FEED_CATEGORIES:
+            try:
+                feed = build_feed(db, language, category, args.limit)
+            except Exception as e:
+                print(f"   ⚠️ {language}/{category}: {e}")
+                continue
+            reads += feed['count']
+
+            batch.set(db.collection(FEED_COLLECTION).document(f"{language}_{category}"), feed)
+            pending += 1
+            written += 1
+            if pending >= 400:
+                commit_feeds(batch, pending)
+                batch = db.batch()
+                pending = 0
+
+        print(f"   ✅ {language}: feeds updated")
+
+    if pending:
+        commit_feeds(batch, pending)
+
+    elapsed = time.time() - start_time
+    print(f"\n{'='*60}")
+    print(f"🎉 HOME FEEDS COMPLETE in {elapsed:.1f}s")
+    print(f"📄 Feed documents written: {written}")
+    print(f"📖 Summary documents read: {reads}")
+    print(f"{'='*60}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import metrics
+import firebase_app
+from lesson_summaries import LESSONS_COLLECTION, delete_lesson
+
+# --- CONFIGURATION ---
+# Deletes every lesson (and its lesson_summaries mirror) matching a set of
+# filters:
+#
+#   python bulk_delete.py --user-id system_gutenberg --dry-run
+#   python bulk_delete.py --language fr --genre classic --yes
+#   python bulk_delete.py --id-prefix txt_fr_2591_ --until 2025-01-01
+#
+# IDs are read a page at a time with a field mask (no lesson bodies) and a
+# cursor after the last ID seen, so each page is one indexed range read
+# instead of re-running the query from the start. Delete batches commit on
+# a thread pool while the next page is read; a failed commit is retried
+# with exponential backoff (deletes are idempotent).
+#
+# userId/language/genre are equality filters and the ID prefix is a
+# document-ID range, which single-field indexes serve. A createdAt range
+# orders by createdAt, so combined with equality filters it needs a
+# composite index (Firestore's error links to it); the ID prefix is then
+# applied to the IDs client-side.
+SERVICE_KEY_PATH = "serviceAccountKey.json"
+COLLECTION_NAME = LESSONS_COLLECTION
+
+PAGE_SIZE = 1000        # IDs per query page
+BATCH_LESSONS = 200     # lessons per commit (lesson + summary = 2 writes; Firestore caps a batch at 500)
+WORKERS = 8             # concurrent batch commits
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 0.5   # first retry delay; doubles per attempt, plus jitter
+
+DOCUMENT_ID = "__name__" # FieldPath.document_id()
+
+def initialize_firebase():
+    """Initializes Firebase Admin SDK."""
+    if not os.path.exists(SERVICE_KEY_PATH):
+        print(f"❌ Error: '{SERVICE_KEY_PATH}' not found.")
+        sys.exit(1)
+
+    try:
+        return firebase_app.client(SERVICE_KEY_PATH)
+    except Exception as e:
+        print(f"\n❌ FIREBASE AUTH ERROR: {e}")
+        sys.exit(1)
+
+def describe(filters):
+    return ", ".join(f"{name}={value!r}" for name, value in filters.items() if value is not None) or "no filters"
+
+def build_query(db, user_id=None, language=None, genre=None, id_prefix=None, since=None, until=None):
+    """
+    Query for the filters. Returns (query, order, client_prefix): the fields
+    to page by, and an ID prefix the query could not apply itself.
+    """
+    collection = db.collection(COLLECTION_NAME)
+    query = collection
+    for field, value in (("userId", user_id), ("language", language), ("genre", genre)):
+        if value is not None:
+            query = query.where(field, "==", value)
+
+    if since is None and until is None:
+        if id_prefix:
+            query = (query.where(DOCUMENT_ID, ">=", collection.document(id_prefix))
+                          .where(DOCUMENT_ID, "<", collection.document(id_prefix + "\uf8ff")))
+        return query, [DOCUMENT_ID], None
+
+    if since is not None:
+        query = query.where("createdAt", ">=", since)
+    if until is not None:
+        query = query.where("createdAt", "<", until)
+    # A range query orders by its field first
+    return query, ["createdAt", DOCUMENT_ID], id_prefix
+
+def iter_matching_ids(db, page_size=PAGE_SIZE, **filters):
+    """Yields the IDs of matching lessons, one page (one query) at a time."""
+    query, order, client_prefix = build_query(db, **filters)
+    # Field mask: only what the cursor needs comes back, never the lesson body
+    query = query.select(order)
+    for field in order:
+        query = query.order_by(field)
+    last = None
+    while True:
+        page_query = query.limit(page_size)
+        if last is not None:
+            page_query = page_query.start_after(last)
+        with metrics.timer("firestore_read"):
+            docs = list(page_query.stream())
+        metrics.firestore_read(max(len(docs), 1)) # an empty page is still billed one read
+        for doc in docs:
+            if client_prefix is None or doc.id.startswith(client_prefix):
+                yield doc.id
+        if len(docs) < page_size: return
+        last = docs[-1]
+
+def count_matching(db, **filters):
+    """Number of matching lessons. Uses a count aggregation (1 read per 1000 matches) when it can."""
+    query, _, client_prefix = build_query(db, **filters)
+    if client_prefix is None:
+        try:
+            with metrics.timer("firestore_read"):
+                count = int(query.count().get()[0][0].value)
+            metrics.firestore_read(max(-(-count // 1000), 1))
+            return count
+        except Exception as e:
+            print(f"   ⚠️ Count aggregation failed ({e}); counting IDs instead.")
+    return sum(1 for _ in iter_matching_ids(db, **filters))
+
+def commit_with_backoff(db, lesson_ids, max_retries=MAX_RETRIES, backoff=BACKOFF_SECONDS):
+    """Deletes `lesson_ids` (+ summaries) in one batch, retrying failures. Returns True once committed."""
+    for attempt in range(max_retries + 1):
+        batch = db.batch()
+        writes = Counter()
+        for lesson_id in lesson_ids:
+            writes.update(delete_lesson(db, lesson_id, batch))
+        try:
+            with metrics.timer("firestore_write"):
+                batch.commit()
+            metrics.firestore_commit(writes)
+            metrics.count("batch_commits_total", result="ok")
+            return True
+        except Exception as e:
+            metrics.firestore_commit(writes, committed=False)
+            if attempt == max_retries:
+                metrics.count("batch_commits_total", result="failed")
+                print(f"   ❌ Batch of {len(lesson_ids)} failed after {max_retries} retries: {e}")
+                return False
+            metrics.count("batch_commits_total", result="retried")
+            time.sleep(backoff * 2 ** attempt * (1 + random.random()))
+
+def delete_matching(db, batch_lessons=BATCH_LESSONS, workers=WORKERS, page_size=PAGE_SIZE, **filters):
+    """
+    Deletes every lesson matching `filters` (see build_query) and its
+    summary. Returns (deleted, failed) lesson counts.
+    """
+    deleted = failed = 0
+    lock = threading.Lock()
+    started = time.time()
+
+    def run(lesson_ids):
+        nonlocal deleted, failed
+        ok = commit_with_backoff(db, lesson_ids)
+        with lock:
+            if ok: deleted += len(lesson_ids)
+            else: failed += len(lesson_ids)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = set()
+        chunk = []
+        reported = 0
+        for lesson_id in iter_matching_ids(db, page_size, **filters):
+            chunk.append(lesson_id)
+            if len(chunk) < batch_lessons: continue
+            running.add(pool.submit(run, chunk))
+            chunk = []
+            # Bounded queue: page reads stay at most a few batches ahead of the commits
+            if len(running) >= workers * 2:
+                _, running = wait(running, return_when=FIRST_COMPLETED)
+            if deleted - reported >= 10 * batch_lessons:
+                reported = deleted
+                print(f"   🗑️  {deleted:,} deleted ({deleted / max(time.time() - started, 1e-9):,.0f}/s)...")
+        if chunk:
+            running.add(pool.submit(run, chunk))
+        wait(running)
+
+    return deleted, failed
+
+def add_filter_arguments(parser):
+    parser.add_argument("--user-id", help="userId equals (e.g. system_gutenberg)")
+    parser.add_argument("--language", help="language equals (e.g. fr)")
+    parser.add_argument("--genre", help="genre equals")
+    parser.add_argument("--id-prefix", help="Lesson ID starts with (e.g. txt_fr_2591_)")
+    parser.add_argument("--since", help="createdAt >= this ISO date/time")
+    parser.add_argument("--until", help="createdAt < this ISO date/time")
+
+def filters_from_args(args):
+    return {
+        "user_id": args.user_id, "language": args.language, "genre": args.genre,
+        "id_prefix": args.id_prefix, "since": args.since, "until": args.until,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Deletes Firestore lessons (and their summaries) matching the given filters.")
+    add_filter_arguments(parser)
+    parser.add_argument("--dry-run", action="store_true", help="Only count the matching lessons")
+    parser.add_argument("--yes", action="store_true", help="Don't ask for confirmation")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Concurrent batch commits")
+    args = parser.parse_args()
+
+    filters = filters_from_args(args)
+    if all(value is None for value in filters.values()):
+        parser.error("give at least one filter; this tool does not delete the whole collection")
+    metrics.start_run("bulk_delete")
+
+    print(f"\n{'='*60}")
+    print("🔥 BULK LESSON DELETE")
+    print(f"{'='*60}\n")
+
+    db = initialize_firebase()
+
+    print(f"🔍 Counting lessons where {describe(filters)}...")
+    matching = count_matching(db, **filters)
+    print(f"📊 {matching:,} matching lessons.")
+    if args.dry_run or not matching:
+        return
+
+    if not args.yes:
+        confirm = input(f"\nDelete {matching:,} lessons and their summaries? (type 'yes' to confirm): ")
+        if confirm.lower() != "yes":
+            print("❌ Operation cancelled.")
+            return
+
+    start_time = time.time()
+    deleted, failed = delete_matching(db, workers=args.workers, **filters)
+
+    elapsed = time.time() - start_time
+    print(f"\n{'='*60}")
+    print(f"🎉 DELETE COMPLETE in {elapsed:.1f}s ({deleted / max(elapsed, 1e-9):,.0f} lessons/s)")
+    print(f"🗑️  Deleted: {deleted:,}")
+    if failed:
+        print(f"❌ Failed: {failed:,} (re-run to retry)")
+    print(f"{'='*60}")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+import os
+import json
+import glob
+import time
+import sqlite3
+import hashlib
+import argparse
+import datetime
+import metrics
+import json_io
+import lesson_schema
+from asset_pages import canonical_lesson, write_json, write_lesson_pages
+
+# --- CONFIGURATION ---
+# Local catalog of every generated lesson. Generators write lessons here in
+# a transaction; the per-language asset JSON (and its pages) is exported
+# from it. Duplicate checks and "what still needs syncing" become indexed
+# queries instead of scans over ~150 JSON files.
+#
+# The asset files stay the committed artefact: on open, any file whose
+# mtime/size differs from the last export (hand edit, git pull) is imported
+# back, unless the catalog holds unexported changes for it.
+CATALOG_DB = "catalog.db"
+
+ASSET_DIRECTORIES = [
+    "assets/guided_courses",
+    "assets/native_videos",
+    "assets/course_videos",
+    "assets/storybooks_lessons",
+    "assets/audio_library",
+    "assets/youtube_audio_library",
+    "assets/text_lessons",
+    "assets/beginner_books",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,          -- asset file the lessons are exported to
+    page_order TEXT NOT NULL DEFAULT 'source',
+    mtime_ns INTEGER,               -- stat of the file as last exported/imported
+    size INTEGER,
+    dirty INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS lessons (
+    id TEXT NOT NULL,
+    source TEXT NOT NULL,
+    position INTEGER NOT NULL,      -- order in the exported file (may be negative)
+    language TEXT,
+    user_id TEXT,
+    hash TEXT NOT NULL,
+    data TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    synced_at TEXT,
+    synced_hash TEXT,
+    PRIMARY KEY (source, id)
+);
+CREATE INDEX IF NOT EXISTS idx_lessons_id ON lessons(id);
+CREATE INDEX IF NOT EXISTS idx_lessons_source_position ON lessons(source, position);
+CREATE INDEX IF NOT EXISTS idx_lessons_language ON lessons(language, user_id);
+CREATE INDEX IF NOT EXISTS idx_lessons_hash ON lessons(hash);
+"""
+
+# --- CONNECTION ---
+
+def connect(db_path=CATALOG_DB):
+    # Generators run in process pools; WAL + busy timeout serialises writers
+    conn = sqlite3.connect(db_path, timeout=60)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def open_catalog(db_path=CATALOG_DB, directories=ASSET_DIRECTORIES):
+    """Connects and brings the catalog up to date with the asset files."""
+    conn = connect(db_path)
+    refresh_sources(conn, directories)
+    return conn
+
+def now():
+    return datetime.datetime.now().isoformat()
+
+def lesson_hash(lesson):
+    return hashlib.sha1(json.dumps(lesson, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def file_stat(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+# --- WRITES ---
+
+def _ensure_source(conn, source, order=None):
+    conn.execute("INSERT OR IGNORE INTO sources (path, page_order) VALUES (?, ?)", (source, order or "source"))
+    if order:
+        conn.execute("UPDATE sources SET dirty = 1, page_order = ? WHERE path = ?", (order, source))
+    else:
+        conn.execute("UPDATE sources SET dirty = 1 WHERE path = ?", (source,))
+
+def _upsert(conn, source, lesson, position, timestamp):
+    # Flag bad lessons when they are generated; sync_to_firebase refuses to upload them
+    errors = lesson_schema.problems(lesson)
+    if errors:
+        metrics.count("malformed_lessons_total")
+        print(f"   ⚠️ {source}: lesson {lesson['id']} will not sync: {'; '.join(errors)}")
+    digest = lesson_hash(lesson)
+    conn.execute("""
+        INSERT INTO lessons (id, source, position, language, user_id, hash, data, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (source, id) DO UPDATE SET
+            position = excluded.position,
+            language = excluded.language,
+            user_id = excluded.user_id,
+            data = excluded.data,
+            updated_at = CASE WHEN lessons.hash = excluded.hash THEN lessons.updated_at ELSE excluded.updated_at END,
+            hash = excluded.hash
+    """, (str(lesson['id']), source, position, lesson.get('language'), lesson.get('userId'),
+          digest, json_io.dumps(lesson), timestamp))
+
+def save_source(conn, source, lessons, order=None):
+    """Replaces the full lesson list of one asset file (one transaction). Export with export_sources()."""
+    timestamp = now()
+    with conn:
+        _ensure_source(conn, source, order)
+        conn.execute("CREATE TEMP TABLE IF NOT EXISTS keep_ids (id TEXT PRIMARY KEY)")
+        conn.execute("DELETE FROM keep_ids")
+        for position, lesson in enumerate(lessons):
+            _upsert(conn, source, lesson, position, timestamp)
+            conn.execute("INSERT OR IGNORE INTO keep_ids (id) VALUES (?)", (str(lesson['id']),))
+        conn.execute("DELETE FROM lessons WHERE source = ? AND id NOT IN (SELECT id FROM keep_ids)", (source,))
+
+def remove_source(conn, source):
+    """Forgets an asset file and its lessons (the file itself is left alone)."""
+    with conn:
+        conn.execute("DELETE FROM lessons WHERE source = ?", (source,))
+        conn.execute("DELETE FROM sources WHERE path = ?", (source,))
+
+def append_lessons(conn, source, lessons, order=None):
+    """Appends lessons after the current last one (existing IDs are updated in place)."""
+    timestamp = now()
+    with conn:
+        _ensure_source(conn, source, order)
+        last = conn.execute("SELECT MAX(position) FROM lessons WHERE source = ?", (source,)).fetchone()[0]
+        position = -1 if last is None else last
+        for lesson in lessons:
+            if has_lesson(conn, lesson['id'], source=source):
+                _upsert(conn, source, lesson, _position_of(conn, source, lesson['id']), timestamp)
+                continue
+            position += 1
+            _upsert(conn, source, lesson, position, timestamp)
+
+def add_lesson(conn, source, lesson, at_top=False, order=None):
+    """Adds one lesson unless its ID is already in `source`. Returns True if added."""
+    with conn:
+        if has_lesson(conn, lesson['id'], source=source): return False
+        _ensure_source(conn, source, order)
+        edge = conn.execute(
+            f"SELECT {'MIN' if at_top else 'MAX'}(position) FROM lessons WHERE source = ?", (source,)).fetchone()[0]
+        position = 0 if edge is None else (edge - 1 if at_top else edge + 1)
+        _upsert(conn, source, lesson, position, now())
+    return True
+
+def mark_synced(conn, synced):
+    """`synced` is [(lesson_id, sync_hash)]; records them as uploaded/verified."""
+    timestamp = now()
+    with conn:
+        conn.executemany("UPDATE lessons SET synced_at = ?, synced_hash = ? WHERE id = ?",
+                         [(timestamp, digest, str(lesson_id)) for lesson_id, digest in synced])
+
+# --- READS ---
+
+def _position_of(conn, source, lesson_id):
+    return conn.execute("SELECT position FROM lessons WHERE source = ? AND id = ?", (source, str(lesson_id))).fetchone()[0]
+
+def has_lesson(conn, lesson_id, source=None, folder=None):
+    """Indexed ID lookup, optionally limited to one asset file or folder."""
+    query, params = "SELECT 1 FROM lessons WHERE id = ?", [str(lesson_id)]
+    if source:
+        query += " AND source = ?"; params.append(source)
+    if folder:
+        query += " AND source LIKE ?"; params.append(folder.rstrip('/') + '/%')
+    return conn.execute(query + " LIMIT 1", params).fetchone() is not None
+
+def has_prefix(conn, prefix, source=None):
+    """True if any lesson ID starts with `prefix` (e.g. 'txt_fr_2591_'), as an index range scan."""
+    query = "SELECT 1 FROM lessons WHERE id >= ? AND id < ?"
+    params = [prefix, prefix + '\U0010ffff']
+    if source:
+        query += " AND source = ?"; params.append(source)
+    return conn.execute(query + " LIMIT 1", params).fetchone() is not None
+
+def count_lessons(conn, source):
+    return conn.execute("SELECT COUNT(*) FROM lessons WHERE source = ?", (source,)).fetchone()[0]
+
+def load_source(conn, source):
+    """Lessons of one asset file in export order."""
+    return [json_io.loads(row[0]) for row in conn.execute(
+        "SELECT data FROM lessons WHERE source = ? ORDER BY position", (source,))]
+
+def iter_sync_state(conn, source):
+    """Yields (lesson_id, hash, synced_hash, data_json) for one asset file in export order."""
+    yield from conn.execute(
+        "SELECT id, hash, synced_hash, data FROM lessons WHERE source = ? ORDER BY position", (source,))
+
+def load_lesson(conn, source, lesson_id):
+    row = conn.execute("SELECT data FROM lessons WHERE source = ? AND id = ?", (source, str(lesson_id))).fetchone()
+    return json_io.loads(row[0]) if row else None
+
+def _folders_clause(directories):
+    """WHERE clause + params matching sources under any of `directories`."""
+    return "(" + " OR ".join("source LIKE ?" for _ in directories) + ")", [folder.rstrip('/') + '/%' for folder in directories]
+
+def iter_by_id(conn, directories=ASSET_DIRECTORIES):
+    """Yields (lesson_id, source, hash) under `directories` in ID order (byte order; one row per source)."""
+    clause, params = _folders_clause(directories)
+    yield from conn.execute(f"SELECT id, source, hash FROM lessons WHERE {clause} ORDER BY id, source", params)
+
+def list_languages(conn, directories=ASSET_DIRECTORIES):
+    clause, params = _folders_clause(directories)
+    return [row[0] for row in conn.execute(
+        f"SELECT DISTINCT language FROM lessons WHERE language IS NOT NULL AND {clause} ORDER BY language", params)]
+
+def iter_language(conn, language, directories=ASSET_DIRECTORIES):
+    """Yields (lesson_id, source, data) of one language's lessons under `directories` (one row per source)."""
+    clause, params = _folders_clause(directories)
+    yield from conn.execute(f"SELECT id, source, data FROM lessons WHERE language = ? AND {clause}", [language, *params])
+
+def list_sources(conn, folder=None):
+    if folder:
+        return [row[0] for row in conn.execute(
+            "SELECT path FROM sources WHERE path LIKE ? ORDER BY path", (folder.rstrip('/') + '/%',))]
+    return [row[0] for row in conn.execute("SELECT path FROM sources ORDER BY path")]
+
+def library_snapshot(conn, directories=ASSET_DIRECTORIES):
+    """{lesson_id: (hash, canonical lesson)} across all sources (first source wins per ID)."""
+    snapshot = {}
+    for folder in directories:
+        for source in list_sources(conn, folder):
+            for lesson in load_source(conn, source):
+                lesson = canonical_lesson(lesson)
+                lesson_id = str(lesson['id'])
+                if lesson_id not in snapshot:
+                    snapshot[lesson_id] = (lesson_hash(lesson), lesson)
+    return snapshot
+
+# --- IMPORT / EXPORT ---
+
+def import_source(conn, path):
+    """Loads one asset file into the catalog, keeping sync state of unchanged lessons."""
+    lessons = [l for l in json_io.load(path) if l.get('id')]
+    save_source(conn, path, lessons)
+    with conn:
+        conn.execute("UPDATE sources SET dirty = 0, mtime_ns = ?, size = ? WHERE path = ?", (*file_stat(path), path))
+    return len(lessons)
+
+def refresh_sources(conn, directories=ASSET_DIRECTORIES):
+    """
+    Imports new or externally modified asset files and drops sources whose
+    file was deleted; exports sources with pending changes.
+    """
+    known = {row[0]: row[1:] for row in conn.execute("SELECT path, mtime_ns, size, dirty FROM sources")}
+    imported = 0
+    for folder in directories:
+        # Deleted by hand or by clean_assets.py; unexported changes are kept and re-create the file below
+        prefix = folder.rstrip('/') + '/'
+        for path, (_, _, dirty) in known.items():
+            if path.startswith(prefix) and not dirty and not os.path.exists(path):
+                remove_source(conn, path)
+                print(f"   🗑️  Dropped {path} from the catalog (asset file deleted)")
+        for path in sorted(glob.glob(os.path.join(folder, "*.json"))):
+            mtime_ns, size, dirty = known.get(path, (None, None, 0))
+            if dirty or (mtime_ns, size) == file_stat(path): continue
+            try:
+                import_source(conn, path)
+                imported += 1
+            except Exception as e:
+                print(f"   ⚠️ Could not import {path}: {e}")
+    export_sources(conn)
+    return imported
+
+def export_source(conn, source):
+    with conn:
+        conn.execute("INSERT OR IGNORE INTO sources (path) VALUES (?)", (source,))
+    lessons = [canonical_lesson(lesson) for lesson in load_source(conn, source)]
+    order = conn.execute("SELECT page_order FROM sources WHERE path = ?", (source,)).fetchone()[0]
+    os.makedirs(os.path.dirname(source), exist_ok=True)
+    with metrics.timer("file_write"):
+        write_json(source, lessons)
+        write_lesson_pages(source, lessons, order=order)
+    with conn:
+        conn.execute("UPDATE sources SET dirty = 0, mtime_ns = ?, size = ? WHERE path = ?", (*file_stat(source), source))
+    return len(lessons)
+
+def export_sources(conn, sources=None):
+    """Writes asset JSON + pages for every source with unexported changes (or the given ones)."""
+    if sources is None:
+        sources = [row[0] for row in conn.execute("SELECT path FROM sources WHERE dirty = 1 ORDER BY path")]
+    for source in sources:
+        export_source(conn, source)
+    return len(sources)
+
+def main():
+    parser = argparse.ArgumentParser(description="Local lesson catalog (SQLite) behind the asset JSON files.")
+    parser.add_argument("--db", default=CATALOG_DB)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("import", help="Import new/changed asset files and export pending changes")
+    export = sub.add_parser("export", help="Re-export asset JSON from the catalog")
+    export.add_argument("--all", action="store_true", help="Export every source, not just changed ones")
+    sub.add_parser("stats", help="Lesson counts per folder and sync status")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    conn = connect(args.db)
+
+    if args.command == "import":
+        imported = refresh_sources(conn)
+        print(f"✅ Imported {imported} asset files in {time.time() - start_time:.2f}s.")
+    elif args.command == "export":
+        count = export_sources(conn, list_sources(conn) if args.all else None)
+        print(f"✅ Exported {count} asset files in {time.time() - start_time:.2f}s.")
+    else:
+        # rtrim(path, <chars of the file name>) leaves the folder, e.g. "assets/text_lessons/"
+        totals = conn.execute("""
+            SELECT rtrim(source, replace(source, '/', '')), COUNT(*), COUNT(synced_hash)
+            FROM lessons GROUP BY 1 ORDER BY 1
+        """).fetchall()
+        for folder, count, synced in totals:
+            print(f"   {folder:32} {count:7} lessons  {synced:7} synced")
+    conn.close()
+
+if __name__ == "__main__":
+    main()
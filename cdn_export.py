@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import datetime
+import catalog
+from lesson_summaries import FEED_CATEGORIES, build_summary, category_for, feed_sort_key
+
+# --- CONFIGURATION ---
+# Static export of the lesson library for Firebase Hosting, so bulk catalog
+# reads go through the CDN instead of per-document Firestore reads.
+#
+#   content/index.json                      tiny root, short cache: languages -> index file
+#   content/s/index-fr-<hash>.json          per-language index: category -> pages (+ summaries)
+#   content/s/fr/video/<hash>.json          one page of full lessons, in feed order
+#
+# Everything under content/s/ is named by its content hash and served as
+# immutable (see the "headers" section of firebase.json); only the root
+# index changes between deploys. Firestore stays the store for user data.
+#
+# Clients may hold a root index for up to ROOT_INDEX_MAX_AGE after a deploy
+# replaces it, so the files an earlier export referenced are only pruned
+# once they are two exports old and were superseded longer ago than that.
+HOSTING_PUBLIC_DIR = "build/web"   # firebase.json -> hosting.public
+CONTENT_DIR = "content"
+SHARD_DIR = "s"
+ROOT_INDEX_MAX_AGE = 300           # seconds; Cache-Control of content/index.json in firebase.json
+GENERATIONS_FILE = ".generations.json" # earlier exports still served; dotfiles aren't deployed
+PAGE_SIZE = 25
+HASH_LENGTH = 16
+FORMAT_VERSION = 1
+
+def encode(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+def write_hashed(root, rel_dir, prefix, data):
+    """Writes `data` as <rel_dir>/<prefix><hash>.json under root (skips if present). Returns (rel_path, bytes)."""
+    encoded = encode(data)
+    name = f"{prefix}{hashlib.sha256(encoded).hexdigest()[:HASH_LENGTH]}.json"
+    rel_path = f"{rel_dir}/{name}"
+    path = os.path.join(root, rel_path)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(encoded)
+        os.replace(tmp_path, path)
+    return rel_path, len(encoded)
+
+def group_library(snapshot):
+    """{language: {category: [lessons in feed order]}}; lessons outside the feed categories are left out."""
+    groups = {}
+    for _, lesson in snapshot.values():
+        category = category_for(lesson.get('userId'))
+        if not category or not lesson.get('language'): continue
+        groups.setdefault(lesson['language'], {}).setdefault(category, []).append(lesson)
+    for categories in groups.values():
+        for lessons in categories.values():
+            lessons.sort(key=lambda l: str(l['id']))
+            lessons.sort(key=feed_sort_key, reverse=True)
+    return groups
+
+def export_language(root, language, categories, page_size=PAGE_SIZE):
+    """Writes the pages and index of one language. Returns (index_rel_path, files, bytes)."""
+    index = {'format': FORMAT_VERSION, 'language': language, 'categories': {}}
+    files, total_bytes = [], 0
+    for category in FEED_CATEGORIES:
+        lessons = categories.get(category, [])
+        pages = []
+        for start in range(0, len(lessons), page_size):
+            chunk = lessons[start:start + page_size]
+            rel_path, size = write_hashed(root, f"{SHARD_DIR}/{language}/{category}", "", chunk)
+            # Summaries let the app render a page of cards before fetching the shard
+            pages.append({'file': rel_path, 'count': len(chunk), 'bytes': size,
+                          'items': [build_summary(l) for l in chunk]})
+            files.append(rel_path)
+            total_bytes += size
+        index['categories'][category] = {'count': len(lessons), 'pages': pages}
+
+    rel_path, size = write_hashed(root, SHARD_DIR, f"index-{language}-", index)
+    files.append(rel_path)
+    return rel_path, files, total_bytes + size
+
+def referenced_files(root, root_index):
+    """Hashed files a root index references: its language indexes and their pages."""
+    files = set()
+    for entry in root_index.get('languages', {}).values():
+        files.add(entry['index'])
+        try:
+            with open(os.path.join(root, entry['index']), 'rb') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for category in index.get('categories', {}).values():
+            files.update(page['file'] for page in category.get('pages', []))
+    return files
+
+def retained_generations(root, now):
+    """
+    Earlier exports clients may still reach, as [{'supersededAt', 'files'}]:
+    the one the current root index describes (about to be replaced) and any
+    older one superseded less than ROOT_INDEX_MAX_AGE ago.
+    """
+    generations = []
+    try:
+        with open(os.path.join(root, GENERATIONS_FILE), 'rb') as f:
+            generations = json.load(f)
+    except (OSError, ValueError):
+        pass
+    generations = [g for g in generations if now - g['supersededAt'] < ROOT_INDEX_MAX_AGE]
+    try:
+        with open(os.path.join(root, "index.json"), 'rb') as f:
+            previous = json.load(f)
+        generations.append({'supersededAt': now, 'files': sorted(referenced_files(root, previous))})
+    except (OSError, ValueError):
+        pass
+    return generations
+
+def prune(root, keep):
+    """Removes hashed files that neither this export nor a retained earlier one references."""
+    removed = 0
+    shard_root = os.path.join(root, SHARD_DIR)
+    for dirpath, _, filenames in os.walk(shard_root, topdown=False):
+        for filename in filenames:
+            rel_path = os.path.relpath(os.path.join(dirpath, filename), root).replace(os.sep, '/')
+            if rel_path not in keep:
+                os.remove(os.path.join(dirpath, filename))
+                removed += 1
+        if dirpath != shard_root and not os.listdir(dirpath):
+            os.rmdir(dirpath)
+    return removed
+
+def export_library(public_dir=HOSTING_PUBLIC_DIR, page_size=PAGE_SIZE):
+    root = os.path.join(public_dir, CONTENT_DIR)
+    os.makedirs(root, exist_ok=True)
+
+    conn = catalog.open_catalog()
+    snapshot = catalog.library_snapshot(conn)
+    conn.close()
+    groups = group_library(snapshot)
+
+    languages = {}
+    keep = set()
+    total_bytes = 0
+    generations = retained_generations(root, time.time())
+    for language in sorted(groups):
+        index_path, files, size = export_language(root, language, groups[language], page_size)
+        languages[language] = {'index': index_path,
+                               'counts': {c: len(groups[language].get(c, [])) for c in FEED_CATEGORIES}}
+        keep.update(files)
+        total_bytes += size
+
+    root_index = {
+        'format': FORMAT_VERSION,
+        'generatedAt': datetime.datetime.now().isoformat(),
+        'pageSize': page_size,
+        'languages': languages,
+    }
+    tmp_path = os.path.join(root, "index.json.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(encode(root_index))
+    os.replace(tmp_path, os.path.join(root, "index.json"))
+
+    tmp_path = os.path.join(root, GENERATIONS_FILE + ".tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(encode(generations))
+    os.replace(tmp_path, os.path.join(root, GENERATIONS_FILE))
+
+    removed = prune(root, keep.union(*(g['files'] for g in generations)))
+    return len(languages), len(keep), total_bytes, removed
+
+def main():
+    parser = argparse.ArgumentParser(description="Exports the lesson library as content-hashed static shards for Firebase Hosting.")
+    parser.add_argument("--public-dir", default=HOSTING_PUBLIC_DIR, help="Hosting public directory (run after 'flutter build web')")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--clean", action="store_true", help="Delete the existing content/ export first")
+    args = parser.parse_args()
+
+    print(f"\n{'='*60}")
+    print("🌐 CDN EXPORT STARTED")
+    print(f"{'='*60}\n")
+
+    if args.clean:
+        shutil.rmtree(os.path.join(args.public_dir, CONTENT_DIR), ignore_errors=True)
+
+    start_time = time.time()
+    languages, files, total_bytes, removed = export_library(args.public_dir, args.page_size)
+
+    print(f"\n{'='*60}")
+    print(f"🎉 CDN EXPORT COMPLETE in {time.time() - start_time:.1f}s")
+    print(f"🌍 Languages: {languages}")
+    print(f"📄 Hashed files: {files} ({total_bytes / (1024 * 1024):.1f} MB, {removed} stale removed)")
+    print(f"📁 Root index: {os.path.join(args.public_dir, CONTENT_DIR, 'index.json')}")
+    print("🚀 Deploy with: firebase deploy --only hosting")
+    print(f"{'='*60}")
+
+if __name__ == "__main__":
+    main()
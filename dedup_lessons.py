@@ -0,0 +1,270 @@
+import os
+import re
+import json
+import glob
+import time
+import zlib
+import hashlib
+import argparse
+import datetime
+import numpy as np
+import json_io
+from related_lessons import source_rank
+
+# --- CONFIGURATION ---
+# The same material reaches the library through several paths: one video
+# ingested as yt_{id} by both the native and course scripts, Gutenberg IDs
+# present in both the books and beginner catalogs (2591, 15353), re-uploads
+# of one talk on different channels. Lessons are compared by MinHash
+# signatures of their word shingles; LSH banding keeps candidate search
+# roughly linear, so the check scales to hundreds of thousands of lessons.
+SHINGLE_SIZE = 4        # words per shingle
+MIN_WORDS = 8           # shorter texts are too generic to compare
+BANDS = 20
+ROWS = 6                # BANDS * ROWS = signature length
+NUM_PERM = BANDS * ROWS
+THRESHOLD = 0.8         # estimated Jaccard similarity that counts as a duplicate
+SEED = 1                # fixed, so cached signatures stay valid
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+CHUNK_SHINGLES = 8192   # bounds the (shingles x NUM_PERM) matrix per step
+
+REPORT_FILE = ".cache/duplicates.json"
+SIGNATURE_CACHE_FILE = ".cache/minhash_signatures.npz"
+
+# Scan order decides which copy is kept: the first occurrence wins. Files
+# are visited in source_rank order (folder, then path), the order sync
+# uploads in, so the kept copy is the one sync would upload.
+ASSET_DIRECTORIES = [
+    "assets/guided_courses",
+    "assets/native_videos",
+    "assets/course_videos",
+    "assets/storybooks_lessons",
+    "assets/audio_library",
+    "assets/youtube_audio_library",
+    "assets/text_lessons",
+    "assets/beginner_books",
+]
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+_rng = np.random.RandomState(SEED)
+PERM_A = _rng.randint(1, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+PERM_B = _rng.randint(0, 1 << 32, size=NUM_PERM, dtype=np.uint64)
+
+# --- SIGNATURES ---
+
+def lesson_text(lesson):
+    """Body text used for comparison (titles differ between re-uploads, so they are left out)."""
+    if lesson.get('content'):
+        return lesson['content']
+    return " ".join(t.get('text', '') for t in lesson.get('transcript') or [] if isinstance(t, dict))
+
+def shingle_hashes(text, size=SHINGLE_SIZE):
+    """Unique 32-bit hashes of the word `size`-grams of `text`, or None if it is too short."""
+    words = TOKEN_PATTERN.findall(text.casefold())
+    if len(words) < MIN_WORDS: return None
+    hashes = {zlib.crc32(" ".join(words[i:i + size]).encode('utf-8'))
+              for i in range(max(1, len(words) - size + 1))}
+    return np.fromiter(hashes, dtype=np.uint64, count=len(hashes))
+
+def minhash(hashes):
+    """MinHash signature (NUM_PERM uint32 values) of a shingle hash array."""
+    signature = np.full(NUM_PERM, MAX_HASH, dtype=np.uint64)
+    for start in range(0, len(hashes), CHUNK_SHINGLES):
+        chunk = hashes[start:start + CHUNK_SHINGLES, None]
+        permuted = ((chunk * PERM_A + PERM_B) % MERSENNE_PRIME) & MAX_HASH
+        np.minimum(signature, permuted.min(axis=0), out=signature)
+    return signature.astype(np.uint32)
+
+def text_digest(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def load_signature_cache(path=SIGNATURE_CACHE_FILE):
+    """{text sha1: signature} from previous runs (invalidated if the parameters change)."""
+    if not os.path.exists(path): return {}
+    try:
+        data = np.load(path)
+        if int(data['num_perm']) != NUM_PERM or int(data['shingle_size']) != SHINGLE_SIZE or int(data['seed']) != SEED:
+            return {}
+        return dict(zip(data['keys'].tolist(), data['signatures']))
+    except Exception:
+        return {}
+
+def save_signature_cache(cache, path=SIGNATURE_CACHE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    keys = sorted(cache)
+    signatures = np.array([cache[k] for k in keys], dtype=np.uint32).reshape(len(keys), NUM_PERM)
+    tmp_path = path + ".tmp.npz"
+    np.savez_compressed(tmp_path, keys=np.array(keys), signatures=signatures,
+                        num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=SEED)
+    os.replace(tmp_path, path)
+
+# --- LSH ---
+
+class LSHIndex:
+    """
+    Banded LSH over MinHash signatures. Two signatures become candidates when
+    all ROWS values of at least one band match; candidates are then verified
+    against THRESHOLD. Ingesters can keep one open and call `match()` before
+    storing a new lesson.
+    """
+
+    def __init__(self, bands=BANDS, rows=ROWS, threshold=THRESHOLD):
+        self.bands = bands
+        self.rows = rows
+        self.threshold = threshold
+        self.buckets = [{} for _ in range(bands)]
+        self.signatures = {}
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def add(self, key, signature):
+        self.signatures[key] = signature
+        for band, band_key in self._band_keys(signature):
+            self.buckets[band].setdefault(band_key, []).append(key)
+
+    def candidates(self, signature):
+        found = set()
+        for band, band_key in self._band_keys(signature):
+            found.update(self.buckets[band].get(band_key, ()))
+        return found
+
+    def match(self, signature):
+        """Returns [(key, similarity)] of indexed signatures above the threshold, best first."""
+        matches = []
+        for key in self.candidates(signature):
+            similarity = float(np.mean(self.signatures[key] == signature))
+            if similarity >= self.threshold:
+                matches.append((key, similarity))
+        return sorted(matches, key=lambda m: (-m[1], str(m[0])))
+
+# --- DETECTION ---
+
+def iter_asset_lessons(directories=ASSET_DIRECTORIES):
+    """Yields (path, lesson) for every top-level lesson file in source_rank order (pages are copies, so they are skipped)."""
+    paths = [path.replace(os.sep, '/') for folder in directories for path in glob.glob(os.path.join(folder, "*.json"))]
+    for path in sorted(paths, key=lambda path: source_rank(path, directories)):
+        try:
+            for lesson in json_io.iter_array(path): # one lesson in memory at a time
+                if lesson.get('id'): yield path, lesson
+        except Exception as e:
+            print(f"   ⚠️ Could not read {path}: {e}")
+
+def find_duplicates(lessons, threshold=THRESHOLD, cache=None):
+    """
+    Consumes an ordered iterable of (path, lesson) once. Returns (entries,
+    clusters): entries as (path, lesson_id, title, language), and clusters
+    as lists of (entry_index, similarity_to_kept) whose first member is the
+    copy that is kept (earliest entry). Only kept copies' signatures stay
+    in memory, never lesson bodies.
+    """
+    index = LSHIndex(threshold=threshold)
+    cache = {} if cache is None else cache
+    entries = []
+    kept_of = {}  # entry index -> index of the kept copy
+    clusters = {}
+
+    for i, (path, lesson) in enumerate(lessons):
+        entries.append((path, lesson['id'], lesson.get('title'), lesson.get('language')))
+        text = lesson_text(lesson)
+        digest = text_digest(text)
+        signature = cache.get(digest)
+        if signature is None:
+            hashes = shingle_hashes(text)
+            if hashes is None: continue
+            signature = minhash(hashes)
+            cache[digest] = signature
+
+        matches = index.match(signature)
+        if matches:
+            # Attach to the cluster of the best match; the new entry is not indexed,
+            # so every cluster is represented by its kept copy only
+            best, similarity = matches[0]
+            kept = kept_of[best]
+            clusters.setdefault(kept, [(kept, 1.0)]).append((i, similarity))
+            kept_of[i] = kept
+        else:
+            index.add(i, signature)
+            kept_of[i] = i
+
+    return entries, list(clusters.values())
+
+def suppressed_ids(entries, clusters):
+    """IDs to leave out of a sync: duplicates whose ID differs from the kept copy's ID."""
+    skip = set()
+    for cluster in clusters:
+        kept_id = str(entries[cluster[0][0]][1])
+        for i, _ in cluster[1:]:
+            lesson_id = str(entries[i][1])
+            if lesson_id != kept_id: skip.add(lesson_id)
+    return skip
+
+def build_report(entries, clusters, threshold=THRESHOLD):
+    def describe(i):
+        path, lesson_id, title, language = entries[i]
+        return {'id': lesson_id, 'path': path, 'title': title, 'language': language}
+
+    return {
+        'generatedAt': datetime.datetime.now().isoformat(),
+        'threshold': threshold,
+        'lessonsScanned': len(entries),
+        'clusters': [
+            {
+                'keep': describe(cluster[0][0]),
+                'duplicates': [dict(describe(i), similarity=round(sim, 3)) for i, sim in cluster[1:]],
+            }
+            for cluster in clusters
+        ],
+    }
+
+def detect_library_duplicates(directories=ASSET_DIRECTORIES, threshold=THRESHOLD, use_cache=True):
+    """Scans the local library. Returns (entries, clusters)."""
+    cache = load_signature_cache() if use_cache else {}
+    cached = len(cache)
+    entries, clusters = find_duplicates(iter_asset_lessons(directories), threshold, cache)
+    if use_cache and len(cache) != cached:
+        save_signature_cache(cache)
+    return entries, clusters
+
+def main():
+    parser = argparse.ArgumentParser(description="Reports near-duplicate lessons (MinHash + LSH) across all local sources.")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Estimated Jaccard similarity to count as duplicate")
+    parser.add_argument("--report", default=REPORT_FILE, help="Where to write the JSON report")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute every signature")
+    args = parser.parse_args()
+
+    print(f"\n{'='*60}")
+    print("🧬 NEAR-DUPLICATE SCAN STARTED")
+    print(f"{'='*60}\n")
+
+    start_time = time.time()
+    entries, clusters = detect_library_duplicates(threshold=args.threshold, use_cache=not args.no_cache)
+
+    for cluster in clusters:
+        kept_path, kept_id, kept_title, _ = entries[cluster[0][0]]
+        print(f"   🔗 KEEP {kept_id} ({kept_path}) {(kept_title or '')[:50]}")
+        for i, similarity in cluster[1:]:
+            path, lesson_id, _, _ = entries[i]
+            same = " [same id]" if lesson_id == kept_id else ""
+            print(f"      ≈ {similarity:.2f} {lesson_id} ({path}){same}")
+
+    report = build_report(entries, clusters, args.threshold)
+    os.makedirs(os.path.dirname(args.report) or ".", exist_ok=True)
+    with open(args.report, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    duplicates = sum(len(c) - 1 for c in clusters)
+    print(f"\n{'='*60}")
+    print(f"🎉 SCAN COMPLETE in {time.time() - start_time:.1f}s")
+    print(f"📚 Lessons scanned: {len(entries)}")
+    print(f"🔗 Duplicate clusters: {len(clusters)} ({duplicates} extra copies, "
+          f"{len(suppressed_ids(entries, clusters))} would be skipped by sync)")
+    print(f"📝 Report: {args.report}")
+    print(f"{'='*60}")
+
+if __name__ == "__main__":
+    main()
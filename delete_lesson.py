@@ -1,6 +1,7 @@
 import json
 from pathlib import Path
 import shutil
+import json_io
 
 # Path to the JSON file
 JSON_PATH = Path("assets/guided_courses/lessons_fr.json")
@@ -21,38 +22,31 @@ def main():
     shutil.copy(JSON_PATH, backup_path)
     print(f"Backup created at {backup_path}")
 
-    # 2. Read the data
-    with open(JSON_PATH, "r", encoding="utf-8") as f:
-        try:
-            lessons = json.load(f)
-        except json.JSONDecodeError:
-            print("Error: Failed to decode JSON. Check the file format.")
-            return
-
-    if not isinstance(lessons, list):
+    # 2. Stream the lessons through the filter (one lesson in memory at a time)
+    # We use .strip().lower() to ensure it catches "French the Natural Way" or " french the natural way"
+    removed_count = 0
+    def kept_lessons():
+        nonlocal removed_count
+        for lesson in json_io.iter_array(str(JSON_PATH)):
+            title = str(lesson.get(TITLE_KEY, "")).strip().lower()
+            if title.startswith(TITLE_PREFIX):
+                removed_count += 1
+            else:
+                yield lesson
+
+    # 3. Save the file (written to a temp file and swapped in, so errors leave it untouched)
+    try:
+        remaining_count = json_io.write_array(str(JSON_PATH), kept_lessons(), indent=2)
+    except json.JSONDecodeError:
+        print("Error: Failed to decode JSON. Check the file format.")
+        return
+    except ValueError:
         print("Error: Expected JSON root to be a list of lessons.")
         return
 
-    original_count = len(lessons)
-
-    # 3. Filter lessons
-    # We use .strip().lower() to ensure it catches "French the Natural Way" or " french the natural way"
-    filtered_lessons = []
-    for lesson in lessons:
-        title = str(lesson.get(TITLE_KEY, "")).strip().lower()
-        
-        if not title.startswith(TITLE_PREFIX):
-            filtered_lessons.append(lesson)
-
-    removed_count = original_count - len(filtered_lessons)
-
-    # 4. Save the file
-    with open(JSON_PATH, "w", encoding="utf-8") as f:
-        json.dump(filtered_lessons, f, ensure_ascii=False, indent=2)
-
     print(f"--- Process Complete ---")
     print(f"Removed: {removed_count} lesson(s).")
-    print(f"Remaining: {len(filtered_lessons)} lesson(s).")
+    print(f"Remaining: {remaining_count} lesson(s).")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
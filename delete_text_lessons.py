@@ -1,13 +1,12 @@
-import firebase_admin
-from firebase_admin import credentials
-from firebase_admin import firestore
 import os
+import argparse
+import metrics
+import firebase_app
+import bulk_delete
 
 # --- CONFIGURATION ---
 # The specific ID used in your creation script
 TARGET_USER_ID = "system_gutenberg" 
-# The collection name in Firestore
-COLLECTION_NAME = "lessons"
 # Path to your downloaded Firebase key
 SERVICE_KEY_PATH = "serviceAccountKey.json"
 
@@ -20,43 +19,19 @@ def initialize_firebase():
         print("3. Save it in this folder as 'serviceAccountKey.json'")
         exit(1)
 
-    cred = credentials.Certificate(SERVICE_KEY_PATH)
-    firebase_admin.initialize_app(cred)
-    return firestore.client()
+    return firebase_app.client(SERVICE_KEY_PATH)
 
-def delete_collection_by_query(db, batch_size=400):
-    """Deletes documents matching the query in batches."""
-    coll_ref = db.collection(COLLECTION_NAME)
-    # Query strictly for lessons created by the gutenberg script
-    query = coll_ref.where("userId", "==", TARGET_USER_ID)
-    
-    total_deleted = 0
-    
+def delete_collection_by_query(db, batch_size=bulk_delete.BATCH_LESSONS):
+    """Deletes every lesson with TARGET_USER_ID and its summary (see bulk_delete.py)."""
     print(f"🔍 Searching for lessons with userId: '{TARGET_USER_ID}'...")
+    total_deleted, failed = bulk_delete.delete_matching(db, batch_lessons=batch_size, user_id=TARGET_USER_ID)
 
-    while True:
-        # Get a batch of documents
-        docs = list(query.limit(batch_size).stream())
-        deleted_count = 0
-
-        if not docs:
-            break
-
-        batch = db.batch()
-        for doc in docs:
-            print(f"   - Marking for deletion: {doc.id}")
-            batch.delete(doc.reference)
-            deleted_count += 1
-
-        # Commit the batch
-        batch.commit()
-        total_deleted += deleted_count
-        print(f"🗑️  Committed batch of {deleted_count} deletions...")
-
-    if total_deleted == 0:
+    if total_deleted == 0 and not failed:
         print("✅ No lessons found to delete.")
     else:
         print(f"✅ Successfully deleted {total_deleted} lessons from Firestore.")
+    if failed:
+        print(f"❌ {failed} lessons could not be deleted (re-run to retry).")
 
 def clean_local_files():
     """Optional: Cleans the generated JSON files locally."""
@@ -71,7 +46,10 @@ def clean_local_files():
                     print(f"   Deleted local file: {filename}")
             print("✅ Local cleanup complete.")
 
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description=f"Deletes every Firestore lesson (and its summary) where userId='{TARGET_USER_ID}'.")
+    parser.parse_args()
+    metrics.start_run("delete_text_lessons")
     print("==========================================")
     print("🔥 FIREBASE LESSON CLEANUP TOOL 🔥")
     print("==========================================")
@@ -90,4 +68,7 @@ if __name__ == "__main__":
         # 4. Ask about local files
         clean_local_files()
     else:
-        print("❌ Operation cancelled.")
\ No newline at end of file
+        print("❌ Operation cancelled.")
+
+if __name__ == "__main__":
+    main()
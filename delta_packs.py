@@ -0,0 +1,186 @@
+import os
+import json
+import gzip
+import glob
+import time
+import hashlib
+import argparse
+import datetime
+import catalog
+import json_io
+
+# --- CONFIGURATION ---
+# Versioned delta packs for over-the-air content updates. Every build that
+# finds changed content publishes version N+1 with:
+#
+#   delta-000041-000042.json.gz   added / changed lessons + removed IDs
+#   full-000042.json.gz           whole library (new installs, very old clients)
+#   manifest.json                 the chain: versions, pack files, sha256, sizes
+#
+# A client on version N downloads the manifest, then only the packs from N
+# to the latest (see plan_updates). The output directory is also the state:
+# snapshot.json holds the {id: hash} of the latest version, so keep it
+# between builds (it is what gets deployed).
+OUTPUT_DIR = "build/updates"
+MANIFEST_NAME = "manifest.json"
+SNAPSHOT_NAME = "snapshot.json"
+FORMAT_VERSION = 1
+MAX_CHAIN = 30  # older deltas are pruned; clients further behind take the full pack
+
+# --- DIFF ---
+
+def diff_snapshots(old_hashes, snapshot):
+    """Returns (added, changed, removed) between {id: hash} and a new snapshot."""
+    added, changed = [], []
+    for lesson_id in sorted(snapshot):
+        digest, lesson = snapshot[lesson_id]
+        if lesson_id not in old_hashes: added.append(lesson)
+        elif old_hashes[lesson_id] != digest: changed.append(lesson)
+    removed = sorted(old_hashes.keys() - snapshot.keys())
+    return added, changed, removed
+
+# --- PACK FILES ---
+
+def write_pack(path, payload):
+    """Writes gzipped JSON (byte-stable) and returns (sha256, bytes)."""
+    data = gzip.compress(
+        json.dumps(payload, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8'),
+        compresslevel=9, mtime=0)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return hashlib.sha256(data).hexdigest(), len(data)
+
+def read_json(path, default):
+    if not os.path.exists(path): return default
+    return json_io.load(path)
+
+def write_json_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+def delta_name(parent, version):
+    return f"delta-{parent:06d}-{version:06d}.json.gz"
+
+def full_name(version):
+    return f"full-{version:06d}.json.gz"
+
+# --- BUILD ---
+
+def build_version(output_dir=OUTPUT_DIR, keep=MAX_CHAIN):
+    """Publishes a new version if the library changed. Returns the manifest entry or None."""
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    snapshot_path = os.path.join(output_dir, SNAPSHOT_NAME)
+
+    manifest = read_json(manifest_path, {'format': FORMAT_VERSION, 'latest': 0, 'versions': []})
+    old_hashes = read_json(snapshot_path, {}).get('hashes', {})
+
+    conn = catalog.open_catalog()
+    snapshot = catalog.library_snapshot(conn)
+    conn.close()
+
+    added, changed, removed = diff_snapshots(old_hashes, snapshot)
+    if not (added or changed or removed):
+        return None
+
+    parent = manifest['latest']
+    version = parent + 1
+    created_at = datetime.datetime.now().isoformat()
+
+    # 1. Packs first, manifest last: clients never see a version whose files are missing
+    delta_sha, delta_bytes = write_pack(os.path.join(output_dir, delta_name(parent, version)), {
+        'from': parent, 'to': version, 'createdAt': created_at,
+        'added': added, 'changed': changed, 'removed': removed,
+    })
+    lessons = [snapshot[i][1] for i in sorted(snapshot)]
+    full_sha, full_bytes = write_pack(os.path.join(output_dir, full_name(version)), {
+        'version': version, 'createdAt': created_at, 'lessons': lessons,
+    })
+
+    entry = {
+        'version': version, 'parent': parent, 'createdAt': created_at,
+        'file': delta_name(parent, version), 'sha256': delta_sha, 'bytes': delta_bytes,
+        'added': len(added), 'changed': len(changed), 'removed': len(removed),
+    }
+    manifest['versions'] = (manifest['versions'] + [entry])[-keep:]
+    manifest['latest'] = version
+    manifest['full'] = {
+        'version': version, 'file': full_name(version), 'sha256': full_sha,
+        'bytes': full_bytes, 'count': len(lessons),
+    }
+    manifest['updatedAt'] = created_at
+
+    # Snapshot only after the manifest: if the run dies in between, the next
+    # one diffs against the previous version again, and its delta repeats
+    # this one's changes instead of clients missing them
+    write_json_atomic(manifest_path, manifest)
+    write_json_atomic(snapshot_path, {'version': version, 'hashes': {i: snapshot[i][0] for i in sorted(snapshot)}})
+
+    # 2. Drop packs no longer referenced by the manifest
+    referenced = {v['file'] for v in manifest['versions']} | {manifest['full']['file']}
+    for path in glob.glob(os.path.join(output_dir, "*.json.gz")):
+        if os.path.basename(path) not in referenced:
+            os.remove(path)
+    return entry
+
+# --- CLIENT PLAN ---
+
+def plan_updates(manifest, from_version):
+    """
+    Files a client on `from_version` should fetch, in order. Falls back to
+    the full pack when the chain no longer reaches back that far, or when
+    the deltas would be larger than the full pack.
+    """
+    if from_version >= manifest['latest']: return []
+    chain = [v for v in manifest['versions'] if v['parent'] >= from_version]
+    if not chain or chain[0]['parent'] != from_version:
+        return [manifest['full']]
+    if sum(v['bytes'] for v in chain) >= manifest['full']['bytes']:
+        return [manifest['full']]
+    return chain
+
+def main():
+    parser = argparse.ArgumentParser(description="Builds versioned delta packs + manifest chain for content updates.")
+    parser.add_argument("--output", default=OUTPUT_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Publish a new version if the library changed")
+    build.add_argument("--keep", type=int, default=MAX_CHAIN, help="Delta packs to keep in the chain")
+    plan = sub.add_parser("plan", help="Show what a client on a given version would download")
+    plan.add_argument("--from", dest="from_version", type=int, required=True)
+    args = parser.parse_args()
+
+    if args.command == "plan":
+        manifest = read_json(os.path.join(args.output, MANIFEST_NAME), None)
+        if not manifest:
+            print(f"❌ No manifest in {args.output}. Run 'build' first.")
+            return
+        files = plan_updates(manifest, args.from_version)
+        for f in files:
+            print(f"   ⬇️  {f['file']} ({f['bytes'] / 1024:.1f} KB)")
+        total = sum(f['bytes'] for f in files)
+        print(f"\nv{args.from_version} -> v{manifest['latest']}: {len(files)} files, {total / 1024:.1f} KB "
+              f"(full library: {manifest['full']['bytes'] / 1024:.1f} KB)")
+        return
+
+    print(f"\n{'='*60}")
+    print("📦 DELTA PACK BUILD STARTED")
+    print(f"{'='*60}\n")
+
+    start_time = time.time()
+    entry = build_version(args.output, args.keep)
+
+    print(f"\n{'='*60}")
+    if entry is None:
+        print(f"💤 No content changes, no new version ({time.time() - start_time:.1f}s)")
+    else:
+        print(f"🎉 Published v{entry['version']} in {time.time() - start_time:.1f}s")
+        print(f"➕ Added: {entry['added']}   ✏️  Changed: {entry['changed']}   ➖ Removed: {entry['removed']}")
+        print(f"📦 Delta: {entry['file']} ({entry['bytes'] / 1024:.1f} KB)")
+    print(f"{'='*60}")
+
+if __name__ == "__main__":
+    main()
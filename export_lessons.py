@@ -0,0 +1,227 @@
+import os
+import sys
+import gzip
+import time
+import base64
+import hashlib
+import argparse
+import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import metrics
+import json_io
+import firebase_app
+from lesson_summaries import LESSONS_COLLECTION
+
+# --- CONFIGURATION ---
+# Full export of the `lessons` collection to gzipped JSON Lines shards:
+#
+#   python export_lessons.py                          # exports/lessons-<timestamp>/
+#   python export_lessons.py --partitions 64 --workers 16
+#   python export_lessons.py --resume exports/lessons-20250101-120000
+#
+# Firestore splits the collection into ID ranges (partition_query), and each
+# range is streamed by its own worker into part-NNNNN.jsonl.gz, one
+# {"id": ..., "data": {...}} object per line. Workers hold one document at a
+# time, so memory stays flat however big the collection is.
+#
+# manifest.json records the partition boundaries and every finished shard
+# (documents, bytes, sha256 of the uncompressed lines). A shard is written to
+# .tmp and renamed when complete, so --resume re-reads only the ranges that
+# never finished, using the same boundaries as the first run.
+SERVICE_ACCOUNT_FILE = "serviceAccountKey.json"
+COLLECTION_NAME = LESSONS_COLLECTION
+EXPORT_DIR = "exports"
+MANIFEST_FILE = "manifest.json"
+
+PARTITIONS = 32         # ID ranges requested from Firestore (it may return fewer)
+WORKERS = 8             # shards streamed concurrently
+MAX_RETRIES = 3         # per shard; a retry restarts the shard
+BACKOFF_SECONDS = 2
+COMPRESS_LEVEL = 6
+
+DOCUMENT_ID = "__name__" # FieldPath.document_id()
+
+def initialize_firebase():
+    """Initializes Firebase Admin SDK."""
+    if not os.path.exists(SERVICE_ACCOUNT_FILE):
+        print(f"\n❌ ERROR: '{SERVICE_ACCOUNT_FILE}' not found.")
+        sys.exit(1)
+
+    try:
+        return firebase_app.client(SERVICE_ACCOUNT_FILE)
+    except Exception as e:
+        print(f"\n❌ FIREBASE AUTH ERROR: {e}")
+        sys.exit(1)
+
+def shard_name(index):
+    return f"part-{index:05d}.jsonl.gz"
+
+def export_value(value):
+    """JSON form of the Firestore types json can't encode (timestamps, references, geo points, bytes)."""
+    if isinstance(value, datetime.datetime): return value.isoformat()
+    if isinstance(value, bytes): return base64.b64encode(value).decode('ascii')
+    if hasattr(value, 'latitude'): return {'latitude': value.latitude, 'longitude': value.longitude}
+    if hasattr(value, 'path'): return value.path
+    raise TypeError(f"Cannot export {type(value).__name__}")
+
+# --- PARTITIONS ---
+
+def plan_partitions(db, count=PARTITIONS):
+    """Document paths that split the collection into ~`count` ranges (the shard boundaries)."""
+    if count <= 1: return []
+    with metrics.timer("firestore_read"):
+        partitions = list(db.collection_group(COLLECTION_NAME).get_partitions(count))
+    metrics.firestore_read()
+    return [partition.end_at.path for partition in partitions if partition.end_at is not None]
+
+def shard_query(db, boundaries, index):
+    """Shard `index` covers [boundaries[index-1], boundaries[index]) in document-ID order."""
+    query = db.collection_group(COLLECTION_NAME).order_by(DOCUMENT_ID)
+    if index > 0:
+        query = query.start_at({DOCUMENT_ID: db.document(boundaries[index - 1])})
+    if index < len(boundaries):
+        query = query.end_before({DOCUMENT_ID: db.document(boundaries[index])})
+    return query
+
+# --- SHARDS ---
+
+def write_shard(db, boundaries, index, out_dir, compress_level=COMPRESS_LEVEL):
+    """Streams one range to its shard file. Returns the shard's manifest entry."""
+    path = os.path.join(out_dir, shard_name(index))
+    tmp_path = path + ".tmp"
+    digest = hashlib.sha256()
+    docs = 0
+    try:
+        with gzip.open(tmp_path, 'wb', compresslevel=compress_level) as f, metrics.timer("firestore_read"):
+            for doc in shard_query(db, boundaries, index).stream():
+                # The collection group also matches subcollections named `lessons`
+                if doc.reference.path.count('/') != 1: continue
+                line = json_io.dumps_bytes({'id': doc.id, 'data': doc.to_dict()}, default=export_value) + b"\n"
+                f.write(line)
+                digest.update(line)
+                docs += 1
+    except BaseException:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    metrics.firestore_read(max(docs, 1))
+    size = os.path.getsize(path)
+    metrics.add_bytes("export", size)
+    return {'docs': docs, 'bytes': size, 'sha256': digest.hexdigest(),
+            'completedAt': datetime.datetime.now().isoformat()}
+
+def export_shard(db, boundaries, index, out_dir, max_retries=MAX_RETRIES, backoff=BACKOFF_SECONDS):
+    for attempt in range(max_retries + 1):
+        try:
+            return write_shard(db, boundaries, index, out_dir)
+        except Exception as e:
+            if attempt == max_retries: raise
+            print(f"   ⚠️ {shard_name(index)}: {e} (retrying)")
+            time.sleep(backoff * 2 ** attempt)
+
+# --- MANIFEST ---
+
+def load_manifest(out_dir):
+    path = os.path.join(out_dir, MANIFEST_FILE)
+    return json_io.load(path) if os.path.exists(path) else None
+
+def save_manifest(out_dir, manifest):
+    json_io.dump(os.path.join(out_dir, MANIFEST_FILE), manifest, indent=2)
+
+def new_manifest(boundaries):
+    return {
+        'collection': COLLECTION_NAME,
+        'startedAt': datetime.datetime.now().isoformat(),
+        'completedAt': None,
+        'boundaries': boundaries,
+        'shardCount': len(boundaries) + 1,
+        'docs': 0,
+        'shards': {},
+    }
+
+def export(db, out_dir, partitions=PARTITIONS, workers=WORKERS, resume=False):
+    """
+    Exports the collection into `out_dir`. With `resume`, shards listed in
+    an existing manifest are kept and only the rest are exported.
+    Returns the manifest.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir)
+    if manifest and not resume:
+        raise FileExistsError(f"{out_dir} already holds an export (use --resume to finish it)")
+    if manifest is None:
+        manifest = new_manifest(plan_partitions(db, partitions))
+        save_manifest(out_dir, manifest)
+
+    boundaries = manifest['boundaries']
+    todo = [i for i in range(manifest['shardCount']) if shard_name(i) not in manifest['shards']]
+    print(f"📦 {manifest['shardCount']} shards, {len(todo)} to export with {workers} workers.")
+
+    failed = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(export_shard, db, boundaries, i, out_dir): i for i in todo}
+        for future in as_completed(futures):
+            name = shard_name(futures[future])
+            try:
+                entry = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"   ❌ {name}: {e}")
+                continue
+            manifest['shards'][name] = entry
+            manifest['docs'] = sum(shard['docs'] for shard in manifest['shards'].values())
+            save_manifest(out_dir, manifest)
+            print(f"   ✅ {name}: {entry['docs']:,} docs, {entry['bytes'] / 1024:,.0f} KB")
+
+    if not failed:
+        manifest['completedAt'] = datetime.datetime.now().isoformat()
+        save_manifest(out_dir, manifest)
+    return manifest
+
+def iter_export(out_dir):
+    """Yields (lesson_id, data) from a finished export, shard by shard."""
+    manifest = load_manifest(out_dir)
+    for name in sorted(manifest['shards']):
+        with gzip.open(os.path.join(out_dir, name), 'rb') as f:
+            for line in f:
+                record = json_io.loads(line)
+                yield record['id'], record['data']
+
+def main():
+    parser = argparse.ArgumentParser(description="Exports the Firestore lessons collection to gzipped JSONL shards.")
+    parser.add_argument("--out", help=f"Output directory (default: {EXPORT_DIR}/lessons-<timestamp>)")
+    parser.add_argument("--resume", metavar="DIR", help="Finish an interrupted export in DIR")
+    parser.add_argument("--partitions", type=int, default=PARTITIONS, help="ID ranges to split the collection into")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Shards exported concurrently")
+    args = parser.parse_args()
+    metrics.start_run("export_lessons")
+
+    out_dir = args.resume or args.out or os.path.join(
+        EXPORT_DIR, f"lessons-{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}")
+
+    print(f"\n{'='*60}")
+    print(f"📤 LESSONS EXPORT -> {out_dir}")
+    print(f"{'='*60}\n")
+
+    db = initialize_firebase()
+    start_time = time.time()
+    try:
+        manifest = export(db, out_dir, args.partitions, args.workers, resume=bool(args.resume))
+    except FileExistsError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    elapsed = time.time() - start_time
+    total_bytes = sum(shard['bytes'] for shard in manifest['shards'].values())
+    print(f"\n{'='*60}")
+    print(f"🎉 EXPORT {'COMPLETE' if manifest['completedAt'] else 'INCOMPLETE'} in {elapsed:.1f}s")
+    print(f"📄 Documents: {manifest['docs']:,} in {len(manifest['shards'])}/{manifest['shardCount']} shards "
+          f"({total_bytes / (1024 * 1024):,.1f} MB)")
+    if not manifest['completedAt']:
+        print(f"🔁 Re-run with --resume {out_dir} to export the missing shards.")
+    print(f"{'='*60}")
+    if not manifest['completedAt']:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,18 @@
+# --- FIREBASE ---
+# Every script reaches Firestore through here. firebase_admin (and grpc
+# behind it) is imported on the first call, not when a script is imported,
+# so helpers, `--help` and the load-test fakes need no credentials.
+
+SERVICE_ACCOUNT_FILE = "serviceAccountKey.json"
+
+def client(service_account_file=SERVICE_ACCOUNT_FILE):
+    """Firestore client of the default app (initialised on the first call). Raises if the key is missing or invalid."""
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app(credentials.Certificate(service_account_file))
+    return firestore.client()
+
+def server_timestamp():
+    from firebase_admin import firestore
+    return firestore.SERVER_TIMESTAMP
@@ -2,72 +2,399 @@ import subprocess
 import sys
 import time
 import os
+import re
+import hashlib
+import argparse
+import threading
+import metrics
+import json_io
+import profiling
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
-# List of scripts to run in order.
-SCRIPTS = [
+# --- PIPELINE DEFINITION ---
+# Each stage declares the local paths it reads (inputs) and writes (outputs).
+# A stage depends on every other stage that writes one of its inputs, or
+# that is listed in "after". Stages without dependencies run in parallel.
+#
+# Stages with local inputs are skipped when those inputs are unchanged
+# since the last successful run. Stages with no local inputs (remote
+# sources: Gutenberg, LibriVox, YouTube...) always run when selected.
+STAGES = {
     # 1. GENERATION PHASE (Creates local JSONs)
-    # "generate_guided_courses.py",           
-    "generate_audio_library.py",   
-    "generate_audio_lessons.py",
-    # "generate_beginner_books.py",   
-     "generate_books.py",            
-    "generate_course_content.py",   
-    "generate_native_content.py",   
-     "generate_yt_audiobooks.py",
-    
+    "books": {
+        "script": "generate_books.py",
+        "inputs": [],
+        "outputs": ["assets/text_lessons"],
+    },
+    "audio_library": {
+        "script": "generate_audio_library.py",
+        "inputs": [],
+        "outputs": ["assets/audio_library"],
+    },
+    "storybooks": {
+        "script": "generate_storybook_lessons.py",
+        "inputs": ["asp-source"],
+        "outputs": ["assets/storybooks_lessons"],
+    },
+    "graded_readers": {
+        # Merges OPUS sets into the storybooks files, so it runs after them
+        "script": "generate_graded_readers.py",
+        "inputs": ["opus_books"],
+        "outputs": ["assets/storybooks_lessons"],
+        "after": ["storybooks"],
+    },
+    "course_content": {
+        "script": "generate_course_content.py",
+        "inputs": [],
+        "outputs": ["assets/course_videos"],
+    },
+
+    # YouTube ingesters that upload straight to Firestore
+    "native_videos": {
+        "script": "generate_native_videos.py",
+        "inputs": [],
+        "outputs": [],
+    },
+    "yt_audiobooks": {
+        "script": "generate_yt_audiobooks.py",
+        "inputs": [],
+        "outputs": [],
+    },
+
+    "related": {
+        "script": "related_lessons.py",
+        "inputs": [
+            "assets/guided_courses",
+            "assets/native_videos",
+            "assets/course_videos",
+            "assets/storybooks_lessons",
+            "assets/audio_library",
+            "assets/youtube_audio_library",
+            "assets/text_lessons",
+            "assets/beginner_books",
+        ],
+        "outputs": [".cache/related_lessons.json"],
+    },
+
     # 2. UPLOAD PHASE (Syncs to Firebase)
-    "sync_to_firebase.py" 
-]
+    "sync": {
+        "script": "sync_to_firebase.py",
+        "args": ["--skip-near-duplicates"],
+        "inputs": [
+            "assets/guided_courses",
+            "assets/native_videos",
+            "assets/audio_library",
+            "assets/youtube_audio_library",
+            "assets/text_lessons",
+            "assets/beginner_books",
+            ".cache/related_lessons.json",
+        ],
+        "outputs": [],
+    },
+    "search_index": {
+        "script": "search_index.py",
+        "args": ["build"],
+        "inputs": [
+            "assets/guided_courses",
+            "assets/native_videos",
+            "assets/course_videos",
+            "assets/storybooks_lessons",
+            "assets/audio_library",
+            "assets/youtube_audio_library",
+            "assets/text_lessons",
+            "assets/beginner_books",
+        ],
+        "outputs": ["search_index.db"],
+    },
+    "delta_packs": {
+        "script": "delta_packs.py",
+        "args": ["build"],
+        "inputs": [
+            "assets/guided_courses",
+            "assets/native_videos",
+            "assets/course_videos",
+            "assets/storybooks_lessons",
+            "assets/audio_library",
+            "assets/youtube_audio_library",
+            "assets/text_lessons",
+            "assets/beginner_books",
+        ],
+        "outputs": ["build/updates"],
+    },
+    "cdn_export": {
+        "script": "cdn_export.py",
+        "inputs": [
+            "assets/guided_courses",
+            "assets/native_videos",
+            "assets/course_videos",
+            "assets/storybooks_lessons",
+            "assets/audio_library",
+            "assets/youtube_audio_library",
+            "assets/text_lessons",
+            "assets/beginner_books",
+        ],
+        "outputs": ["build/web/content"],
+    },
+    "home_feeds": {
+        # Reads lesson_summaries, so it waits for every stage that uploads
+        "script": "build_home_feeds.py",
+        "inputs": [],
+        "outputs": [],
+        "after": ["sync", "native_videos", "yt_audiobooks"],
+    },
+}
 
-def run_script(script_name):
-    """Runs a single python script and tracks time/errors."""
-    
-    if not os.path.exists(script_name):
-        print(f"\n❌ SKIPPING: {script_name} (File not found)")
-        return
+STATE_FILE = ".cache/pipeline_state.json"
+PRINT_LOCK = threading.Lock()
 
-    print(f"\n{'='*60}")
-    print(f"🚀 STARTING: {script_name}")
-    print(f"{'='*60}\n")
+# --- DAG HELPERS ---
+
+def build_dependencies(stages):
+    """Returns {stage: set(upstream stages)} from declared inputs/outputs and "after"."""
+    producers = {}
+    for name, stage in stages.items():
+        for path in stage.get('outputs', []):
+            producers.setdefault(os.path.normpath(path), set()).add(name)
+
+    deps = {}
+    for name, stage in stages.items():
+        upstream = set(stage.get('after', []))
+        for path in stage.get('inputs', []):
+            upstream |= producers.get(os.path.normpath(path), set())
+        upstream.discard(name)
+        deps[name] = upstream
+    return deps
+
+def topological_order(deps):
+    order, done = [], set()
+    while len(order) < len(deps):
+        ready = sorted(n for n in deps if n not in done and deps[n] <= done)
+        if not ready:
+            cycle = sorted(n for n in deps if n not in done)
+            raise ValueError(f"Dependency cycle between stages: {', '.join(cycle)}")
+        order.extend(ready)
+        done.update(ready)
+    return order
+
+# --- CHANGE DETECTION ---
+
+def iter_files(paths):
+    for path in paths:
+        if os.path.isfile(path):
+            yield path
+        elif os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+                for filename in sorted(files):
+                    yield os.path.join(root, filename)
+
+def fingerprint(paths):
+    """Cheap content fingerprint of a set of paths (path + size + mtime of every file)."""
+    digest = hashlib.sha1()
+    for file_path in iter_files(paths):
+        st = os.stat(file_path)
+        digest.update(f"{file_path}|{st.st_size}|{st.st_mtime_ns}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+def newest_mtime(paths):
+    return max((os.stat(p).st_mtime for p in iter_files(paths)), default=0)
+
+def parse_since(value):
+    """Accepts an ISO date/time or a relative age such as 30m, 6h, 2d."""
+    match = re.fullmatch(r"(\d+)([mhd])", value.strip())
+    if match:
+        unit = {'m': 'minutes', 'h': 'hours', 'd': 'days'}[match.group(2)]
+        return (datetime.now() - timedelta(**{unit: int(match.group(1))})).timestamp()
+    return datetime.fromisoformat(value).timestamp()
+
+def load_state():
+    if not os.path.exists(STATE_FILE): return {}
+    try:
+        return json_io.load(STATE_FILE)
+    except: return {}
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    json_io.dump(STATE_FILE, state, indent=2)
+
+def needs_run(name, stage, state, since=None):
+    """Returns (should_run, reason, input_fingerprint)."""
+    inputs = stage.get('inputs', [])
+    if not inputs:
+        return True, "remote source", None
+
+    current = fingerprint(inputs)
+    if since is not None:
+        if newest_mtime(inputs) > since:
+            return True, "inputs changed since --since", current
+        return False, "inputs unchanged since --since", current
+
+    if state.get(name, {}).get('inputs') != current:
+        return True, "inputs changed", current
+    return False, "inputs unchanged", current
+
+# --- EXECUTION ---
+
+def log(name, message):
+    with PRINT_LOCK:
+        print(f"[{name}] {message}", flush=True)
+
+def run_script(name, script_name, script_args=()):
+    """Runs a single python script, prefixing its output. Returns True on success."""
+    if not os.path.exists(script_name):
+        log(name, f"❌ SKIPPING: {script_name} (File not found)")
+        return False
 
-    start_time = time.time()
+    # sys.executable ensures we use the same Python environment
+    proc = subprocess.Popen(
+        [sys.executable, "-u", script_name, *script_args],
+        stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        stdin=subprocess.DEVNULL, text=True, encoding='utf-8', errors='replace',
+    )
+    for line in proc.stdout:
+        log(name, line.rstrip('\n'))
+    return proc.wait() == 0
 
+def stage_report(script_name, started):
+    """The run report a stage's script wrote (see metrics.py), if it wrote one during this run."""
+    path = metrics.report_path(os.path.splitext(os.path.basename(script_name))[0])
+    if not os.path.exists(path) or os.path.getmtime(path) < started: return None
     try:
-        # sys.executable ensures we use the same Python environment 
-        subprocess.run([sys.executable, script_name], check=True)
-        
-        elapsed = time.time() - start_time
-        minutes = int(elapsed // 60)
-        seconds = int(elapsed % 60)
-        print(f"\n✅ COMPLETED: {script_name} in {minutes}m {seconds}s")
-        
-    except subprocess.CalledProcessError:
-        print(f"\n❌ FAILED: {script_name} exited with an error.")
-        # Optional: Stop entire pipeline on failure?
-        # sys.exit(1) 
-    except KeyboardInterrupt:
-        print(f"\n🛑 STOPPED: Process interrupted by user.")
-        sys.exit(1)
-    except Exception as e:
-        print(f"\n❌ ERROR: An unexpected error occurred: {e}")
+        return json_io.load(path)
+    except Exception: return None
+
+def counter_total(report, name):
+    return sum(s['value'] for s in report.get('counters', {}).get(name, []))
+
+def format_duration(seconds):
+    return f"{int(seconds // 60)}m {seconds % 60:04.1f}s"
 
 def main():
-    total_start = time.time()
-    
+    parser = argparse.ArgumentParser(description="Runs the generation & sync pipeline as a dependency graph.")
+    parser.add_argument("--only", type=str, help="Comma-separated stage names to run (others are left untouched)")
+    parser.add_argument("--since", type=str, help="Treat inputs as changed only if modified after this time (ISO date or 30m/6h/2d)")
+    parser.add_argument("--force", action="store_true", help="Run selected stages even if their inputs are unchanged")
+    parser.add_argument("--dry-run", action="store_true", help="Print the plan without running anything")
+    parser.add_argument("--jobs", type=int, default=4, help="Max stages running at once")
+    parser.add_argument("--list", action="store_true", help="List stages and their dependencies")
+    parser.add_argument("--profile", action="store_true", help="Run every stage that supports it with --profile (see profiling.py)")
+    args = parser.parse_args()
+
+    deps = build_dependencies(STAGES)
+    order = topological_order(deps)
+
+    if args.list:
+        for name in order:
+            upstream = ", ".join(sorted(deps[name])) or "-"
+            print(f"{name:16} {STAGES[name]['script']:34} after: {upstream}")
+        return
+
+    selected = set(order)
+    if args.only:
+        selected = {s.strip() for s in args.only.split(',') if s.strip()}
+        unknown = selected - set(STAGES)
+        if unknown:
+            sys.exit(f"❌ Unknown stage(s): {', '.join(sorted(unknown))}. Use --list.")
+
+    since = parse_since(args.since) if args.since else None
+    state = load_state()
+
     print("--- 📦 STARTING GENERATION & SYNC PIPELINE ---")
-    print(f"--- Queue: {len(SCRIPTS)} scripts ---\n")
+    print(f"--- Stages: {len(selected)} selected of {len(order)} ---\n")
+
+    results = {}  # name -> (status, seconds)
+    pending = [n for n in order if n in selected]
+    for name in order:
+        if name not in selected: results[name] = ("not selected", 0.0)
 
-    for script in SCRIPTS:
-        run_script(script)
-        time.sleep(1) 
+    if args.dry_run:
+        for name in pending:
+            upstream = ", ".join(sorted(deps[name] & selected)) or "-"
+            run, reason, _ = needs_run(name, STAGES[name], state, since)
+            action = "RUN " if (run or args.force) else "SKIP"
+            print(f"  {action} {name:16} ({reason}) after: {upstream}")
+        print("\n(dry run, nothing executed)")
+        return
+
+    metrics.start_run("generate_all")
+    if args.profile:
+        os.environ[profiling.PROFILE_ENV] = "1" # Inherited by every stage's subprocess
+    total_start = time.time()
+    running = {}
+    reports = {}
+    failed = set()
+
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        while pending or running:
+            # Launch every stage whose selected upstream stages are finished
+            for name in list(pending):
+                upstream = deps[name] & selected
+                if upstream & failed:
+                    results[name] = ("blocked", 0.0)
+                    failed.add(name)
+                    pending.remove(name)
+                    continue
+                if any(u in pending or u in running for u in upstream):
+                    continue
+                pending.remove(name)
+
+                run, reason, current = needs_run(name, STAGES[name], state, since)
+                if not (run or args.force):
+                    log(name, f"⏭️  SKIPPED ({reason})")
+                    results[name] = ("skipped", 0.0)
+                    continue
+
+                log(name, f"🚀 STARTING: {STAGES[name]['script']} ({reason})")
+                started = time.time()
+                future = pool.submit(run_script, name, STAGES[name]['script'], STAGES[name].get('args', []))
+                running[name] = (future, started, current)
+
+            if not running:
+                continue
+
+            done, _ = wait([f for f, _, _ in running.values()], return_when=FIRST_COMPLETED)
+            for name in [n for n, (f, _, _) in running.items() if f in done]:
+                future, started, current = running.pop(name)
+                elapsed = time.time() - started
+                reports[name] = stage_report(STAGES[name]['script'], started)
+                try: ok = future.result()
+                except Exception as e:
+                    log(name, f"❌ ERROR: An unexpected error occurred: {e}")
+                    ok = False
+
+                metrics.observe("pipeline_stage_seconds", elapsed, stage=name, status="ok" if ok else "failed")
+                if ok:
+                    log(name, f"✅ COMPLETED in {format_duration(elapsed)}")
+                    results[name] = ("ok", elapsed)
+                    # Record the fingerprint the stage actually consumed
+                    state[name] = {'inputs': current, 'finishedAt': datetime.now().isoformat()}
+                    save_state(state)
+                else:
+                    log(name, f"❌ FAILED after {format_duration(elapsed)}")
+                    results[name] = ("failed", elapsed)
+                    failed.add(name)
 
     total_elapsed = time.time() - total_start
-    total_mins = int(total_elapsed // 60)
-    
+
     print(f"\n{'='*60}")
-    print(f"🎉 ALL TASKS FINISHED")
-    print(f"⏱️  Total Runtime: {total_mins} minutes")
+    print("⏱️  STAGE TIMINGS")
+    for name in order:
+        status, seconds = results[name]
+        if status == "not selected": continue
+        report = reports.get(name)
+        firestore = ""
+        if report:
+            reads, writes = counter_total(report, "firestore_reads_total"), counter_total(report, "firestore_writes_total")
+            metrics.count("stage_firestore_reads_total", reads, stage=name)
+            metrics.count("stage_firestore_writes_total", writes, stage=name)
+            if reads or writes: firestore = f"  🔥 {reads} reads / {writes} writes"
+        print(f"   {name:16} {status:8} {format_duration(seconds)}{firestore}")
     print(f"{'='*60}")
+    print(f"🎉 PIPELINE FINISHED in {format_duration(total_elapsed)}" + (f" ({len(failed)} failed)" if failed else ""))
+    print(f"{'='*60}")
+
+    if failed: sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -280,14 +280,19 @@
 
 
 
-import requests
-import json
 import os
 import xml.etree.ElementTree as ET
-import time
 import re
 import datetime
+import argparse
 from urllib.parse import quote
+from audio_probe import probe_durations
+import catalog
+import metrics
+import profiling
+from lazy_imports import lazy_import
+
+requests = lazy_import("requests")
 
 # --- CONFIGURATION ---
 OUTPUT_DIR = "assets/audio_library"
@@ -337,6 +342,7 @@ def fetch_tatoeba(lang_code, limit=5):
     
     try:
         res = requests.get(url, headers=get_headers(), timeout=10)
+        metrics.add_bytes("download", len(res.content))
         if res.status_code != 200: return []
         
         results = res.json().get('results', [])
@@ -415,7 +421,7 @@ def fetch_archive_courses(lang_code, lang_name):
                     "type": "audio",
                     "videoUrl": mp3_url,
                     "audioUrl": mp3_url,
-                    "duration": 300,
+                    "duration": 300, # Placeholder, replaced by probe_durations()
                     "difficulty": "advanced",
                     "genre": "course",
                     "sourceUrl": f"https://archive.org/details/{pid}",
@@ -439,6 +445,7 @@ def fetch_librivox(lang_code, lang_name):
         url = f"https://librivox.org/api/feed/audiobooks?format=json&title={q_obj['q']}&extended=1"
         try:
             res = requests.get(url, headers=get_headers(), timeout=15)
+            metrics.add_bytes("download", len(res.content))
             books = res.json().get('books', [])
             
             for book in books:
@@ -449,6 +456,7 @@ def fetch_librivox(lang_code, lang_name):
                 # Parse RSS for tracks
                 rss_url = f"https://librivox.org/rss/{book['id']}"
                 rss_res = requests.get(rss_url, headers=get_headers(), timeout=10)
+                metrics.add_bytes("download", len(rss_res.content))
                 root = ET.fromstring(rss_res.content)
                 
                 # Get Cover
@@ -479,6 +487,7 @@ def fetch_librivox(lang_code, lang_name):
                         "type": "audio",
                         "videoUrl": mp3_url,
                         "audioUrl": mp3_url,
+                        # Estimate only, replaced by probe_durations()
                         "duration": int(book.get('total_time_secs', 0) / len(tracks)),
                         "difficulty": "intermediate",
                         "genre": q_obj['g'],
@@ -494,33 +503,34 @@ def fetch_librivox(lang_code, lang_name):
 
 # --- MAIN EXECUTION ---
 def main():
+    parser = argparse.ArgumentParser(description="Collects Tatoeba and LibriVox audio lessons.")
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
 
+    metrics.start_run("generate_audio_library")
+    profiling.start(args.profile)
+    conn = catalog.open_catalog()
+
     # Process specific languages or all
     for code, name in LANGUAGES.items():
         print(f"\n🎧 Processing: {name} ({code})")
         filepath = os.path.join(OUTPUT_DIR, f"audio_{code}.json")
         
         # 1. LOAD EXISTING DATA (Append Mode)
-        existing_data = []
-        existing_ids = set()
-        
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-                    existing_ids = {x['id'] for x in existing_data}
-                print(f"    📂 Loaded {len(existing_data)} existing items.")
-            except:
-                print("    ⚠️ JSON error, starting fresh.")
+        existing_data = catalog.load_source(conn, filepath)
+        if existing_data:
+            print(f"    📂 Loaded {len(existing_data)} existing items.")
 
         new_items = []
 
         # 2. RUN SCRAPERS
         # A. Tatoeba (Quick sentences)
         print("    🔍 Scanning Tatoeba...")
-        new_items.extend(fetch_tatoeba(code, limit=5))
+        with metrics.timer("search", source="tatoeba"):
+            new_items.extend(fetch_tatoeba(code, limit=5))
         
         # B. Archive.org (Courses)
         # print("    🔍 Scanning Archive.org...")
@@ -528,19 +538,29 @@ def main():
         
         # C. LibriVox (Books)
         print("    🔍 Scanning LibriVox...")
-        new_items.extend(fetch_librivox(code, name))
+        with metrics.timer("search", source="librivox"):
+            new_items.extend(fetch_librivox(code, name))
 
         # 3. DEDUPLICATE & MERGE
         unique_new = []
+        seen_ids = set()
         for item in new_items:
-            if item['id'] not in existing_ids:
+            if item['id'] not in seen_ids and not catalog.has_lesson(conn, item['id'], source=filepath):
                 unique_new.append(item)
-                existing_ids.add(item['id'])
+                seen_ids.add(item['id'])
+            else:
+                metrics.reject("duplicate")
         
-        if unique_new:
-            final_list = existing_data + unique_new
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(final_list, f, ensure_ascii=False, indent=None)
+        # 4. PROBE REAL DURATIONS (Range requests, cached by URL)
+        final_list = existing_data + unique_new
+        with metrics.timer("probe"):
+            probed = probe_durations(final_list)
+        if probed:
+            print(f"    📏 Corrected duration on {probed} tracks.")
+
+        if unique_new or probed:
+            catalog.save_source(conn, filepath, final_list)
+            catalog.export_sources(conn, [filepath])
             print(f"    💾 Appended {len(unique_new)} new tracks. Total: {len(final_list)}")
         else:
             print("    💤 No new unique content found.")
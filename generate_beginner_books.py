@@ -1,8 +1,13 @@
-import requests
-import json
 import re
 import os
 import time
+import argparse
+import catalog
+import metrics
+import profiling
+from lazy_imports import lazy_import
+
+requests = lazy_import("requests")
 
 # --- CONFIGURATION ---
 OUTPUT_DIR = "assets/beginner_books"
@@ -151,18 +156,21 @@ def process_book(book_id, lang):
     url = f"https://www.gutenberg.org/cache/epub/{book_id}/pg{book_id}.txt"
     
     try:
-        response = requests.get(url, headers=get_headers(), timeout=20)
-        
-        # Handle redirects or errors
-        if response.status_code != 200:
-            # Fallback for some IDs that use different naming conventions
-            url_fallback = f"https://www.gutenberg.org/files/{book_id}/{book_id}-0.txt"
-            response = requests.get(url_fallback, headers=get_headers(), timeout=20)
+        with metrics.timer("download"):
+            response = requests.get(url, headers=get_headers(), timeout=20)
+            
+            # Handle redirects or errors
+            if response.status_code != 200:
+                # Fallback for some IDs that use different naming conventions
+                url_fallback = f"https://www.gutenberg.org/files/{book_id}/{book_id}-0.txt"
+                response = requests.get(url_fallback, headers=get_headers(), timeout=20)
             
         if response.status_code != 200:
             print(f"    ❌ Failed to download ID {book_id}")
+            metrics.reject("download_error")
             return []
             
+        metrics.add_bytes("download", len(response.content))
         # Ensure correct encoding (Gutenberg usually UTF-8, but sometimes ISO-8859-1)
         response.encoding = response.apparent_encoding
         full_text = response.text
@@ -170,10 +178,12 @@ def process_book(book_id, lang):
         title, author = extract_metadata(full_text)
         print(f"    📖 Processing: {title[:40]}... ({author})")
         
-        clean_content = clean_gutenberg_text(full_text)
+        with metrics.timer("parse"):
+            clean_content = clean_gutenberg_text(full_text)
         
         # Split into Parts
-        parts = chunk_text(clean_content)
+        with metrics.timer("parse"):
+            parts = chunk_text(clean_content)
         lessons = []
         
         for i, part in enumerate(parts):
@@ -212,12 +222,21 @@ def process_book(book_id, lang):
 
     except Exception as e:
         print(f"    ⚠️ Exception processing {book_id}: {e}")
+        metrics.reject("exception")
         return []
 
 def main():
+    parser = argparse.ArgumentParser(description="Downloads beginner Project Gutenberg books and splits them into text lessons.")
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
 
+    metrics.start_run("generate_beginner_books")
+    profiling.start(args.profile)
+    conn = catalog.open_catalog()
+
     for lang, ids in BEGINNER_CATALOG.items():
         print(f"\n==========================================")
         print(f" PROCESSING BEGINNER BOOKS: {lang.upper()}")
@@ -225,46 +244,28 @@ def main():
         
         filepath = os.path.join(OUTPUT_DIR, f"beginner_{lang}.json")
         
-        # 1. LOAD EXISTING DATA
-        existing_lessons = []
-        processed_book_ids = set()
-        
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    existing_lessons = json.load(f)
-                    
-                # Extract Book IDs from lesson IDs to avoid re-downloading
-                # ID Format: beg_fr_30117_1 -> We want '30117'
-                for l in existing_lessons:
-                    parts = l['id'].split('_')
-                    if len(parts) >= 3:
-                        processed_book_ids.add(int(parts[2]))
-                        
-                print(f"  📚 Loaded library. Skipping {len(processed_book_ids)} already processed books.")
-            except:
-                print("  🆕 No existing library found.")
+        # 1. LOAD EXISTING DATA (catalog picks up any edits to the asset file)
+        print(f"  📚 Loaded library: {catalog.count_lessons(conn, filepath)} chapters.")
 
         # 2. DOWNLOAD NEW BOOKS
         new_lessons_count = 0
         
         for book_id in ids:
             # CHECK FOR DUPLICATE BOOK
-            if book_id in processed_book_ids:
+            # ID Format: beg_fr_30117_1 -> indexed lookup on 'beg_fr_30117_'
+            if catalog.has_prefix(conn, f"beg_{lang}_{book_id}_", source=filepath):
                 continue
                 
             book_lessons = process_book(book_id, lang)
             
             if book_lessons:
-                existing_lessons.extend(book_lessons)
-                processed_book_ids.add(book_id)
+                catalog.append_lessons(conn, filepath, book_lessons)
                 new_lessons_count += len(book_lessons)
             
             time.sleep(1.5) # Be nice to Gutenberg
 
-        # 3. SAVE
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(existing_lessons, f, ensure_ascii=False, indent=None)
+        # 3. SAVE (export the asset file and its pages from the catalog)
+        catalog.export_sources(conn, [filepath])
             
         print(f"  💾 SAVED: {new_lessons_count} new chapters added to {filepath}")
 
@@ -1,8 +1,14 @@
-import requests
-import json
 import re
 import os
 import time
+import argparse
+import catalog
+import lesson_schema
+import metrics
+import profiling
+from lazy_imports import lazy_import
+
+requests = lazy_import("requests")
 
 # --- CONFIGURATION ---
 # Using the standard path from your previous scripts
@@ -36,8 +42,8 @@ def get_headers():
     }
 
 def get_object_size(obj):
-    """Calculates byte size of a JSON object."""
-    return len(json.dumps(obj).encode('utf-8'))
+    """Stored size of a lesson document in Firestore."""
+    return lesson_schema.document_size(obj)
 
 def extract_metadata(full_text):
     """Attempts to find Title and Author in the header."""
@@ -121,30 +127,36 @@ def process_book(book_id, lang):
     url = f"https://www.gutenberg.org/cache/epub/{book_id}/pg{book_id}.txt"
     
     try:
-        response = requests.get(url, headers=get_headers(), timeout=30)
-        
-        if response.status_code != 200:
-            url = f"https://www.gutenberg.org/files/{book_id}/{book_id}-0.txt"
+        with metrics.timer("download"):
             response = requests.get(url, headers=get_headers(), timeout=30)
             
+            if response.status_code != 200:
+                url = f"https://www.gutenberg.org/files/{book_id}/{book_id}-0.txt"
+                response = requests.get(url, headers=get_headers(), timeout=30)
+            
         if response.status_code != 200:
             print(f"    ❌ Failed to download ID {book_id}")
+            metrics.reject("download_error")
             return []
             
+        metrics.add_bytes("download", len(response.content))
         response.encoding = response.apparent_encoding
         full_text = response.text
         
         # 1. Clean Text
-        clean_content = clean_gutenberg_text(full_text)
+        with metrics.timer("parse"):
+            clean_content = clean_gutenberg_text(full_text)
         
         # 2. Extract Metadata
         title, author = extract_metadata(full_text)
         print(f"    📖 Processing: {title[:40]}... ({author})")
         
-        difficulty = calculate_difficulty(clean_content[:5000], lang)
+        with metrics.timer("difficulty"):
+            difficulty = calculate_difficulty(clean_content[:5000], lang)
         
         # 3. Chunking (The key to avoiding large files)
-        parts = chunk_text(clean_content)
+        with metrics.timer("parse"):
+            parts = chunk_text(clean_content)
         lessons = []
         
         for i, part in enumerate(parts):
@@ -178,10 +190,11 @@ def process_book(book_id, lang):
             }
 
             # --- SAFETY CHECK ---
-            # Ensure this specific lesson is not > 900KB
+            # Ensure this specific lesson fits in one Firestore document
             size_bytes = get_object_size(lesson)
-            if size_bytes > 900000:
+            if size_bytes > lesson_schema.MAX_DOCUMENT_SIZE:
                 print(f"       ⚠️ SKIP Part {i+1}: Too large ({size_bytes} bytes).")
+                metrics.reject("too_big")
                 continue
 
             lessons.append(lesson)
@@ -191,12 +204,21 @@ def process_book(book_id, lang):
 
     except Exception as e:
         print(f"    ⚠️ Exception processing {book_id}: {e}")
+        metrics.reject("exception")
         return []
 
 def main():
+    parser = argparse.ArgumentParser(description="Downloads Project Gutenberg classics and splits them into text lessons.")
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
 
+    metrics.start_run("generate_books")
+    profiling.start(args.profile)
+    conn = catalog.open_catalog()
+
     for lang, ids in BOOKS_CATALOG.items():
         print(f"\n==========================================")
         print(f" PROCESSING CLASSIC BOOKS: {lang.upper()}")
@@ -204,40 +226,26 @@ def main():
         
         filepath = os.path.join(OUTPUT_DIR, f"books_{lang}.json")
         
-        existing_lessons = []
-        processed_book_ids = set()
-        
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    existing_lessons = json.load(f)
-                for l in existing_lessons:
-                    parts = l['id'].split('_')
-                    if len(parts) >= 3:
-                        processed_book_ids.add(int(parts[2]))
-                print(f"  📚 Loaded library. Skipping {len(processed_book_ids)} books.")
-            except:
-                print("  🆕 No existing library found.")
+        print(f"  📚 Loaded library: {catalog.count_lessons(conn, filepath)} chapters.")
 
         new_chapters_count = 0
 
         for book_id in ids:
-            if book_id in processed_book_ids:
+            # Chapters are txt_{lang}_{book_id}_{n}; an indexed prefix lookup
+            if catalog.has_prefix(conn, f"txt_{lang}_{book_id}_", source=filepath):
                 continue
                 
             book_lessons = process_book(book_id, lang)
             
             if book_lessons:
-                existing_lessons.extend(book_lessons)
-                processed_book_ids.add(book_id)
+                # One transaction per book: a crash never leaves half a book
+                catalog.append_lessons(conn, filepath, book_lessons)
                 new_chapters_count += len(book_lessons)
                 
             time.sleep(1) 
 
-        # Write to file
-        with open(filepath, 'w', encoding='utf-8') as f:
-            # separators=(',', ':') removes whitespace to save space
-            json.dump(existing_lessons, f, ensure_ascii=False, indent=None, separators=(',', ':'))
+        # Export the asset file (and pages) from the catalog
+        catalog.export_sources(conn, [filepath])
             
         print(f"  💾 SAVED: {new_chapters_count} new chapters added to {filepath}")
 
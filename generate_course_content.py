@@ -1,14 +1,17 @@
-import json
 import os
 import re
 import glob
-import yt_dlp
 import time
 import random
 import argparse
 import sys
-from yt_dlp.utils import DownloadError
 from datetime import datetime, timedelta
+import catalog
+import metrics
+import profiling
+from lazy_imports import lazy_import
+
+yt_dlp = lazy_import("yt_dlp")
 
 # --- CONFIGURATION ---
 OUTPUT_DIR = "assets/course_videos"
@@ -126,15 +129,16 @@ def analyze_difficulty(transcript):
 def save_lesson_to_file(lang_code, lesson):
     filepath = os.path.join(OUTPUT_DIR, f"{lang_code}.json")
     try:
-        existing_lessons = []
-        if os.path.exists(filepath):
-            with open(filepath, 'r', encoding='utf-8') as f:
-                existing_lessons = json.load(f)
-        if any(l['id'] == lesson['id'] for l in existing_lessons):
-            return False
-        existing_lessons.insert(0, lesson) # Insert at top of JSON
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(existing_lessons, f, ensure_ascii=False, indent=None)
+        conn = catalog.connect()
+        try:
+            # Indexed duplicate check + insert at the top, in one transaction
+            if not catalog.add_lesson(conn, filepath, lesson, at_top=True, order="newest-first"):
+                metrics.reject("duplicate")
+                return False
+            catalog.export_sources(conn, [filepath])
+        finally:
+            conn.close()
+        metrics.count("lessons_total", result="saved")
         return True
     except Exception as e:
         print(f"Error saving file: {e}")
@@ -159,7 +163,7 @@ def get_video_details(video_url, lang_code, category, manual_level=None, max_ret
     # PHASE 1: INSPECTION
     for attempt in range(max_retries):
         try:
-            with yt_dlp.YoutubeDL(ydl_opts_base) as ydl:
+            with yt_dlp.YoutubeDL(ydl_opts_base) as ydl, metrics.timer("info"):
                 info = ydl.extract_info(video_url, download=False)
                 if info: break
         except Exception as e:
@@ -170,15 +174,19 @@ def get_video_details(video_url, lang_code, category, manual_level=None, max_ret
                 time.sleep(wait)
             else:
                 print(f"    ❌ Inspection error: {str(e)[:50]}")
+                metrics.reject("info_error")
                 return None
     
-    if not info: return None
+    if not info:
+        metrics.reject("info_error")
+        return None
 
     # Duration Check
     duration = info.get('duration', 0)
     min_dur, max_dur = DURATION_RULES.get(category, DURATION_RULES['Manual'])
     if not (min_dur <= duration <= max_dur):
         print(f"    ⚠️ Duration mismatch ({duration}s).")
+        metrics.reject("duration")
         return None
 
     # Subtitles
@@ -194,6 +202,7 @@ def get_video_details(video_url, lang_code, category, manual_level=None, max_ret
     
     if not found_sub_code:
         print(f"    ⚠️ No '{lang_code}' subtitles found.")
+        metrics.reject("no_subtitles")
         return None
 
     # PHASE 2: DOWNLOAD
@@ -211,11 +220,12 @@ def get_video_details(video_url, lang_code, category, manual_level=None, max_ret
     content = None
     for attempt in range(max_retries):
         try:
-            with yt_dlp.YoutubeDL(ydl_opts_download) as ydl:
+            with yt_dlp.YoutubeDL(ydl_opts_download) as ydl, metrics.timer("subtitles"):
                 ydl.extract_info(video_url, download=True)
                 files = glob.glob(f"{temp_filename}*.vtt")
                 if files:
                     best_file = max(files, key=os.path.getsize)
+                    metrics.add_bytes("subtitles", os.path.getsize(best_file))
                     with open(best_file, 'r', encoding='utf-8') as f: content = f.read()
                     break
                 else: raise Exception("VTT not found")
@@ -232,23 +242,32 @@ def get_video_details(video_url, lang_code, category, manual_level=None, max_ret
         try: os.remove(f)
         except: pass
 
-    if not content: return None
+    if not content:
+        metrics.reject("subtitle_download")
+        return None
     
-    transcript_data = parse_vtt_to_transcript(content)
-    if not transcript_data or len(transcript_data) < 5: return None
+    with metrics.timer("parse"):
+        transcript_data = parse_vtt_to_transcript(content)
+    if not transcript_data or len(transcript_data) < 5:
+        metrics.reject("short_transcript")
+        return None
     
     full_text = " ".join([t['text'] for t in transcript_data])
+    with metrics.timer("parse"):
+        sentences = split_sentences(full_text)
+    with metrics.timer("difficulty"):
+        difficulty = manual_level or analyze_difficulty(transcript_data)
     type_map = {'Stories': 'story', 'News': 'news', 'Bites': 'bite', 'Grammar tips': 'grammar', 'Manual': 'video'}
 
     return {
         "id": f"yt_{video_id}", "userId": "system_course",
         "title": info.get('title', 'Unknown Title'), "language": lang_code,
-        "content": full_text, "sentences": split_sentences(full_text),
+        "content": full_text, "sentences": sentences,
         "transcript": transcript_data, 
         # 🔥 PINNING LOGIC APPLIED HERE
         "createdAt": get_automated_date(is_pinned=is_pinned),
         "imageUrl": info.get('thumbnail') or "", "type": type_map.get(category, 'video'), 
-        "difficulty": manual_level or analyze_difficulty(transcript_data),
+        "difficulty": difficulty,
         "videoUrl": f"https://www.youtube.com/watch?v={video_id}",
         "isFavorite": False, "progress": 0,
     }
@@ -263,7 +282,8 @@ def process_manual_link(url, lang_code, category="Manual", manual_level=None, is
     videos = []
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         try:
-            info = ydl.extract_info(url, download=False)
+            with metrics.timer("search"):
+                info = ydl.extract_info(url, download=False)
             if 'entries' in info:
                 for idx, entry in enumerate(info['entries'], start=1):
                     if entry: videos.append({'id': entry['id'], 'seriesId': info.get('id'), 'seriesTitle': info.get('title'), 'seriesIndex': idx})
@@ -287,11 +307,13 @@ def process_manual_link(url, lang_code, category="Manual", manual_level=None, is
     print(f"\n🎉 Finished. Added {count} lessons.")
 
 def run_automated_scraping(is_pinned=False):
+    conn = catalog.connect()
+    full = {code for code in LANGUAGES
+            if catalog.count_lessons(conn, os.path.join(OUTPUT_DIR, f"{code}.json")) >= 40}
+    conn.close()
+
     for lang_code, lang_name in sorted(LANGUAGES.items()):
-        filepath = os.path.join(OUTPUT_DIR, f"{lang_code}.json")
-        if os.path.exists(filepath):
-            with open(filepath, 'r', encoding='utf-8') as f:
-                if len(json.load(f)) >= 40: continue
+        if lang_code in full: continue
 
         print(f"\n=== {lang_name} ({lang_code}) ===")
         queries = CURATED_CONFIG.get(lang_code, [ (f"{lang_name} stories", 'Stories'), (f"{lang_name} news", 'News') ])
@@ -300,8 +322,12 @@ def run_automated_scraping(is_pinned=False):
             if added >= 4: break
             print(f"  🔎 {category}: '{query}'")
             with yt_dlp.YoutubeDL({'quiet': True, 'extract_flat': True, 'logger': QuietLogger()}) as ydl:
-                try: result = ydl.extract_info(f"ytsearch5:{query}", download=False)
-                except: continue
+                try:
+                    with metrics.timer("search"):
+                        result = ydl.extract_info(f"ytsearch5:{query}", download=False)
+                except:
+                    metrics.count("search_errors_total")
+                    continue
                 for entry in result.get('entries', []):
                     if not entry: continue
                     l = get_video_details(f"https://www.youtube.com/watch?v={entry['id']}", lang_code, category, is_pinned=is_pinned)
@@ -319,7 +345,11 @@ def main():
     parser.add_argument("--level", type=str)
     parser.add_argument("--pinned", action="store_true", help="Set date to 2030 to pin to top")
     
+    profiling.add_argument(parser)
     args = parser.parse_args()
+    metrics.start_run("generate_course_content")
+    profiling.start(args.profile)
+    catalog.open_catalog().close() # Picks up hand edits to the asset files first
     if args.link:
         if not args.lang: sys.exit(print("❌ --lang required"))
         process_manual_link(args.link, args.lang, args.category, args.level, is_pinned=args.pinned)
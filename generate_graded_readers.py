@@ -1,11 +1,30 @@
-import json
 import os
+import glob
+import re
+import math
+import heapq
 import datetime
-from datasets import load_dataset # pip install datasets
+import argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import catalog
+import metrics
+import profiling
+from lazy_imports import lazy_import
+
+# Only needed when a pair isn't in LOCAL_OPUS_DIR
+datasets = lazy_import("datasets") # pip install datasets
 
 # --- CONFIGURATION ---
 OUTPUT_DIR = "assets/storybooks_lessons"
 
+# Local clone of the HF "opus_books" dataset repo ({pair}/*.parquet).
+# When a pair is present here no network access is needed.
+LOCAL_OPUS_DIR = "opus_books"
+
 # Language Pairs (App Code -> OPUS Pair)
 # Note: OPUS books are usually English <-> Target
 LANG_PAIRS = {
@@ -21,114 +40,277 @@ LANG_PAIRS = {
     # 'ar': 'en-ar', # Add if you downloaded Arabic
 }
 
+# Lemmatization lists ("lemma<TAB>form" per line), first match wins.
+# Inflected forms share their lemma's frequency rank when scoring.
+LEMMA_DIRS = ["lemmatization-lists", "assets/dictionaries"]
+
 # Settings
 SENTENCES_PER_LESSON = 15  # How many pairs per "Book"
-MAX_LESSONS = 20           # Max number of practice sets to generate
+MIN_SENTENCE_CHARS = 10    # Filter bad data (too short/long)
+MAX_SENTENCE_CHARS = 200
+BATCH_SIZE = 1000          # Rows per streamed batch
+
+# Graded readers: number of practice sets per level. Sets are
+# opus_{lang}_{level}_{n}; runs before levels existed wrote opus_{lang}_{n}.
+# Rerunning this script replaces those in the storybooks files, but copies
+# already uploaded stay in Firestore. The old IDs are the only ones with a
+# digit after the language, so per language:
+#   for n in 1 2 3 4 5 6 7 8 9; do python bulk_delete.py --id-prefix opus_fr_$n --yes; done
+LESSONS_PER_LEVEL = {
+    'beginner': 8,
+    'intermediate': 6,
+    'advanced': 6,
+}
+
+# Difficulty score (0..1) upper bounds per level; anything above is advanced
+LEVEL_THRESHOLDS = [
+    ('beginner', 0.45),
+    ('intermediate', 0.60),
+]
+
+VOCAB_LIMIT = 100000  # Max ranked lemmas kept while counting (bounds memory)
+HARDEST_WORDS = 3     # Difficulty looks at the N rarest words of a sentence
+LENGTH_WEIGHT = 0.25  # Share of the difficulty score that comes from length
+
+TOKEN_PATTERN = re.compile(r"[^\W\d_]+")
+
+def iter_opus_batches(opus_pair, src_lang, tgt_lang):
+    """
+    Lazily yields (src, tgt) pyarrow string arrays for a pair.
+    Reads local parquet files when available, otherwise streams from the
+    HF hub. Nothing beyond the current batch is downloaded or held in memory.
+    """
+    local_files = sorted(glob.glob(os.path.join(LOCAL_OPUS_DIR, opus_pair, "*.parquet")))
+    if local_files:
+        for path in local_files:
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=BATCH_SIZE, columns=['translation']):
+                translation = batch.column(0)
+                yield translation.field(src_lang), translation.field(tgt_lang)
+        return
+
+    dataset = datasets.load_dataset("opus_books", opus_pair, split="train", streaming=True)
+    for batch in dataset.iter(batch_size=BATCH_SIZE):
+        translation = pa.array(batch['translation'])
+        yield translation.field(src_lang), translation.field(tgt_lang)
+
+def filter_batch(src, tgt):
+    """Vectorised trim + length filter on the target side. Returns (src_list, tgt_list)."""
+    src = pc.utf8_trim_whitespace(src.fill_null(""))
+    tgt = pc.utf8_trim_whitespace(tgt.fill_null(""))
+    lengths = pc.utf8_length(tgt)
+    mask = pc.and_(
+        pc.greater_equal(lengths, MIN_SENTENCE_CHARS),
+        pc.less_equal(lengths, MAX_SENTENCE_CHARS),
+    )
+    return pc.filter(src, mask).to_pylist(), pc.filter(tgt, mask).to_pylist()
+
+def load_lemma_map(lang):
+    """Returns {form: lemma} from the first lemmatization list found for `lang`."""
+    for folder in LEMMA_DIRS:
+        path = os.path.join(folder, f"lemmatization-{lang}.txt")
+        if not os.path.exists(path): continue
+        lemma_map = {}
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) == 2:
+                    lemma_map[parts[1].lower()] = parts[0].lower()
+        return lemma_map
+    return {}
+
+def to_lemmas(text, lemma_map):
+    return [lemma_map.get(tok, tok) for tok in TOKEN_PATTERN.findall(text.lower())]
+
+def count_lemma_ranks(opus_pair, src_lang, app_lang, lemma_map):
+    """
+    Pass 1: corpus frequency of every target lemma -> {lemma: rank} (1 = most common).
+    The counter is pruned to the top VOCAB_LIMIT lemmas whenever it doubles,
+    so memory depends on vocabulary size, never on corpus size.
+    """
+    counts = Counter()
+    for src, tgt in iter_opus_batches(opus_pair, src_lang, app_lang):
+        _, kept_tgt = filter_batch(src, tgt)
+        for sentence in kept_tgt:
+            counts.update(to_lemmas(sentence, lemma_map))
+        if len(counts) > 2 * VOCAB_LIMIT:
+            counts = Counter(dict(counts.most_common(VOCAB_LIMIT)))
+    return {lemma: rank for rank, (lemma, _) in enumerate(counts.most_common(VOCAB_LIMIT), start=1)}
+
+def score_pair(src, tgt, lemma_map, ranks):
+    """
+    Returns (difficulty, quality).
+    difficulty: rarity of the hardest words (log rank) blended with length, 0..1.
+    quality: share of real dictionary words, penalised when source/target
+    lengths disagree (a sign of a bad OPUS alignment).
+    """
+    tokens = TOKEN_PATTERN.findall(tgt.lower())
+    if not tokens: return 1.0, -1.0
+
+    log_limit = math.log(VOCAB_LIMIT)
+    word_ranks = sorted((ranks.get(lemma_map.get(tok, tok), VOCAB_LIMIT) for tok in tokens), reverse=True)
+    hardest = word_ranks[:HARDEST_WORDS]
+    vocab_score = sum(math.log(r) for r in hardest) / (len(hardest) * log_limit)
+    length_score = min(len(tgt) / MAX_SENTENCE_CHARS, 1.0)
+    difficulty = (1 - LENGTH_WEIGHT) * vocab_score + LENGTH_WEIGHT * length_score
+
+    known = sum(1 for tok in tokens if tok in lemma_map) / len(tokens) if lemma_map else 1.0
+    misalignment = abs(math.log((len(src) + 1) / (len(tgt) + 1)))
+    quality = known - 0.5 * misalignment
+    return difficulty, quality
+
+def level_for(difficulty):
+    for level, upper in LEVEL_THRESHOLDS:
+        if difficulty < upper: return level
+    return 'advanced'
+
+def select_graded_pairs(opus_pair, src_lang, app_lang):
+    """
+    Pass 2: scores every pair and keeps the best-quality pairs per level in
+    a bounded min-heap. Returns {level: [(difficulty, src, tgt), ...]} sorted
+    from easiest to hardest.
+    """
+    lemma_map = load_lemma_map(app_lang)
+    with metrics.timer("parse", language=app_lang):
+        ranks = count_lemma_ranks(opus_pair, src_lang, app_lang, lemma_map)
+
+    capacity = {level: n * SENTENCES_PER_LESSON for level, n in LESSONS_PER_LEVEL.items()}
+    heaps = {level: [] for level in LESSONS_PER_LEVEL}
+    # Books repeat lines ("Yes, sir."), so track what each heap already holds
+    in_heap = {level: set() for level in LESSONS_PER_LEVEL}
+    seq = 0
+
+    with metrics.timer("difficulty", language=app_lang):
+        for src, tgt in iter_opus_batches(opus_pair, src_lang, app_lang):
+            kept_src, kept_tgt = filter_batch(src, tgt)
+            metrics.count("rejects_total", len(src) - len(kept_src), reason="filtered")
+            for src_txt, tgt_txt in zip(kept_src, kept_tgt):
+                difficulty, quality = score_pair(src_txt, tgt_txt, lemma_map, ranks)
+                level = level_for(difficulty)
+                heap, held = heaps[level], in_heap[level]
+                if tgt_txt in held: continue
+
+                seq += 1
+                entry = (quality, seq, difficulty, src_txt, tgt_txt)
+                if len(heap) < capacity[level]:
+                    heapq.heappush(heap, entry)
+                elif quality > heap[0][0]:
+                    held.discard(heapq.heapreplace(heap, entry)[4])
+                else:
+                    continue
+                held.add(tgt_txt)
+
+    return {
+        level: sorted((difficulty, src_txt, tgt_txt) for _, _, difficulty, src_txt, tgt_txt in heap)
+        for level, heap in heaps.items()
+    }
+
+def build_lesson(app_lang, level, lesson_number, src_sentences, tgt_sentences):
+    # Format: Target Language \n (English Meaning)
+    # This allows the user to read the target, but see the meaning below.
+    full_content = "\n\n".join(f"{tgt}\n({src})" for src, tgt in zip(src_sentences, tgt_sentences))
+
+    return {
+        "id": f"opus_{app_lang}_{level}_{lesson_number}",
+        "userId": "system_opus",
+        "title": f"Sentence Practice: {level.title()} {lesson_number}",
+        "language": app_lang,
+        "content": full_content,
+        "sentences": list(tgt_sentences), # For TTS/Logic, only use target lang
+        "transcript": [],
+        "createdAt": datetime.datetime.now().isoformat(),
+        "imageUrl": "assets/images/book_cover_placeholder.png", 
+        "type": "text",
+        "difficulty": level,
+        "videoUrl": None,
+        "isFavorite": False,
+        "progress": 0,
+        "author": "OPUS Books",
+        "genre": "sentences"
+    }
 
 def generate_opus_lessons(app_lang, opus_pair):
-    print(f"  📚 Loading OPUS Books for {app_lang.upper()} ({opus_pair})...")
+    print(f"  📚 Grading OPUS Books for {app_lang.upper()} ({opus_pair})...")
     new_lessons = []
-    
+    src_lang = next(code for code in opus_pair.split('-') if code != app_lang)
+
     try:
-        # Load from HuggingFace cache (FAST)
-        dataset = load_dataset("opus_books", opus_pair, split="train")
-        
-        current_text_block = []
-        current_sentences = []
-        lesson_count = 0
-        
-        for i, item in enumerate(dataset):
-            if lesson_count >= MAX_LESSONS: break
-            
-            # Extract text
-            pair = item['translation']
-            src_txt = pair.get('en', '').strip()
-            tgt_txt = pair.get(app_lang, '').strip()
-            
-            # Filter bad data (too short/long)
-            if len(tgt_txt) < 10 or len(tgt_txt) > 200: continue
-            
-            # Format: Target Language \n (English Meaning)
-            # This allows the user to read the target, but see the meaning below.
-            formatted_pair = f"{tgt_txt}\n({src_txt})"
-            
-            current_text_block.append(formatted_pair)
-            current_sentences.append(tgt_txt) # For TTS/Logic, only use target lang
-            
-            # If batch is full, package it as a "Lesson"
-            if len(current_text_block) >= SENTENCES_PER_LESSON:
-                lesson_count += 1
-                
-                full_content = "\n\n".join(current_text_block)
-                
-                lesson_obj = {
-                    "id": f"opus_{app_lang}_{lesson_count}",
-                    "userId": "system_opus",
-                    "title": f"Sentence Practice {lesson_count}",
-                    "language": app_lang,
-                    "content": full_content,
-                    "sentences": current_sentences, # Array of target strings
-                    "transcript": [],
-                    "createdAt": datetime.datetime.now().isoformat(),
-                    "imageUrl": "assets/images/book_cover_placeholder.png", 
-                    "type": "text",
-                    "difficulty": "advanced", # Books are usually literary
-                    "videoUrl": None,
-                    "isFavorite": False,
-                    "progress": 0,
-                    "author": "OPUS Books",
-                    "genre": "sentences"
-                }
-                
-                new_lessons.append(lesson_obj)
-                
-                # Reset batch
-                current_text_block = []
-                current_sentences = []
-                
-        print(f"     ✅ Generated {len(new_lessons)} OPUS practice sets.")
+        selected = select_graded_pairs(opus_pair, src_lang, app_lang)
+
+        for level, pairs in selected.items():
+            # Pack full sets only, in easiest-first order
+            for n in range(len(pairs) // SENTENCES_PER_LESSON):
+                chunk = pairs[n * SENTENCES_PER_LESSON:(n + 1) * SENTENCES_PER_LESSON]
+                new_lessons.append(build_lesson(
+                    app_lang, level, n + 1,
+                    [src for _, src, _ in chunk], [tgt for _, _, tgt in chunk],
+                ))
+
+        counts = Counter(lesson['difficulty'] for lesson in new_lessons)
+        summary = ", ".join(f"{counts[level]} {level}" for level in LESSONS_PER_LEVEL)
+        print(f"     ✅ Generated {len(new_lessons)} OPUS practice sets for {app_lang.upper()} ({summary}).")
         return new_lessons
 
     except Exception as e:
         print(f"     ⚠️ Error loading OPUS {opus_pair}: {e}")
         return []
 
+def process_language(lang_code, opus_pair):
+    """Worker: builds the OPUS sets for one language and merges them into its storybooks file."""
+    filename = f"storybooks_{lang_code}.json"
+    filepath = os.path.join(OUTPUT_DIR, filename)
+    
+    # 1. Load Existing Data (ASP Stories)
+    conn = catalog.connect()
+    existing_data = catalog.load_source(conn, filepath)
+    
+    # 2. Filter out OLD Opus data (to avoid duplicates if you run script twice)
+    # We keep everything that does NOT start with "opus_"
+    clean_data = [item for item in existing_data if not item['id'].startswith("opus_")]
+    
+    # 3. Generate NEW Opus Data
+    opus_lessons = generate_opus_lessons(lang_code, opus_pair)
+    
+    # 4. Merge
+    final_list = clean_data + opus_lessons
+    
+    # 5. Save
+    if final_list:
+        catalog.save_source(conn, filepath, final_list)
+        catalog.export_sources(conn, [filepath])
+        print(f"     💾 Saved total {len(final_list)} lessons to {filename}")
+    conn.close()
+    return len(opus_lessons)
+
+def run_language_job(lang_code, opus_pair):
+    """Pool entry point: process_language's result plus the worker's metrics and profile for the parent."""
+    profiling.start_worker()
+    return process_language(lang_code, opus_pair), metrics.collect(), profiling.collect()
+
 def main():
+    parser = argparse.ArgumentParser(description="Builds graded OPUS sentence-practice sets into the storybooks files.")
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+
     if not os.path.exists(OUTPUT_DIR):
         print(f"❌ Error: Directory {OUTPUT_DIR} does not exist.")
         return
 
-    for lang_code, opus_pair in LANG_PAIRS.items():
-        filename = f"storybooks_{lang_code}.json"
-        filepath = os.path.join(OUTPUT_DIR, filename)
-        
-        print(f"\nProcessing {lang_code.upper()}...")
-        
-        # 1. Load Existing Data (ASP Stories)
-        existing_data = []
-        if os.path.exists(filepath):
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    existing_data = json.load(f)
-                print(f"     📂 Loaded {len(existing_data)} existing stories.")
-            except:
-                print("     ⚠️ Could not read existing file, starting fresh.")
-        
-        # 2. Filter out OLD Opus data (to avoid duplicates if you run script twice)
-        # We keep everything that does NOT start with "opus_"
-        clean_data = [item for item in existing_data if not item['id'].startswith("opus_")]
-        
-        # 3. Generate NEW Opus Data
-        opus_lessons = generate_opus_lessons(lang_code, opus_pair)
-        
-        # 4. Merge
-        final_list = clean_data + opus_lessons
-        
-        # 5. Save
-        if final_list:
-            with open(filepath, 'w', encoding='utf-8') as f:
-                json.dump(final_list, f, ensure_ascii=False, indent=None)
-            print(f"     💾 Saved total {len(final_list)} lessons to {filename}")
+    metrics.start_run("generate_graded_readers")
+    profiling.start(args.profile)
+    # Import any hand-edited asset files before workers read the catalog
+    catalog.open_catalog().close()
+
+    # Each pair streams and writes its own file, so they run side by side
+    total = 0
+    with ProcessPoolExecutor() as pool:
+        futures = {pool.submit(run_language_job, code, pair): code for code, pair in LANG_PAIRS.items()}
+        for future in futures:
+            count, worker_metrics, worker_profile = future.result()
+            metrics.merge(worker_metrics)
+            profiling.merge(worker_profile)
+            total += count
+
+    print(f"\n🎉 Generated {total} OPUS practice sets across {len(LANG_PAIRS)} languages.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
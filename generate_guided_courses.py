@@ -1,14 +1,17 @@
-import json
 import os
 import re
 import glob
-import yt_dlp
 import time
 import random
 import argparse
 import sys
-from yt_dlp.utils import DownloadError
 from datetime import datetime, timedelta  # Added for pinning logic
+import catalog
+import metrics
+import profiling
+from lazy_imports import lazy_import
+
+yt_dlp = lazy_import("yt_dlp")
 
 # --- CONFIGURATION ---
 OUTPUT_DIR = "assets/guided_courses"
@@ -90,16 +93,16 @@ def analyze_difficulty(transcript):
 def save_lesson_to_file(lang_code, lesson):
     filepath = os.path.join(OUTPUT_DIR, f"lessons_{lang_code}.json")
     try:
-        existing_lessons = []
-        if os.path.exists(filepath):
-            with open(filepath, 'r', encoding='utf-8') as f:
-                existing_lessons = json.load(f)
-        if any(l['id'] == lesson['id'] for l in existing_lessons):
-            return False
-        # Insert at 0 so newest is at the top of the JSON list
-        existing_lessons.insert(0, lesson)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(existing_lessons, f, ensure_ascii=False, indent=None)
+        conn = catalog.connect()
+        try:
+            # Indexed duplicate check + insert at the top, in one transaction
+            if not catalog.add_lesson(conn, filepath, lesson, at_top=True, order="newest-first"):
+                metrics.reject("duplicate")
+                return False
+            catalog.export_sources(conn, [filepath])
+        finally:
+            conn.close()
+        metrics.count("lessons_total", result="saved")
         return True
     except Exception as e:
         print(f"Error saving file: {e}")
@@ -123,11 +126,13 @@ def get_video_details(video_url, lang_code, genre, manual_level=None, is_pinned=
 
     # PHASE 1: INFO EXTRACTION
     try:
-        with yt_dlp.YoutubeDL(ydl_opts_base) as ydl:
+        with yt_dlp.YoutubeDL(ydl_opts_base) as ydl, metrics.timer("info"):
             info = ydl.extract_info(video_url, download=False)
-    except: return None
+    except: info = None
     
-    if not info: return None
+    if not info:
+        metrics.reject("info_error")
+        return None
 
     # Subtitles
     manual_subs = info.get('subtitles', {})
@@ -141,7 +146,9 @@ def get_video_details(video_url, lang_code, genre, manual_level=None, is_pinned=
             if code == lang_code or code.startswith(f"{lang_code}-"):
                 found_sub_code = code; is_auto = True; break
     
-    if not found_sub_code: return None
+    if not found_sub_code:
+        metrics.reject("no_subtitles")
+        return None
 
     # PHASE 2: SUBTITLE DOWNLOAD
     video_id = info['id']
@@ -156,10 +163,11 @@ def get_video_details(video_url, lang_code, genre, manual_level=None, is_pinned=
 
     content = None
     try:
-        with yt_dlp.YoutubeDL(ydl_opts_download) as ydl:
+        with yt_dlp.YoutubeDL(ydl_opts_download) as ydl, metrics.timer("subtitles"):
             ydl.extract_info(video_url, download=True)
             files = glob.glob(f"{temp_filename}*.vtt")
             if files:
+                metrics.add_bytes("subtitles", os.path.getsize(max(files, key=os.path.getsize)))
                 with open(max(files, key=os.path.getsize), 'r', encoding='utf-8') as f: 
                     content = f.read()
     finally:
@@ -167,13 +175,21 @@ def get_video_details(video_url, lang_code, genre, manual_level=None, is_pinned=
             try: os.remove(f)
             except: pass
 
-    if not content: return None
+    if not content:
+        metrics.reject("subtitle_download")
+        return None
     
-    transcript_data = parse_vtt_to_transcript(content)
-    if not transcript_data or len(transcript_data) < 5: return None
+    with metrics.timer("parse"):
+        transcript_data = parse_vtt_to_transcript(content)
+    if not transcript_data or len(transcript_data) < 5:
+        metrics.reject("short_transcript")
+        return None
     
     full_text = " ".join([t['text'] for t in transcript_data])
-    difficulty = manual_level if manual_level else analyze_difficulty(transcript_data)
+    with metrics.timer("parse"):
+        sentences = split_sentences(full_text)
+    with metrics.timer("difficulty"):
+        difficulty = manual_level if manual_level else analyze_difficulty(transcript_data)
 
     return {
         "id": f"yt_{video_id}",
@@ -181,7 +197,7 @@ def get_video_details(video_url, lang_code, genre, manual_level=None, is_pinned=
         "title": info.get('title', 'Unknown Title'),
         "language": lang_code,
         "content": full_text,
-        "sentences": split_sentences(full_text),
+        "sentences": sentences,
         "transcript": transcript_data,
         # 🔥 THE PINNING LOGIC APPLIED HERE
         "createdAt": get_automated_date(is_pinned=is_pinned),
@@ -202,7 +218,8 @@ def process_manual_link(url, lang_code, genre="manual", manual_level=None, is_pi
 
     with yt_dlp.YoutubeDL(ydl_opts_check) as ydl:
         try:
-            info = ydl.extract_info(url, download=False)
+            with metrics.timer("search"):
+                info = ydl.extract_info(url, download=False)
             if 'entries' in info:
                 for idx, entry in enumerate(info['entries'], start=1):
                     if entry: videos_to_process.append({'id': entry['id'], 'seriesId': info.get('id'), 'seriesTitle': info.get('title'), 'seriesIndex': idx})
@@ -228,7 +245,11 @@ def main():
     # 🔥 ADDED PINNED FLAG
     parser.add_argument("--pinned", action="store_true", help="Set date to 2030 to pin to top")
     
+    profiling.add_argument(parser)
     args = parser.parse_args()
+    metrics.start_run("generate_guided_courses")
+    profiling.start(args.profile)
+    catalog.open_catalog().close() # Picks up hand edits to the asset files first
 
     if args.link:
         if not args.lang: sys.exit(print("❌ --lang required"))
@@ -1,28 +1,34 @@
-import json
 import os
 import re
 import glob
-import yt_dlp
 import time
 import random
 import argparse
 import sys
-from yt_dlp.utils import DownloadError
 from datetime import datetime, timedelta
+from lesson_summaries import set_lesson
+import metrics
+import json_io
+import profiling
+import firebase_app
+from lazy_imports import lazy_import
+
+yt_dlp = lazy_import("yt_dlp")
 
 # --- FIREBASE INTEGRATION ---
-import firebase_admin
-from firebase_admin import credentials, firestore
-
-# Initialize Firebase
-try:
-    cred = credentials.Certificate("serviceAccountKey.json")
-    firebase_admin.initialize_app(cred)
-    db = firestore.client()
-    print("✅ Firebase initialized. Target collection: 'lessons'")
-except Exception as e:
-    print(f"❌ Firebase initialization failed: {e}")
-    sys.exit(1)
+# Connected on first use, so importing this module needs no credentials
+db = None
+
+def get_db():
+    global db
+    if db is None:
+        try:
+            db = firebase_app.client()
+            print("✅ Firebase initialized. Target collection: 'lessons'")
+        except Exception as e:
+            print(f"❌ Firebase initialization failed: {e}")
+            sys.exit(1)
+    return db
 
 # --- CONFIGURATION ---
 LOCAL_DATA_DIR = "assets/guided_courses"
@@ -59,22 +65,31 @@ class QuietLogger:
 
 # --- DUPLICATE CHECKING ---
 
+# IDs in LOCAL_DATA_DIR, read once per run on first use (this script never writes there)
+local_ids = None
+
+def get_local_ids():
+    global local_ids
+    if local_ids is None:
+        local_ids = set()
+        for file_path in glob.glob(os.path.join(LOCAL_DATA_DIR, "*.json")):
+            try:
+                local_ids.update(l.get('id') for l in json_io.iter_array(file_path))
+            except: continue
+    return local_ids
+
 def is_duplicate(lesson_id):
     """Checks Firebase and local files for existing ID."""
+    db = get_db()
     try:
-        if db.collection(FIRESTORE_COLLECTION).document(lesson_id).get().exists:
+        with metrics.timer("firestore_read"):
+            exists = db.collection(FIRESTORE_COLLECTION).document(lesson_id).get().exists
+        metrics.firestore_read()
+        if exists:
             return True
     except: pass
 
-    if os.path.exists(LOCAL_DATA_DIR):
-        for file_path in glob.glob(os.path.join(LOCAL_DATA_DIR, "*.json")):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    local_lessons = json.load(f)
-                    if any(l.get('id') == lesson_id for l in local_lessons):
-                        return True
-            except: continue
-    return False
+    return lesson_id in get_local_ids()
 
 # --- CORE LOGIC ---
 
@@ -86,11 +101,15 @@ def get_video_details(video_url, lang_code, genre, manual_level=None, is_pinned=
 
     info = None
     try:
-        with yt_dlp.YoutubeDL(ydl_opts_base) as ydl:
+        with yt_dlp.YoutubeDL(ydl_opts_base) as ydl, metrics.timer("info"):
             info = ydl.extract_info(video_url, download=False)
-    except: return None
+    except:
+        metrics.reject("info_error")
+        return None
 
-    if not info: return None
+    if not info:
+        metrics.reject("info_error")
+        return None
 
     found_sub_code, is_auto = None, False
     manual_subs = info.get('subtitles', {})
@@ -104,7 +123,9 @@ def get_video_details(video_url, lang_code, genre, manual_level=None, is_pinned=
             if code == lang_code or code.startswith(f"{lang_code}-"):
                 found_sub_code = code; is_auto = True; break
     
-    if not found_sub_code: return None
+    if not found_sub_code:
+        metrics.reject("no_subtitles")
+        return None
 
     video_id = info['id']
     temp_filename = f"temp_guided_{lang_code}_{video_id}"
@@ -115,10 +136,11 @@ def get_video_details(video_url, lang_code, genre, manual_level=None, is_pinned=
 
     content = None
     try:
-        with yt_dlp.YoutubeDL(ydl_opts_download) as ydl:
+        with yt_dlp.YoutubeDL(ydl_opts_download) as ydl, metrics.timer("subtitles"):
             ydl.extract_info(video_url, download=True)
             files = glob.glob(f"{temp_filename}*.vtt")
             if files:
+                metrics.add_bytes("subtitles", os.path.getsize(files[0]))
                 with open(files[0], 'r', encoding='utf-8') as f: content = f.read()
     except: pass
     finally:
@@ -126,7 +148,9 @@ def get_video_details(video_url, lang_code, genre, manual_level=None, is_pinned=
             try: os.remove(f)
             except: pass
 
-    if not content: return None
+    if not content:
+        metrics.reject("subtitle_download")
+        return None
     
     # Simple formatting helpers
     def split_sentences(text):
@@ -165,16 +189,19 @@ def process_and_upload(vid_url, lang_code, genre, level=None, is_pinned=False):
 
     if is_duplicate(lesson_id):
         print(f"      ⏭️  Skipped: {lesson_id} already exists.")
+        metrics.reject("duplicate")
         return False
 
     lesson = get_video_details(vid_url, lang_code, genre, level, is_pinned)
     if lesson:
         try:
-            db.collection(FIRESTORE_COLLECTION).document(lesson['id']).set(lesson)
+            set_lesson(get_db(), lesson) # Also writes the lesson_summaries mirror
             print(f"      ☁️  Uploaded to Firebase ({'PINNED' if is_pinned else 'NORMAL'}): {lesson['title'][:30]}...")
+            metrics.count("lessons_total", result="uploaded")
             return True
         except Exception as e:
             print(f"      ❌ Upload error: {e}")
+            metrics.count("lessons_total", result="upload_failed")
     return False
 
 def main():
@@ -186,10 +213,13 @@ def main():
     # 🔥 THE NEW FLAG
     parser.add_argument("--pinned", action="store_true", help="Set date to 2030 to pin to top")
     
+    profiling.add_argument(parser)
     args = parser.parse_args()
+    metrics.start_run("generate_guided_courses_firebase")
+    profiling.start(args.profile)
 
     ydl_opts = {'extract_flat': True, 'quiet': True}
-    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl, metrics.timer("search"):
         info = ydl.extract_info(args.link, download=False)
         video_ids = [e['id'] for e in info.get('entries', [])] if 'entries' in info else [info['id']]
 
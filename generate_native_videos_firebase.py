@@ -1,28 +1,34 @@
-import json
 import os
 import re
 import glob
-import yt_dlp
 import time
 import random
 import argparse
 import sys
-from yt_dlp.utils import DownloadError
 from datetime import datetime, timedelta
+from lesson_summaries import set_lesson
+import metrics
+import json_io
+import profiling
+import firebase_app
+from lazy_imports import lazy_import
+
+yt_dlp = lazy_import("yt_dlp")
 
 # --- FIREBASE INTEGRATION ---
-import firebase_admin
-from firebase_admin import credentials, firestore
-
-# Initialize Firebase
-try:
-    cred = credentials.Certificate("serviceAccountKey.json")
-    firebase_admin.initialize_app(cred)
-    db = firestore.client()
-    print("✅ Firebase initialized. Target collection: 'lessons'")
-except Exception as e:
-    print(f"❌ Firebase initialization failed: {e}")
-    sys.exit(1)
+# Connected on first use, so importing this module needs no credentials
+db = None
+
+def get_db():
+    global db
+    if db is None:
+        try:
+            db = firebase_app.client()
+            print("✅ Firebase initialized. Target collection: 'lessons'")
+        except Exception as e:
+            print(f"❌ Firebase initialization failed: {e}")
+            sys.exit(1)
+    return db
 
 # --- CONFIGURATION ---
 LOCAL_DATA_DIR = "assets/native_videos" # Used for duplicate checking only
@@ -91,23 +97,31 @@ class QuietLogger:
 
 # --- DUPLICATE CHECKING ---
 
+# IDs in LOCAL_DATA_DIR, read once per run on first use (this script never writes there)
+local_ids = None
+
+def get_local_ids():
+    global local_ids
+    if local_ids is None:
+        local_ids = set()
+        for file_path in glob.glob(os.path.join(LOCAL_DATA_DIR, "*.json")):
+            try:
+                local_ids.update(l.get('id') for l in json_io.iter_array(file_path))
+            except: continue
+    return local_ids
+
 def is_duplicate(lesson_id):
     """Checks Firebase and then local files to see if document exists."""
+    db = get_db()
     try:
-        doc = db.collection(FIRESTORE_COLLECTION).document(lesson_id).get()
+        with metrics.timer("firestore_read"):
+            doc = db.collection(FIRESTORE_COLLECTION).document(lesson_id).get()
+        metrics.firestore_read()
         if doc.exists:
             return True
     except Exception: pass
 
-    if os.path.exists(LOCAL_DATA_DIR):
-        for file_path in glob.glob(os.path.join(LOCAL_DATA_DIR, "*.json")):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    local_lessons = json.load(f)
-                    if any(l.get('id') == lesson_id for l in local_lessons):
-                        return True
-            except: continue
-    return False
+    return lesson_id in get_local_ids()
 
 # --- HELPERS ---
 
@@ -165,17 +179,21 @@ def get_video_details(video_url, lang_code, genre, manual_level=None, max_retrie
 
     for attempt in range(max_retries):
         try:
-            with yt_dlp.YoutubeDL(ydl_opts_base) as ydl:
+            with yt_dlp.YoutubeDL(ydl_opts_base) as ydl, metrics.timer("info"):
                 info = ydl.extract_info(video_url, download=False)
                 if info: break
         except Exception: time.sleep(5)
     
-    if not info: return None
+    if not info:
+        metrics.reject("info_error")
+        return None
 
     # Duration Checks
     duration = info.get('duration', 0)
     max_dur = 10800 if genre == 'manual' else 1800
-    if duration < 60 or duration > max_dur: return None
+    if duration < 60 or duration > max_dur:
+        metrics.reject("duration")
+        return None
 
     # Subtitle Matching
     manual_subs = info.get('subtitles', {})
@@ -189,7 +207,9 @@ def get_video_details(video_url, lang_code, genre, manual_level=None, max_retrie
             if code == lang_code or code.startswith(f"{lang_code}-"):
                 found_sub_code = code; is_auto = True; break
     
-    if not found_sub_code: return None
+    if not found_sub_code:
+        metrics.reject("no_subtitles")
+        return None
 
     video_id = info['id']
     temp_filename = f"temp_nat_{lang_code}_{video_id}"
@@ -200,28 +220,37 @@ def get_video_details(video_url, lang_code, genre, manual_level=None, max_retrie
 
     content = None
     try:
-        with yt_dlp.YoutubeDL(ydl_opts_download) as ydl:
+        with yt_dlp.YoutubeDL(ydl_opts_download) as ydl, metrics.timer("subtitles"):
             ydl.extract_info(video_url, download=True)
             files = glob.glob(f"{temp_filename}*.vtt")
             if files:
+                metrics.add_bytes("subtitles", os.path.getsize(files[0]))
                 with open(files[0], 'r', encoding='utf-8') as f: content = f.read()
     finally:
         for f in glob.glob(f"{temp_filename}*"): 
             try: os.remove(f)
             except: pass
 
-    if not content: return None
+    if not content:
+        metrics.reject("subtitle_download")
+        return None
     
-    transcript_data = parse_vtt_to_transcript(content)
-    if not transcript_data or len(transcript_data) < 10: return None
+    with metrics.timer("parse"):
+        transcript_data = parse_vtt_to_transcript(content)
+    if not transcript_data or len(transcript_data) < 10:
+        metrics.reject("short_transcript")
+        return None
     
     full_text = " ".join([t['text'] for t in transcript_data])
-    difficulty = manual_level if manual_level else analyze_difficulty(transcript_data)
+    with metrics.timer("parse"):
+        sentences = split_sentences(full_text)
+    with metrics.timer("difficulty"):
+        difficulty = manual_level if manual_level else analyze_difficulty(transcript_data)
 
     return {
         "id": f"yt_{video_id}", "userId": "system_native",
         "title": info.get('title', 'Unknown Title'), "language": lang_code,
-        "content": full_text, "sentences": split_sentences(full_text),
+        "content": full_text, "sentences": sentences,
         "transcript": transcript_data, 
         "createdAt": get_automated_date(is_pinned=is_pinned), # 🔥 Respects pinned flag
         "imageUrl": info.get('thumbnail') or "", "type": "video",
@@ -237,6 +266,7 @@ def process_and_upload(vid_url, lang_code, genre, level=None, series_data=None,
 
     if is_duplicate(lesson_id):
         print(f"      ⏭️  Skipped: {lesson_id} already exists.")
+        metrics.reject("duplicate")
         return False
 
     lesson = get_video_details(vid_url, lang_code, genre, level, is_pinned=is_pinned)
@@ -244,11 +274,13 @@ def process_and_upload(vid_url, lang_code, genre, level=None, series_data=None,
         if series_data:
             lesson.update(series_data)
         try:
-            db.collection(FIRESTORE_COLLECTION).document(lesson['id']).set(lesson)
+            set_lesson(get_db(), lesson) # Also writes the lesson_summaries mirror
             print(f"      ☁️  Uploaded to Firebase ({'PINNED' if is_pinned else 'NORMAL'}): {lesson['title'][:30]}...")
+            metrics.count("lessons_total", result="uploaded")
             return True
         except Exception as e:
             print(f"      ❌ Upload error: {e}")
+            metrics.count("lessons_total", result="upload_failed")
     return False
 
 def process_manual_link(url, lang_code, genre="manual", manual_level=None, is_pinned=False):
@@ -257,7 +289,8 @@ def process_manual_link(url, lang_code, genre="manual", manual_level=None, is_pi
     videos = []
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         try:
-            info = ydl.extract_info(url, download=False)
+            with metrics.timer("search"):
+                info = ydl.extract_info(url, download=False)
             if 'entries' in info:
                 for idx, entry in enumerate(info['entries'], start=1):
                     if entry: videos.append({
@@ -284,8 +317,12 @@ def run_automated_scraping(is_pinned=False):
         for query, genre in queries:
             if added >= 4: break
             with yt_dlp.YoutubeDL({'quiet': True, 'extract_flat': True}) as ydl:
-                try: result = ydl.extract_info(f"ytsearch3:{query}", download=False)
-                except: continue
+                try:
+                    with metrics.timer("search"):
+                        result = ydl.extract_info(f"ytsearch3:{query}", download=False)
+                except:
+                    metrics.count("search_errors_total")
+                    continue
                 for entry in result.get('entries', []):
                     if not entry: continue
                     v_url = f"https://www.youtube.com/watch?v={entry['id']}"
@@ -300,7 +337,10 @@ def main():
     parser.add_argument("--genre", type=str, default="manual")
     parser.add_argument("--level", type=str)
     parser.add_argument("--pinned", action="store_true", help="Pin to top (Year 2030)")
+    profiling.add_argument(parser)
     args = parser.parse_args()
+    metrics.start_run("generate_native_videos_firebase")
+    profiling.start(args.profile)
 
     if args.link:
         if not args.lang: sys.exit(print("❌ --lang required"))
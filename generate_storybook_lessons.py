@@ -1,7 +1,14 @@
 import os
-import json
 import re
 import datetime
+import hashlib
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+import catalog
+import json_io
+import metrics
+import profiling
 
 # ==============================================================================
 # CONFIGURATION
@@ -23,6 +30,11 @@ LEVEL_MAP = {
     '5': 'advanced'
 }
 
+# 4. INCREMENTAL BUILD INDEX
+# Tracks mtime/size/hash of every source markdown file so re-runs only
+# re-parse changed stories and only rewrite affected language files.
+INDEX_FILE = ".cache/storybooks_index.json"
+
 # ==============================================================================
 # LOGIC
 # ==============================================================================
@@ -135,12 +147,148 @@ def get_all_language_folders(root_path):
             
     return sorted(lang_folders)
 
-def process_languages():
+def build_lesson(lang_code, filename, file_path):
+    """Parses one markdown story into a lesson. Returns None for empty stories."""
+    with metrics.timer("parse"):
+        meta, content = parse_markdown(file_path)
+
+    # Skip files that are essentially empty
+    if len(content) < 20:
+        metrics.reject("empty")
+        return None
+
+    # Map Level to App Difficulty
+    raw_level = meta.get('level', '3').replace('Level', '').strip()
+    difficulty = LEVEL_MAP.get(raw_level, 'intermediate')
+
+    # Create Sentences for UI (Split by punctuation)
+    sentences = re.split(r'(?<=[.!?])\s+', content)
+    sentences = [s.strip() for s in sentences if s.strip()]
+
+    # Build Lesson Model
+    return {
+        "id": f"story_{lang_code}_{filename.replace('.md', '')}",
+        "userId": "system_storybooks",
+        "title": meta['title'],
+        "language": lang_code, # Uses folder name as language code
+        "content": content,
+        "sentences": sentences,
+        "transcript": [],
+        "createdAt": datetime.datetime.now().isoformat(),
+        "imageUrl": "assets/images/book_cover_placeholder.png", 
+        "type": "text",
+        "difficulty": difficulty,
+        "videoUrl": None,
+        "isFavorite": False,
+        "progress": 0,
+        "author": meta['author'],
+        "genre": "short_story" 
+    }
+
+def file_hash(file_path):
+    with open(file_path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+def scan_language(lang_code):
+    """Returns {filename: [mtime_ns, size]} for every markdown file of a language (stat only)."""
+    lang_path = os.path.join(REPO_ROOT_PATH, lang_code)
+    stats = {}
+    with os.scandir(lang_path) as entries:
+        for entry in entries:
+            if entry.name.endswith('.md') and entry.is_file():
+                st = entry.stat()
+                stats[entry.name] = [st.st_mtime_ns, st.st_size]
+    return stats
+
+def load_index():
+    if not os.path.exists(INDEX_FILE): return {}
+    try:
+        return json_io.load(INDEX_FILE)
+    except: return {}
+
+def save_index(index):
+    os.makedirs(os.path.dirname(INDEX_FILE), exist_ok=True)
+    json_io.dump(INDEX_FILE, index)
+
+def is_language_dirty(stats, old_files, output_file):
+    """Cheap check: any added/removed file or any mtime/size change."""
+    if not os.path.exists(output_file): return True
+    if stats.keys() != old_files.keys(): return True
+    return any(stats[name] != old_files[name][:2] for name in stats)
+
+def process_language(lang_code, stats, old_files, full=False):
+    """
+    Worker (runs in a process pool). Re-parses only stories whose content
+    hash changed and rewrites the language file only when something changed.
+    Returns (lang_code, new_file_index, stories_total, stories_parsed, written).
+    """
+    lang_path = os.path.join(REPO_ROOT_PATH, lang_code)
+    output_file = os.path.join(OUTPUT_DIR, f"storybooks_{lang_code}.json")
+
+    new_files = {}
+    changed = set()
+    for filename, stat in stats.items():
+        old = old_files.get(filename)
+        if not full and old and old[:2] == stat:
+            new_files[filename] = old
+            continue
+        digest = file_hash(os.path.join(lang_path, filename))
+        new_files[filename] = stat + [digest]
+        # Touched but identical content (e.g. fresh git checkout) is not a change
+        if full or not old or old[2] != digest:
+            changed.add(filename)
+
+    removed = old_files.keys() - stats.keys()
+    if not changed and not removed and os.path.exists(output_file):
+        return lang_code, new_files, 0, 0, False
+
+    # Reuse unchanged lessons from the catalog
+    conn = catalog.connect()
+    existing = {}
+    foreign = []
+    for item in catalog.load_source(conn, output_file):
+        if item.get('id', '').startswith(f"story_{lang_code}_"):
+            if not full: existing[item['id']] = item
+        else: foreign.append(item) # e.g. opus_ sets from generate_graded_readers.py
+
+    lessons = []
+    parsed = 0
+    for filename in sorted(stats):
+        lesson_id = f"story_{lang_code}_{filename.replace('.md', '')}"
+        if filename not in changed and lesson_id in existing:
+            lessons.append(existing[lesson_id])
+            continue
+        if filename not in changed:
+            continue # Unchanged and previously skipped as empty
+        try:
+            lesson = build_lesson(lang_code, filename, os.path.join(lang_path, filename))
+            parsed += 1
+            if lesson: lessons.append(lesson)
+        except Exception as e:
+            print(f"   ❌ Error parsing {lang_code}/{filename}: {e}")
+
+    lessons.extend(foreign)
+    if not lessons:
+        print(f"   ⚠️ No valid stories found in {lang_code}")
+        conn.close()
+        return lang_code, new_files, 0, parsed, False
+
+    # One transaction, then the asset file and its pages are exported from the catalog
+    catalog.save_source(conn, output_file, lessons)
+    catalog.export_sources(conn, [output_file])
+    conn.close()
+    return lang_code, new_files, len(lessons), parsed, True
+
+def run_language_job(lang_code, stats, old_files, full=False):
+    """Pool entry point: process_language's result plus the worker's metrics and profile for the parent."""
+    profiling.start_worker()
+    return process_language(lang_code, stats, old_files, full), metrics.collect(), profiling.collect()
+
+def process_languages(full=False, workers=None):
     if not os.path.exists(OUTPUT_DIR):
         os.makedirs(OUTPUT_DIR)
 
-    total_books = 0
-
+    start_time = time.time()
     print(f"🚀 Starting processing from repo: {REPO_ROOT_PATH}")
     
     # Dynamically get list of folders
@@ -152,77 +300,60 @@ def process_languages():
 
     print(f"🌍 Found {len(language_folders)} language folders.")
 
-    for lang_code in language_folders:
-        lang_path = os.path.join(REPO_ROOT_PATH, lang_code)
-        
-        print(f"📂 Processing {lang_code}...")
-        
-        lessons = []
-        # Get all markdown files in the specific language folder
-        files = [f for f in os.listdir(lang_path) if f.endswith('.md')]
+    # Import any hand-edited asset files before workers read the catalog
+    catalog.open_catalog().close()
 
-        for filename in files:
-            file_path = os.path.join(lang_path, filename)
-            
-            try:
-                meta, content = parse_markdown(file_path)
-                
-                # Skip files that are essentially empty
-                if len(content) < 20: 
-                    continue
-
-                # Map Level to App Difficulty
-                raw_level = meta.get('level', '3').replace('Level', '').strip()
-                difficulty = LEVEL_MAP.get(raw_level, 'intermediate')
-
-                # Create Sentences for UI (Split by punctuation)
-                sentences = re.split(r'(?<=[.!?])\s+', content)
-                sentences = [s.strip() for s in sentences if s.strip()]
-
-                # Build Lesson Model
-                lesson = {
-                    "id": f"story_{lang_code}_{filename.replace('.md', '')}",
-                    "userId": "system_storybooks",
-                    "title": meta['title'],
-                    "language": lang_code, # Uses folder name as language code
-                    "content": content,
-                    "sentences": sentences,
-                    "transcript": [],
-                    "createdAt": datetime.datetime.now().isoformat(),
-                    "imageUrl": "assets/images/book_cover_placeholder.png", 
-                    "type": "text",
-                    "difficulty": difficulty,
-                    "videoUrl": None,
-                    "isFavorite": False,
-                    "progress": 0,
-                    "author": meta['author'],
-                    "genre": "short_story" 
-                }
-                
-                lessons.append(lesson)
-
-            except Exception as e:
-                print(f"   ❌ Error parsing {filename}: {e}")
-
-        # Save to JSON if we found books
-        if lessons:
-            output_file = os.path.join(OUTPUT_DIR, f"storybooks_{lang_code}.json")
-            try:
-                with open(output_file, 'w', encoding='utf-8') as f:
-                    # Use separators to minify JSON size
-                    json.dump(lessons, f, ensure_ascii=False, separators=(',', ':'))
-                print(f"   ✅ Saved {len(lessons)} stories to {output_file}")
-                total_books += len(lessons)
-            except Exception as e:
-                print(f"   ❌ Error saving JSON: {e}")
+    index = {} if full else load_index()
+
+    # 1. Stat pass (cheap) to find languages that need work
+    jobs = []
+    new_index = {}
+    for lang_code in language_folders:
+        stats = scan_language(lang_code)
+        old_files = index.get(lang_code, {})
+        output_file = os.path.join(OUTPUT_DIR, f"storybooks_{lang_code}.json")
+        if full or is_language_dirty(stats, old_files, output_file):
+            jobs.append((lang_code, stats, old_files))
         else:
-            print(f"   ⚠️ No valid stories found in {lang_code}")
+            new_index[lang_code] = old_files
 
-    print(f"\n🎉 DONE! Processed {total_books} stories across {len(language_folders)} languages.")
+    print(f"🔁 {len(jobs)} languages changed, {len(language_folders) - len(jobs)} up to date.")
+
+    # 2. Parse dirty languages across a process pool
+    total_books = 0
+    total_parsed = 0
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_language_job, lang, stats, old, full) for lang, stats, old in jobs]
+            for future in futures:
+                (lang_code, files, count, parsed, written), worker_metrics, worker_profile = future.result()
+                metrics.merge(worker_metrics)
+                profiling.merge(worker_profile)
+                new_index[lang_code] = files
+                total_parsed += parsed
+                if written:
+                    total_books += count
+                    print(f"   ✅ Saved {count} stories to storybooks_{lang_code}.json ({parsed} re-parsed)")
+
+    save_index(new_index)
+
+    elapsed = time.time() - start_time
+    print(f"\n🎉 DONE! Re-parsed {total_parsed} stories, rewrote {total_books} lessons in {elapsed:.2f}s.")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--full", action="store_true", help="Ignore the index and rebuild every language")
+    parser.add_argument("--workers", type=int, help="Process pool size (default: CPU count)")
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+    metrics.start_run("generate_storybook_lessons")
+    profiling.start(args.profile)
 
-if __name__ == "__main__":
     if not os.path.exists(REPO_ROOT_PATH):
         print(f"❌ ERROR: Could not find the repository folder: '{REPO_ROOT_PATH}'")
-        print("   Please edit line 11 of this script to match your folder name.")
+        print("   Please set REPO_ROOT_PATH at the top of this script to match your folder name.")
     else:
-        process_languages()
\ No newline at end of file
+        process_languages(full=args.full, workers=args.workers)
+
+if __name__ == "__main__":
+    main()
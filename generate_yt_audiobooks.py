@@ -1,28 +1,34 @@
-import json
 import os
 import re
 import glob
-import yt_dlp
 import time
 import random
 import argparse
 import sys
-from yt_dlp.utils import DownloadError
 from datetime import datetime, timedelta
+from lesson_summaries import set_lesson
+import catalog
+import metrics
+import profiling
+import firebase_app
+from lazy_imports import lazy_import
+
+yt_dlp = lazy_import("yt_dlp")
 
 # --- FIREBASE INTEGRATION ---
-import firebase_admin
-from firebase_admin import credentials, firestore
-
-# Initialize Firebase
-try:
-    cred = credentials.Certificate("serviceAccountKey.json")
-    firebase_admin.initialize_app(cred)
-    db = firestore.client()
-    print("✅ Firebase initialized. Target collection: 'lessons'")
-except Exception as e:
-    print(f"❌ Firebase initialization failed: {e}")
-    sys.exit(1)
+# Connected on first use, so importing this module needs no credentials
+db = None
+
+def get_db():
+    global db
+    if db is None:
+        try:
+            db = firebase_app.client()
+            print("✅ Firebase initialized. Target collection: 'lessons'")
+        except Exception as e:
+            print(f"❌ Firebase initialization failed: {e}")
+            sys.exit(1)
+    return db
 
 # --- CONFIGURATION ---
 LOCAL_DATA_DIR = "assets/youtube_audio_library" # Used for duplicate checking only
@@ -91,24 +97,23 @@ class QuietLogger:
 # --- DUPLICATE CHECKING ---
 
 def is_duplicate(lesson_id):
-    """Checks Firebase and then local files to see if document exists."""
+    """Checks Firebase and then the local catalog to see if document exists."""
+    db = get_db()
     # 1. Check Firebase (Unified 'lessons' collection)
     try:
-        doc = db.collection(FIRESTORE_COLLECTION).document(lesson_id).get()
+        with metrics.timer("firestore_read"):
+            doc = db.collection(FIRESTORE_COLLECTION).document(lesson_id).get()
+        metrics.firestore_read()
         if doc.exists:
             return True
     except Exception: pass
 
-    # 2. Check Local Files (Read only from assets/youtube_audio_library)
-    if os.path.exists(LOCAL_DATA_DIR):
-        for file_path in glob.glob(os.path.join(LOCAL_DATA_DIR, "*.json")):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    local_lessons = json.load(f)
-                    if any(l.get('id') == lesson_id for l in local_lessons):
-                        return True
-            except: continue
-    return False
+    # 2. Check the local catalog (indexed lookup on assets/youtube_audio_library)
+    conn = catalog.connect()
+    try:
+        return catalog.has_lesson(conn, lesson_id, folder=LOCAL_DATA_DIR)
+    finally:
+        conn.close()
 
 # --- HELPERS ---
 
@@ -175,17 +180,20 @@ def get_audiobook_details(video_url, lang_code, genre, manual_level=None, max_re
 
     for attempt in range(max_retries):
         try:
-            with yt_dlp.YoutubeDL(ydl_opts_base) as ydl:
+            with yt_dlp.YoutubeDL(ydl_opts_base) as ydl, metrics.timer("info"):
                 info = ydl.extract_info(video_url, download=False)
                 if info: break
         except Exception: time.sleep(5)
     
-    if not info: return None
+    if not info:
+        metrics.reject("info_error")
+        return None
 
     # Filter by duration
     duration = info.get('duration', 0)
     if duration < 120 or duration > (14400 if genre == 'manual' else 7200):
         print(f"      ⚠️ Duration filter skip: {duration}s")
+        metrics.reject("duration")
         return None
 
     # Find Subtitles
@@ -199,7 +207,9 @@ def get_audiobook_details(video_url, lang_code, genre, manual_level=None, max_re
             if code == lang_code or code.startswith(f"{lang_code}-"):
                 found_sub_code = code; is_auto = True; break
     
-    if not found_sub_code: return None
+    if not found_sub_code:
+        metrics.reject("no_subtitles")
+        return None
 
     video_id = info['id']
     temp_filename = f"temp_aud_{lang_code}_{video_id}"
@@ -210,32 +220,42 @@ def get_audiobook_details(video_url, lang_code, genre, manual_level=None, max_re
 
     content = None
     try:
-        with yt_dlp.YoutubeDL(ydl_opts_dl) as ydl:
+        with yt_dlp.YoutubeDL(ydl_opts_dl) as ydl, metrics.timer("subtitles"):
             ydl.extract_info(video_url, download=True)
             files = glob.glob(f"{temp_filename}*.vtt")
             if files:
+                metrics.add_bytes("subtitles", os.path.getsize(max(files, key=os.path.getsize)))
                 with open(max(files, key=os.path.getsize), 'r', encoding='utf-8') as f: content = f.read()
     finally:
         for f in glob.glob(f"{temp_filename}*"):
             try: os.remove(f)
             except: pass
     
-    if not content: return None
+    if not content:
+        metrics.reject("subtitle_download")
+        return None
     
-    transcript = parse_vtt_to_transcript(content)
-    if not transcript or len(transcript) < 15: return None
+    with metrics.timer("parse"):
+        transcript = parse_vtt_to_transcript(content)
+    if not transcript or len(transcript) < 15:
+        metrics.reject("short_transcript")
+        return None
     full_text = " ".join([t['text'] for t in transcript])
+    with metrics.timer("parse"):
+        sentences = split_sentences(full_text)
+    with metrics.timer("difficulty"):
+        difficulty = manual_level or analyze_difficulty(full_text, info.get('title', ''))
     
     return {
         "id": f"yt_audio_{video_id}", "userId": "system_audiobook",
         "title": info.get('title', 'Unknown Title'), "language": lang_code,
-        "content": full_text, "sentences": split_sentences(full_text),
+        "content": full_text, "sentences": sentences,
         "transcript": transcript, 
         # 🔥 PINNING LOGIC APPLIED HERE
         "createdAt": get_automated_date(is_pinned=is_pinned),
         "imageUrl": info.get('thumbnail') or "", "type": "audio", 
         "videoUrl": f"https://www.youtube.com/watch?v={video_id}",
-        "difficulty": manual_level or analyze_difficulty(full_text, info.get('title', '')),
+        "difficulty": difficulty,
         "genre": genre, "isFavorite": False, "progress": 0
     }
 
@@ -248,6 +268,7 @@ def process_and_upload(vid_url, lang_code, genre, level=None, series_data=None,
 
     if is_duplicate(lesson_id):
         print(f"      ⏭️  Skipped: {lesson_id} exists.")
+        metrics.reject("duplicate")
         return False
 
     lesson = get_audiobook_details(vid_url, lang_code, genre, level, is_pinned=is_pinned)
@@ -255,11 +276,13 @@ def process_and_upload(vid_url, lang_code, genre, level=None, series_data=None,
         if series_data:
             lesson.update(series_data)
         try:
-            db.collection(FIRESTORE_COLLECTION).document(lesson['id']).set(lesson)
+            set_lesson(get_db(), lesson) # Also writes the lesson_summaries mirror
             print(f"      ☁️  Uploaded to Firebase ({'PINNED' if is_pinned else 'NORMAL'}): {lesson['title'][:30]}...")
+            metrics.count("lessons_total", result="uploaded")
             return True
         except Exception as e:
             print(f"      ❌ Upload error: {e}")
+            metrics.count("lessons_total", result="upload_failed")
     return False
 
 def process_manual_link(url, lang_code, genre="manual", manual_level=None, is_pinned=False):
@@ -270,7 +293,8 @@ def process_manual_link(url, lang_code, genre="manual", manual_level=None, is_pi
     videos = []
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         try:
-            info = ydl.extract_info(url, download=False)
+            with metrics.timer("search"):
+                info = ydl.extract_info(url, download=False)
             if 'entries' in info:
                 for idx, e in enumerate(info['entries'], 1):
                     if e: videos.append({
@@ -293,8 +317,12 @@ def run_automated_scraping(is_pinned=False):
         for query, genre in queries:
             if added >= 3: break
             with yt_dlp.YoutubeDL({'quiet': True, 'extract_flat': True}) as ydl:
-                try: res = ydl.extract_info(f"ytsearch4:{query}", download=False)
-                except: continue
+                try:
+                    with metrics.timer("search"):
+                        res = ydl.extract_info(f"ytsearch4:{query}", download=False)
+                except:
+                    metrics.count("search_errors_total")
+                    continue
                 for entry in res.get('entries', []):
                     if not entry: continue
                     v_url = f"https://www.youtube.com/watch?v={entry['id']}"
@@ -309,7 +337,11 @@ def main():
     parser.add_argument("--genre", type=str, default="manual")
     parser.add_argument("--level", type=str)
     parser.add_argument("--pinned", action="store_true", help="Pin to top (Year 2030)")
+    profiling.add_argument(parser)
     args = parser.parse_args()
+    metrics.start_run("generate_yt_audiobooks")
+    profiling.start(args.profile)
+    catalog.open_catalog().close() # Picks up hand edits to the asset files first
 
     if args.link:
         if not args.lang: sys.exit(print("❌ --lang required"))
@@ -0,0 +1,137 @@
+import os
+import json
+
+try:
+    import orjson # pip install orjson (optional, several times faster)
+except ImportError:
+    orjson = None
+
+# --- CONFIGURATION ---
+# Shared JSON I/O for the scripts. Reads, size checks and cache/state files
+# go through orjson when it is installed and fall back to the stdlib.
+#
+#   json_io.load(path)               whole file
+#   json_io.iter_array(path)         one element of a top-level array at a time
+#   json_io.encoded_size(lesson)     UTF-8 bytes of the compact encoding
+#   json_io.dump(path, data)         atomic write (.tmp + os.replace)
+#
+# Anything that is hashed or committed byte-for-byte (catalog.lesson_hash,
+# asset_pages.write_json, cdn_export, delta_packs) stays on the stdlib
+# encoder: orjson formats some floats differently (1e16 vs 1e+16), which
+# would change hashes depending on whether it is installed.
+CHUNK_SIZE = 1 << 16 # characters read per step by iter_array
+
+_decoder = json.JSONDecoder()
+
+def loads(data):
+    """Parses a str or bytes document."""
+    if orjson is not None: return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray)): data = data.decode('utf-8')
+    return json.loads(data)
+
+def load(path):
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+def dumps_bytes(data, indent=None, sort_keys=False, default=None):
+    """
+    Compact (or indent=2) UTF-8 JSON. Non-string keys or other indents use
+    the stdlib. `default` converts other objects, as in json.dumps.
+    """
+    if orjson is not None and indent in (None, 2):
+        option = (orjson.OPT_INDENT_2 if indent else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        try:
+            return orjson.dumps(data, default=default, option=option)
+        except TypeError: # orjson.JSONEncodeError: int keys, big ints, ...
+            pass
+    separators = None if indent is not None else (',', ':')
+    return json.dumps(data, ensure_ascii=False, indent=indent, separators=separators, sort_keys=sort_keys,
+                      default=default).encode('utf-8')
+
+def dumps(data, indent=None, sort_keys=False):
+    return dumps_bytes(data, indent, sort_keys).decode('utf-8')
+
+def encoded_size(data):
+    """Bytes of `data` as compact UTF-8 JSON (what a minified upload/file costs)."""
+    return len(dumps_bytes(data))
+
+def dump(path, data, indent=None, sort_keys=False):
+    """Atomic write of `data` to `path`."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(dumps_bytes(data, indent, sort_keys))
+    os.replace(tmp_path, path)
+
+# --- STREAMING ---
+
+def write_array(path, items, indent=None):
+    """
+    Atomic write of any iterable as a JSON array, encoding one element at a
+    time (same layout as dump() of a list). Returns the element count.
+    """
+    tmp_path = path + ".tmp"
+    newline = b"\n" + b" " * indent if indent else b""
+    count = 0
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(b"[")
+            for item in items:
+                encoded = dumps_bytes(item, indent)
+                if indent: encoded = encoded.replace(b"\n", newline)
+                f.write((b"," if count else b"") + newline + encoded)
+                count += 1
+            f.write(b"\n]" if indent and count else b"]")
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return count
+
+def iter_array(path, chunk_size=CHUNK_SIZE):
+    """
+    Yields the elements of the top-level JSON array in `path` one at a time,
+    reading `chunk_size` characters at a time, so scanning a large lesson
+    file (and stopping early) costs one element of memory, not the file.
+    Raises ValueError if the file isn't a JSON array, json.JSONDecodeError
+    (a ValueError) if it is malformed.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        buffer, pos, eof = "", 0, False
+        started = expect_comma = after_comma = False
+        while True:
+            # Skip whitespace, refilling the buffer as needed
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n": pos += 1
+                if pos < len(buffer) or eof: break
+                chunk = f.read(chunk_size)
+                buffer, pos, eof = chunk, 0, not chunk
+
+            if pos >= len(buffer):
+                raise json.JSONDecodeError("Unexpected end of file", buffer, pos)
+            char = buffer[pos]
+            if not started:
+                if char != "[": raise ValueError(f"{path} is not a JSON array")
+                started, pos = True, pos + 1
+                continue
+            if char == "]" and not after_comma: return
+            if expect_comma:
+                if char != ",": raise json.JSONDecodeError("Expecting ',' delimiter", buffer, pos)
+                expect_comma, after_comma, pos = False, True, pos + 1
+                continue
+
+            try:
+                value, end = _decoder.raw_decode(buffer, pos)
+                # A number cut off by the buffer end ("12" of "12.5e3") may continue in the next chunk
+                complete = eof or buffer[end - 1] in '}]"' or (end < len(buffer) and buffer[end] not in "0123456789+-.eE")
+            except json.JSONDecodeError:
+                if eof: raise
+                complete = False
+            if not complete:
+                # Element spans the buffer end: read at least as much again (keeps retries linear)
+                chunk = f.read(max(chunk_size, len(buffer) - pos))
+                buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+                continue
+            yield value
+            pos, expect_comma, after_comma = end, True, False
+            if pos > chunk_size:
+                buffer, pos = buffer[pos:], 0
@@ -0,0 +1,30 @@
+import sys
+import importlib.util
+
+# --- LAZY IMPORTS ---
+# yt-dlp, firebase_admin (+ grpc) and requests add seconds of import time
+# between them. Scripts bind them with lazy_import() so importing a helper
+# (parse_vtt_to_transcript, say), `--help` and pool workers only pay for a
+# dependency once something actually uses it:
+#
+#   yt_dlp = lazy_import("yt_dlp")     # runs yt_dlp's code on first attribute access
+
+class MissingModule:
+    """Stands in for a module that isn't installed; fails on first use, not at import."""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        raise ImportError(f"'{self._name}' is not installed (pip install {self._name.split('.')[0].replace('_', '-')})")
+
+def lazy_import(name):
+    if name in sys.modules: return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None: return MissingModule(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
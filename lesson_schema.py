@@ -0,0 +1,209 @@
+import re
+import datetime
+
+# --- CONFIGURATION ---
+# Shape of a `lessons` document, as HybridLessonService._mapJsonToLesson and
+# TranscriptLine.fromMap read it. Generators disagree on the details
+# (videoUrl null or missing, '.000Z' vs isoformat() dates, genre absent), so
+# only what the app can't recover from is an error. Fields that
+# canonical_lesson() drops when empty or default (sentences, transcript,
+# isFavorite, progress) are optional. Unknown fields are allowed and counted
+# towards the size.
+#
+#   errors, size = lesson_schema.check(lesson)    # [] when valid; exact Firestore bytes
+#   lesson_schema.require_valid(lesson)           # raises ValueError
+#
+# check() is generated from LESSON_FIELDS once at import time (one straight
+# run of type tests per field, no per-field dispatch), so it can cover the
+# whole library before sync makes its first network call.
+#
+# field: (kind, required). Kinds are listed in _KINDS; a trailing '?' also allows null.
+LESSON_FIELDS = {
+    "id":          ("doc_id", True),
+    "title":       ("str", True),
+    "language":    ("str", True),
+    "userId":      ("str", True),
+    "content":     ("str", True),
+    "type":        ("str", True),
+    "difficulty":  ("str", True),
+    "createdAt":   ("date", True),
+    "sentences":   ("str_list", False),
+    "transcript":  ("transcript", False),
+    "imageUrl":    ("str?", False),
+    "videoUrl":    ("str?", False),
+    "audioUrl":    ("str?", False),
+    "genre":       ("str?", False),
+    "author":      ("str?", False),
+    "seriesId":    ("str?", False),
+    "seriesTitle": ("str?", False),
+    "seriesIndex": ("int", False),
+    "isFavorite":  ("bool", False),
+    "progress":    ("number", False),
+    "duration":    ("number", False),
+    "related":     ("str_list", False),
+    "contentHash": ("str", False),
+}
+
+# https://firebase.google.com/docs/firestore/storage-size
+MAX_DOCUMENT_SIZE = 1048576 # 1 MiB, including the document name
+MAX_ID_BYTES = 1500
+DOCUMENT_OVERHEAD = 32
+NAME_OVERHEAD = 16
+
+# What Dart's DateTime.tryParse accepts ('2025-12-10T10:00:00.000Z', isoformat(), ...)
+ISO_DATE = re.compile(r"\d{4}-\d{2}-\d{2}(?:[T ]\d{2}:\d{2}(?::\d{2}(?:[.,]\d+)?)?(?:Z|[+-]\d{2}(?::?\d{2})?)?)?\Z")
+
+# --- FIRESTORE SIZES ---
+# A document is the size of its name + the sum of its fields + 32 bytes. A
+# field is its name (as a string) + its value: strings are UTF-8 bytes + 1,
+# numbers and timestamps 8, booleans and null 1, geo points 16, bytes their
+# length, arrays and maps the sum of their contents.
+
+def string_size(value):
+    return (len(value) if value.isascii() else len(value.encode('utf-8'))) + 1
+
+def value_size(value):
+    kind = type(value)
+    if kind is str: return string_size(value)
+    if kind is bool or value is None: return 1
+    if kind is int or kind is float: return 8
+    if kind is dict: return sum(string_size(key) + value_size(item) for key, item in value.items())
+    if kind is list or kind is tuple: return sum(value_size(item) for item in value)
+    if kind is bytes: return len(value)
+    if isinstance(value, datetime.datetime): return 8
+    if hasattr(value, 'latitude'): return 16 # GeoPoint
+    if hasattr(value, 'path'): return name_size(*value.path.split('/')) # DocumentReference
+    return 8 # SERVER_TIMESTAMP and the other sentinels resolve to a timestamp or number
+
+def name_size(*path):
+    """Size of a document name: 'lessons', 'abc' -> 8 + 4 + 16."""
+    return sum(string_size(str(segment)) for segment in path) + NAME_OVERHEAD
+
+def document_size(data, collection="lessons", doc_id=None):
+    """Exact stored size of `data` as document `collection/doc_id` (defaults to data['id'])."""
+    doc_id = data.get('id', '') if doc_id is None else doc_id
+    return name_size(collection, doc_id) + value_size(data) + DOCUMENT_OVERHEAD
+
+# --- FIELD KINDS ---
+# Each kind is a type test and the value's size without the trailing +1 of
+# strings, both on `value`. The list kinds' size helpers return -1 when an
+# element is the wrong type, so their test binds the size to `n`.
+
+def _valid_id(value):
+    return (value and '/' not in value and value not in ('.', '..')
+            and not (value.startswith('__') and value.endswith('__'))
+            and string_size(value) - 1 <= MAX_ID_BYTES)
+
+def _str_list_size(value):
+    try:
+        joined = "".join(value)
+    except TypeError:
+        return -1
+    return (len(joined) if joined.isascii() else len(joined.encode('utf-8'))) + len(value)
+
+# {'text': str, 'start': num, 'end': num}: key sizes + two numbers, plus the text
+_LINE_SIZE = string_size('text') + string_size('start') + string_size('end') + 8 + 8
+_NUMBER_TYPES = frozenset((int, float))
+
+def _transcript_size(value):
+    # Comprehensions rather than one loop: most lessons have dozens of lines
+    try:
+        texts = [line['text'] for line in value]
+        times = {type(line['start']) for line in value} | {type(line['end']) for line in value}
+    except (KeyError, TypeError): # a line that isn't a {text, start, end} dict
+        return -1
+    size = _str_list_size(texts)
+    if size < 0 or not times <= _NUMBER_TYPES: return -1
+    size += _LINE_SIZE * len(texts)
+    for line in value:
+        if len(line) != 3: # extra keys: counted, not rejected
+            size += value_size(line) - _LINE_SIZE - string_size(line['text'])
+    return size
+
+_UTF8_LEN = "(len(value) if value.isascii() else len(value.encode('utf-8')))"
+
+_KINDS = {
+    "str":        ("type(value) is str", _UTF8_LEN + " + 1"),
+    "doc_id":     ("type(value) is str and _valid_id(value)", _UTF8_LEN + " + 1"),
+    "int":        ("type(value) is int", "8"),
+    "number":     ("type(value) is int or type(value) is float", "8"),
+    "bool":       ("type(value) is bool", "1"),
+    "date":       ("(type(value) is str and ISO_DATE.match(value) is not None) or isinstance(value, datetime.datetime)",
+                   "value_size(value)"),
+    "str_list":   ("type(value) is list and (n := _str_list_size(value)) >= 0", "n"),
+    "transcript": ("type(value) is list and (n := _transcript_size(value)) >= 0", "n"),
+}
+
+_DESCRIPTIONS = {
+    "doc_id": "a document ID (non-empty, no '/', at most 1500 bytes)",
+    "date": "an ISO-8601 date string",
+    "str_list": "a list of strings",
+    "transcript": "a list of {text, start, end}",
+}
+
+def _field_source(name, kind, required):
+    nullable = kind.endswith('?')
+    kind = kind.rstrip('?')
+    test, size = _KINDS[kind]
+    expected = _DESCRIPTIONS.get(kind, kind) + (" or null" if nullable else "")
+    key_size = string_size(name)
+    # Valid values take the first branch: one test and one addition per field
+    source = f"""
+    value = lesson.get({name!r}, _MISSING)
+    if {test}:
+        size += {key_size} + {size}
+        present += 1
+    elif value is _MISSING:
+        {f"errors.append({f'missing {name!r}'!r})" if required else "pass"}"""
+    if nullable:
+        source += f"""
+    elif value is None:
+        size += {key_size + 1}
+        present += 1"""
+    return source + f"""
+    else:
+        errors.append({f'{name!r} must be {expected}, got '!r} + type(value).__name__)
+        size += {key_size} + value_size(value)
+        present += 1
+"""
+
+def compile_check(fields, collection="lessons"):
+    """
+    Builds check(lesson) -> (errors, size) for `fields` (see LESSON_FIELDS):
+    a list of problems, empty when valid, and the exact Firestore size of the
+    lesson stored as `collection/<id>`.
+    """
+    source = ["def check(lesson):",
+              "    if type(lesson) is not dict: return ['not an object'], 0",
+              "    errors = []",
+              "    size = 0",
+              "    present = 0"]
+    source += [_field_source(name, kind, required) for name, (kind, required) in fields.items()]
+    source += ["    if present != len(lesson):",
+               "        for key, value in lesson.items():",
+               "            if key not in _FIELDS: size += string_size(key) + value_size(value)",
+               f"    size += {string_size(collection) + NAME_OVERHEAD + DOCUMENT_OVERHEAD} + value_size(str(lesson.get('id', '')))",
+               "    return errors, size"]
+    namespace = {
+        "_MISSING": object(), "_FIELDS": frozenset(fields),
+        "ISO_DATE": ISO_DATE, "datetime": datetime,
+        "string_size": string_size, "value_size": value_size,
+        "_valid_id": _valid_id, "_str_list_size": _str_list_size, "_transcript_size": _transcript_size,
+    }
+    exec(compile("\n".join(source), f"<lesson_schema:{collection}>", "exec"), namespace)
+    return namespace["check"]
+
+check = compile_check(LESSON_FIELDS)
+
+def problems(lesson):
+    """Schema errors plus an oversize error; empty when the lesson can be written."""
+    errors, size = check(lesson)
+    if size > MAX_DOCUMENT_SIZE:
+        errors.append(f"{size:,} bytes, over Firestore's {MAX_DOCUMENT_SIZE:,}-byte document limit")
+    return errors
+
+def require_valid(lesson):
+    errors = problems(lesson)
+    if errors:
+        lesson_id = lesson.get('id') if isinstance(lesson, dict) else None
+        raise ValueError(f"Invalid lesson {lesson_id}: " + "; ".join(errors))
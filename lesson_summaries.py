@@ -0,0 +1,111 @@
+# --- LESSON SUMMARIES ---
+# Feed screens only need card metadata, but a full `lessons` document can be
+# ~950KB (content + sentences + transcript). Every write/delete of a lesson
+# also maintains a tiny mirror in `lesson_summaries` so feed queries can
+# read kilobytes per page instead of megabytes.
+#
+# The app does not read the mirror yet: HybridLessonService still pages full
+# `lessons` documents. Switching it means loading a lesson's body when it is
+# opened (summaries carry no content or transcript), which is an app change
+# of its own; until then this collection, its rules and its index are only
+# kept ready for it.
+
+import datetime
+from collections import Counter
+import metrics
+import lesson_schema
+
+LESSONS_COLLECTION = "lessons"
+SUMMARY_COLLECTION = "lesson_summaries"
+
+SUMMARY_FIELDS = [
+    "id", "title", "language", "userId", "genre",
+    "difficulty", "duration", "imageUrl", "createdAt",
+]
+
+# Same category -> userId mapping as HybridLessonService.fetchPagedSystemLessons
+FEED_CATEGORIES = {
+    "video": ["system_native"],
+    "guided": ["system", "system_course"],
+    "audio": ["system_librivox", "system_audiobook"],
+    "book": ["system_gutenberg", "system_beginner", "system_storybooks"],
+}
+
+# Generators "pin" lessons by dating them in 2030 (see get_automated_date)
+PINNED_YEAR = 2030
+
+def parse_created_at(value):
+    """Generators write both '...000Z' strings and isoformat(); normalise for sorting."""
+    if isinstance(value, datetime.datetime):
+        return value.replace(tzinfo=None)
+    try:
+        return datetime.datetime.fromisoformat(str(value).replace("Z", "")).replace(tzinfo=None)
+    except Exception:
+        return datetime.datetime.min
+
+def is_pinned(lesson):
+    return parse_created_at(lesson.get("createdAt")).year >= PINNED_YEAR
+
+def feed_sort_key(lesson):
+    """Sort with reverse=True for feed order: pinned first, then newest first."""
+    return (is_pinned(lesson), parse_created_at(lesson.get("createdAt")))
+
+def category_for(user_id):
+    for category, user_ids in FEED_CATEGORIES.items():
+        if user_id in user_ids: return category
+    return None
+
+def build_summary(lesson, lesson_id=None):
+    """Returns the summary document for a full lesson dict (missing fields are left out)."""
+    summary = {field: lesson[field] for field in SUMMARY_FIELDS if lesson.get(field) is not None}
+    summary["id"] = str(lesson_id or lesson.get("id"))
+    return summary
+
+# The helpers below return their writes as a Counter per collection. Without
+# a batch they commit and count them; with one the caller adds them up and
+# passes the total to metrics.firestore_commit once the batch commits.
+
+def _commit(commit, writes):
+    """Runs a commit and counts `writes` as written, or as failed if it raises."""
+    try:
+        with metrics.timer("firestore_write"): commit()
+    except Exception:
+        metrics.firestore_commit(writes, committed=False)
+        raise
+    metrics.firestore_commit(writes)
+
+def set_lesson(db, lesson, batch=None, merge=False):
+    """
+    Writes a lesson and its summary. With a batch both writes commit
+    atomically (counts as 2 writes against the 500-write batch limit);
+    without one a 2-write batch is created and committed immediately.
+    Raises ValueError, before any Firestore call, if the lesson is malformed
+    or over the document size limit.
+    """
+    lesson_schema.require_valid(lesson)
+    lesson_id = str(lesson["id"])
+    writer = batch or db.batch()
+    writer.set(db.collection(LESSONS_COLLECTION).document(lesson_id), lesson, merge=merge)
+    writer.set(db.collection(SUMMARY_COLLECTION).document(lesson_id), build_summary(lesson, lesson_id), merge=merge)
+    writes = Counter({LESSONS_COLLECTION: 1, SUMMARY_COLLECTION: 1})
+    if batch is None: _commit(writer.commit, writes)
+    return writes
+
+def set_summary(db, lesson, batch=None):
+    """Writes only the summary (backfill for lessons that already exist)."""
+    lesson_id = str(lesson["id"])
+    ref = db.collection(SUMMARY_COLLECTION).document(lesson_id)
+    writes = Counter({SUMMARY_COLLECTION: 1})
+    if batch is None: _commit(lambda: ref.set(build_summary(lesson, lesson_id)), writes)
+    else: batch.set(ref, build_summary(lesson, lesson_id))
+    return writes
+
+def delete_lesson(db, lesson_id, batch=None):
+    """Deletes a lesson and its summary (2 writes)."""
+    lesson_id = str(lesson_id)
+    writer = batch or db.batch()
+    writer.delete(db.collection(LESSONS_COLLECTION).document(lesson_id))
+    writer.delete(db.collection(SUMMARY_COLLECTION).document(lesson_id))
+    writes = Counter({LESSONS_COLLECTION: 1, SUMMARY_COLLECTION: 1})
+    if batch is None: _commit(writer.commit, writes)
+    return writes
@@ -1,4 +1,5 @@
 import 'dart:convert';
+import 'package:flutter/foundation.dart' show FlutterError;
 import 'package:flutter/services.dart';
 import 'package:cloud_firestore/cloud_firestore.dart';
 import 'package:linguaflow/models/lesson_model.dart';
@@ -190,8 +191,7 @@ class HybridLessonService {
     String defaultUserId,
   ) async {
     try {
-      final String jsonString = await rootBundle.loadString(path);
-      final List<dynamic> data = json.decode(jsonString);
+      final List<dynamic> data = await _loadFirstPage(path);
 
       return data
           .take(50) // Optimization: Limit local load for memory
@@ -202,6 +202,26 @@ class HybridLessonService {
     }
   }
 
+  /// Paged bundles (see asset_pages.py): `assets/x/fr.json` has its pages in
+  /// `assets/x/fr/` with a small manifest, so only one page is decoded.
+  /// Falls back to the monolithic file when no pages are bundled.
+  Future<List<dynamic>> _loadFirstPage(String path) async {
+    final pagesDir = path.substring(0, path.length - '.json'.length);
+    final String manifestJson;
+    try {
+      manifestJson = await rootBundle.loadString('$pagesDir/manifest.json');
+    } on FlutterError {
+      // No pages bundled for this file (rootBundle throws for a missing asset)
+      return json.decode(await rootBundle.loadString(path));
+    }
+    final Map<String, dynamic> manifest = json.decode(manifestJson);
+    final List<dynamic> pages = manifest['pages'] ?? [];
+    if (pages.isEmpty) return [];
+    return json.decode(
+      await rootBundle.loadString('$pagesDir/${pages.first}'),
+    );
+  }
+
   Future<List<LessonModel>> _loadFromFirestore(
     String languageCode,
     List<String> userIds, {
@@ -0,0 +1,70 @@
+import sys
+import argparse
+import importlib
+
+# --- CONFIGURATION ---
+# One entry point for the generators and the Firestore tools:
+#
+#   python linguaflow.py sync --full
+#   python linguaflow.py native-videos-firebase --link URL --lang es
+#   python linguaflow.py books --help
+#
+# The rest of the command line goes to the script's own main(), so every
+# flag works as it does with `python <script>.py`. Only the chosen script is
+# imported, and the scripts load yt-dlp, firebase_admin, requests and numpy
+# on first use, so `--help` is instant and needs no credentials.
+COMMANDS = {
+    # Pipeline
+    "all":                     ("generate_all", "Run every generator stage, then the build steps"),
+    # Generators (local assets)
+    "course-content":          ("generate_course_content", "YouTube course videos -> assets/course_videos"),
+    "guided-courses":          ("generate_guided_courses", "YouTube guided courses -> assets/guided_courses"),
+    "native-videos":           ("generate_native_videos", "YouTube native-speaker videos -> assets/native_videos"),
+    "yt-audiobooks":           ("generate_yt_audiobooks", "YouTube audiobooks -> assets/youtube_audio_library"),
+    "storybooks":              ("generate_storybook_lessons", "Global Storybooks -> assets/storybooks_lessons"),
+    "graded-readers":          ("generate_graded_readers", "Graded OPUS sentence-practice sets -> assets/storybooks_lessons"),
+    "books":                   ("generate_books", "Project Gutenberg books -> assets/text_lessons"),
+    "beginner-books":          ("generate_beginner_books", "Beginner Project Gutenberg books -> assets/beginner_books"),
+    "audio-library":           ("generate_audio_library", "LibriVox / Internet Archive audio -> assets/audio_library"),
+    # Generators (straight to Firestore)
+    "course-content-firebase": ("generate_course_content_firebase", "YouTube course videos -> Firestore"),
+    "guided-courses-firebase": ("generate_guided_courses_firebase", "YouTube guided courses -> Firestore"),
+    "native-videos-firebase":  ("generate_native_videos_firebase", "YouTube native-speaker videos -> Firestore"),
+    "yt-audiobooks-firebase":  ("generate_yt_audiobooks_firebase", "YouTube audiobooks -> Firestore"),
+    # Firestore
+    "sync":                    ("sync_to_firebase", "Upload new and changed local lessons"),
+    "sync-quizzes":            ("sync_progression_quizzes", "Upload the progression quiz levels"),
+    "home-feeds":              ("build_home_feeds", "Rebuild the precomputed home feed documents"),
+    "delete":                  ("delete_text_lessons", "Delete the Gutenberg text lessons"),
+    "bulk-delete":             ("bulk_delete", "Delete lessons by userId, language, genre, ID prefix or date"),
+    "export":                  ("export_lessons", "Export the lessons collection to gzipped JSONL shards"),
+    "reconcile":               ("reconcile", "Diff local lessons against Firestore and write a repair plan for sync"),
+    # Tools
+    "benchmark":               ("benchmarks", "Benchmark the text-processing hot paths"),
+    "loadtest":                ("loadtest", "Load-test the Firestore writers against a fake or the emulator"),
+}
+
+def command_list():
+    width = max(len(name) for name in COMMANDS)
+    return "commands:\n" + "\n".join(f"  {name:{width}}  {help}" for name, (_, help) in COMMANDS.items())
+
+def run(command, argv):
+    """Runs `command`'s main() as if it had been started as its own script."""
+    module = importlib.import_module(COMMANDS[command][0])
+    sys.argv = [f"linguaflow {command}"] + list(argv)
+    return module.main()
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="linguaflow",
+        description="LinguaFlow content pipeline. `linguaflow <command> --help` shows a command's options.",
+        epilog=command_list(),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("command", choices=COMMANDS, metavar="<command>")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Passed to the command")
+    args = parser.parse_args()
+    return run(args.command, args.args)
+
+if __name__ == "__main__":
+    main()
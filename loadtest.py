@@ -0,0 +1,804 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import datetime
+import tempfile
+import importlib
+import threading
+import contextlib
+import urllib.request
+
+import catalog
+import metrics
+import firebase_app
+import lesson_schema
+from lesson_summaries import build_summary, LESSONS_COLLECTION, SUMMARY_COLLECTION
+
+# --- CONFIGURATION ---
+# Load tests for the Firestore writers, run against an in-process fake (default)
+# or the local Firestore emulator (`firebase emulators:start --only firestore`,
+# then --emulator localhost:8080). Nothing here touches production.
+#
+#   sync       sync_to_firebase.process_file over a synthetic library
+#              (cold pass, retry pass after injected failures, warm pass)
+#   quizzes    sync_progression_quizzes.process_file over synthetic quiz files
+#   delete     delete_text_lessons.delete_collection_by_query (bulk_delete.py)
+#   export     export_lessons.export into gzipped JSONL shards
+#   ingest     process_and_upload of each *_firebase.py ingester, with the
+#              YouTube lookup replaced by a synthetic lesson
+#
+# Reports docs/sec, reads/writes as counted by the scripts (metrics.py) and,
+# for the fake, as Firestore would bill them, plus failed batches, the writes
+# they carried and how many documents are missing afterwards.
+LESSONS = 100_000
+QUIZZES = 1_000
+INGEST_LESSONS = 1_000
+EXISTING_SHARE = 0.1     # share of the library already in Firestore before the sync
+OVERSIZE_SHARE = 0.0005  # lessons over the 1 MiB document limit
+DELETE_SHARE = 0.5       # share of the seeded library owned by delete_text_lessons.TARGET_USER_ID
+EXPORT_PARTITIONS = 32
+EXPORT_WORKERS = 8
+EMULATOR_PROJECT = "demo-linguaflow"
+
+# Firestore limits enforced by the fake
+MAX_DOCUMENT_BYTES = 1_048_576
+MAX_BATCH_WRITES = 500
+MAX_REQUEST_BYTES = 10 * 1_048_576
+
+# Synthetic lessons are spread over these languages in every sync directory
+LIBRARY_LANGUAGES = ["es", "fr", "de", "it", "pt", "ja", "ko", "zh", "ru", "sw", "yo", "ha"]
+LIBRARY_USER_IDS = {
+    "assets/guided_courses": "system",
+    "assets/native_videos": "system_native",
+    "assets/audio_library": "system_librivox",
+    "assets/youtube_audio_library": "system_audiobook",
+    "assets/text_lessons": "system_gutenberg",
+    "assets/beginner_books": "system_beginner",
+}
+
+# module -> (lookup replaced by a synthetic lesson, lesson ID prefix)
+INGESTERS = {
+    "generate_course_content_firebase": ("get_video_details", "yt_"),
+    "generate_guided_courses_firebase": ("get_video_details", "yt_"),
+    "generate_native_videos_firebase": ("get_video_details", "yt_"),
+    "generate_yt_audiobooks_firebase": ("get_audiobook_details", "yt_audio_"),
+}
+
+WORDS = ("el la casa perro gato libro agua tiempo ciudad mundo amigo noche día camino "
+         "historia pequeño grande nuevo viejo bueno rápido lento siempre nunca también").split()
+
+# --- IN-PROCESS FIRESTORE ---
+
+class FakeFirestoreError(Exception):
+    pass
+
+class FakeServerTimestamp:
+    """Stands in for firestore.SERVER_TIMESTAMP; the fake stores the commit time."""
+    def __repr__(self): return "SERVER_TIMESTAMP"
+
+SERVER_TIMESTAMP = FakeServerTimestamp()
+
+def document_size(ref, data):
+    return lesson_schema.document_size(data, ref.collection_name, ref.id)
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+    def get(self, field):
+        return (self._data or {}).get(field)
+
+class FakeDocument:
+    def __init__(self, client, collection, doc_id):
+        self._client = client
+        self.collection_name = collection
+        self.id = str(doc_id)
+
+    @property
+    def path(self):
+        return f"{self.collection_name}/{self.id}"
+
+    def get(self):
+        return self._client._get([self])[0]
+
+    def set(self, data, merge=False):
+        self._client._commit([("set", self, data, merge)])
+
+    def update(self, data):
+        self._client._commit([("update", self, data, True)])
+
+    def delete(self):
+        self._client._commit([("delete", self, None, False)])
+
+class FakeAggregate:
+    def __init__(self, value):
+        self.value = value
+
+class FakeQuery:
+    OPERATORS = {
+        "==": lambda a, b: a == b, "!=": lambda a, b: a != b,
+        "<": lambda a, b: a is not None and a < b, "<=": lambda a, b: a is not None and a <= b,
+        ">": lambda a, b: a is not None and a > b, ">=": lambda a, b: a is not None and a >= b,
+        "in": lambda a, b: a in b,
+    }
+
+    def __init__(self, client, collection, filters=(), limit_to=None, order=(), start=None, end=None, fields=None):
+        self._client = client
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._limit = limit_to
+        self._order = tuple(order)
+        self._start = start # (snapshot or {field: value}, inclusive)
+        self._end = end     # (snapshot or {field: value}, inclusive)
+        self._fields = fields
+
+    def _copy(self, **changes):
+        state = dict(filters=self._filters, limit_to=self._limit, order=self._order,
+                     start=self._start, end=self._end, fields=self._fields)
+        return FakeQuery(self._client, self._collection, **{**state, **changes})
+
+    def where(self, field, op, value):
+        return self._copy(filters=self._filters + ((field, op, value),))
+
+    def limit(self, count):
+        return self._copy(limit_to=count)
+
+    def order_by(self, field, direction="ASCENDING"):
+        return self._copy(order=self._order + ((field, direction == "DESCENDING"),))
+
+    def start_after(self, cursor):
+        return self._copy(start=(cursor, False))
+
+    def start_at(self, cursor):
+        return self._copy(start=(cursor, True))
+
+    def end_before(self, cursor):
+        return self._copy(end=(cursor, False))
+
+    def select(self, fields):
+        return self._copy(fields=tuple(fields))
+
+    def count(self):
+        return FakeCountQuery(self)
+
+    def stream(self):
+        return iter(self._client._query(self._collection, self._filters, self._limit, self._order, self._start, self._end, self._fields))
+
+    def get(self):
+        return list(self.stream())
+
+class FakeCountQuery:
+    def __init__(self, query):
+        self._query = query
+
+    def get(self):
+        q = self._query
+        return [[FakeAggregate(self._query._client._count(q._collection, q._filters))]]
+
+class FakeCollection(FakeQuery):
+    def __init__(self, client, name):
+        super().__init__(client, name)
+        self.id = name
+
+    def document(self, doc_id):
+        return FakeDocument(self._client, self._collection, doc_id)
+
+    def get_partitions(self, partition_count):
+        start = None
+        for split in self._client._partitions(self._collection, partition_count):
+            yield FakePartition(start, split)
+            start = split
+        yield FakePartition(start, None)
+
+class FakePartition:
+    def __init__(self, start_at, end_at):
+        self.start_at = start_at
+        self.end_at = end_at
+
+class FakeBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def set(self, reference, data, merge=False):
+        self._writes.append(("set", reference, data, merge))
+
+    def update(self, reference, data):
+        self._writes.append(("update", reference, data, True))
+
+    def delete(self, reference):
+        self._writes.append(("delete", reference, None, False))
+
+    def commit(self):
+        writes, self._writes = self._writes, []
+        return self._client._commit(writes)
+
+class FakeFirestore:
+    """
+    Thread-safe, in-memory stand-in for the firestore.client() surface the
+    scripts use (collection/document/get/set/update/delete, where/order_by/
+    select/cursors/limit/stream, count, collection_group/get_partitions,
+    batch, get_all). Enforces the document, batch and request size limits,
+    commits batches atomically, and can add RPC latency and fail commits.
+    Queries without order_by return documents in insertion order, not by ID.
+    """
+
+    def __init__(self, latency=0.0, fail_rate=0.0, seed=0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._store = {} # collection -> {id: data}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {'rpcs': 0, 'reads': 0, 'writes': 0, 'commits': 0, 'failedCommits': 0}
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def collection_group(self, name):
+        # Only top-level collections exist here, so the group is the collection
+        return FakeCollection(self, name)
+
+    def document(self, path):
+        collection, doc_id = path.split("/")
+        return FakeDocument(self, collection, doc_id)
+
+    def _partitions(self, collection, count):
+        """Split points of `collection` into `count` ID ranges, like partition_query."""
+        self._rpc()
+        with self._lock:
+            ids = sorted(self._store.get(collection, {}))
+            self.stats['reads'] += 1
+        step = len(ids) / count
+        return [FakeDocument(self, collection, ids[int(step * i)]) for i in range(1, count) if int(step * i) < len(ids)]
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def get_all(self, references):
+        return self._get(list(references))
+
+    def _rpc(self):
+        if self.latency: time.sleep(self.latency)
+        with self._lock:
+            self.stats['rpcs'] += 1
+
+    def _get(self, references):
+        self._rpc()
+        with self._lock:
+            self.stats['reads'] += len(references)
+            return [FakeSnapshot(ref, self._store.get(ref.collection_name, {}).get(ref.id)) for ref in references]
+
+    @staticmethod
+    def _field(doc_id, data, field):
+        return doc_id if field == "__name__" else data.get(field)
+
+    def _matches(self, collection, filters):
+        for doc_id, data in self._store.get(collection, {}).items():
+            # Document-ID filters compare against a reference, like the real client
+            if all(FakeQuery.OPERATORS[op](self._field(doc_id, data, field), getattr(value, 'id', value))
+                   for field, op, value in filters):
+                yield doc_id, data
+
+    def _query(self, collection, filters, limit, order=(), start=None, end=None, fields=None):
+        self._rpc()
+        results = []
+        with self._lock:
+            matches = self._matches(collection, filters)
+            if order:
+                # Sorted by the order_by fields, then cut at the cursors' values
+                key = lambda item: tuple(self._field(item[0], item[1], field) for field, _ in order)
+                descending = order[0][1]
+                matches = sorted(matches, key=key, reverse=descending)
+                for bound, is_start in ((start, True), (end, False)):
+                    if bound is None: continue
+                    cursor, inclusive = bound
+                    values = tuple(self._cursor_value(cursor, field) for field, _ in order)
+                    ahead = is_start != descending # keep keys after (start) or before (end) the cursor
+                    matches = [item for item in matches
+                               if (key(item) == values and inclusive) or (key(item) > values if ahead else key(item) < values)]
+            for doc_id, data in matches:
+                if fields is not None:
+                    data = {field: data[field] for field in fields if field in data}
+                results.append(FakeSnapshot(FakeDocument(self, collection, doc_id), data))
+                if limit and len(results) >= limit: break
+            self.stats['reads'] += max(len(results), 1) # an empty result is billed as one read
+        return results
+
+    @staticmethod
+    def _cursor_value(cursor, field):
+        if isinstance(cursor, dict): value = cursor.get(field)
+        elif field == "__name__": value = cursor.id
+        else: value = cursor.get(field)
+        return getattr(value, 'id', value) # document references compare by ID
+
+    def _count(self, collection, filters):
+        self._rpc()
+        with self._lock:
+            count = sum(1 for _ in self._matches(collection, filters))
+            self.stats['reads'] += max(-(-count // 1000), 1) # one read per 1000 index entries
+        return count
+
+    def _commit(self, writes):
+        self._rpc()
+        if not writes: return []
+        try:
+            if len(writes) > MAX_BATCH_WRITES:
+                raise FakeFirestoreError(f"INVALID_ARGUMENT: maximum {MAX_BATCH_WRITES} writes allowed per request")
+            if sum(document_size(ref, data) for _, ref, data, _ in writes if data) > MAX_REQUEST_BYTES:
+                raise FakeFirestoreError("INVALID_ARGUMENT: request payload size exceeds the limit")
+            with self._lock:
+                if self.fail_rate and self._random.random() < self.fail_rate:
+                    raise FakeFirestoreError("UNAVAILABLE: injected failure")
+                staged = {}
+                for kind, ref, data, merge in writes:
+                    key = (ref.collection_name, ref.id)
+                    current = staged[key] if key in staged else self._store.get(ref.collection_name, {}).get(ref.id)
+                    if kind == "delete":
+                        staged[key] = None
+                        continue
+                    if kind == "update" and current is None:
+                        raise FakeFirestoreError(f"NOT_FOUND: no document to update: {ref.path}")
+                    data = {field: datetime.datetime.now(datetime.timezone.utc) if value is SERVER_TIMESTAMP else value
+                            for field, value in data.items()}
+                    new = {**current, **data} if merge and current else data
+                    if document_size(ref, new) > MAX_DOCUMENT_BYTES:
+                        raise FakeFirestoreError(f"INVALID_ARGUMENT: {ref.path} exceeds the maximum document size")
+                    staged[key] = new
+                # Nothing is applied unless every write in the batch is valid
+                for (collection, doc_id), data in staged.items():
+                    docs = self._store.setdefault(collection, {})
+                    if data is None: docs.pop(doc_id, None)
+                    else: docs[doc_id] = data
+                self.stats['writes'] += len(writes)
+                self.stats['commits'] += 1
+        except FakeFirestoreError:
+            with self._lock:
+                self.stats['failedCommits'] += 1
+            raise
+        return [None] * len(writes)
+
+    def seed(self, collection, docs):
+        """Inserts documents directly (not counted, never fails)."""
+        with self._lock:
+            store = self._store.setdefault(collection, {})
+            for doc in docs:
+                store[str(doc['id'])] = dict(doc)
+
+    def clear(self):
+        with self._lock:
+            self._store.clear()
+        self.reset_stats()
+
+# --- EMULATOR ---
+
+def emulator_client(host, project):
+    # firebase_admin / google-cloud-firestore talk to the emulator (no credentials) when this is set
+    os.environ["FIRESTORE_EMULATOR_HOST"] = host
+    from google.cloud import firestore as cloud_firestore
+    return cloud_firestore.Client(project=project)
+
+def clear_emulator(host, project):
+    url = f"http://{host}/emulator/v1/projects/{project}/databases/(default)/documents"
+    urllib.request.urlopen(urllib.request.Request(url, method="DELETE"), timeout=60).read()
+
+class Backend:
+    """The client the scripts write through, and how to reset/seed it between scenarios."""
+
+    def __init__(self, args):
+        self.emulator = args.emulator
+        self.project = args.project
+        self.fail_rate = args.fail_rate
+        if self.emulator:
+            self.db = emulator_client(self.emulator, self.project)
+        else:
+            self.db = FakeFirestore(latency=args.latency_ms / 1000, seed=args.seed)
+
+    @property
+    def name(self):
+        return f"emulator {self.emulator}" if self.emulator else "in-process fake"
+
+    def reset(self):
+        if self.emulator: clear_emulator(self.emulator, self.project)
+        else: self.db.clear()
+
+    def seed(self, lessons, with_summaries=True):
+        if not self.emulator:
+            self.db.seed(LESSONS_COLLECTION, lessons)
+            if with_summaries: self.db.seed(SUMMARY_COLLECTION, [build_summary(l) for l in lessons])
+            return
+        batch, writes = self.db.batch(), 0
+        for lesson in lessons:
+            batch.set(self.db.collection(LESSONS_COLLECTION).document(str(lesson['id'])), lesson)
+            writes += 1
+            if with_summaries:
+                batch.set(self.db.collection(SUMMARY_COLLECTION).document(str(lesson['id'])), build_summary(lesson))
+                writes += 1
+            if writes >= MAX_BATCH_WRITES - 1:
+                batch.commit()
+                batch, writes = self.db.batch(), 0
+        if writes: batch.commit()
+
+    def start(self):
+        """Arms failure injection and zeroes the billed counts (the fake only)."""
+        if not self.emulator:
+            self.db.fail_rate = self.fail_rate
+            self.db.reset_stats()
+
+    def finish(self):
+        if self.emulator: return None
+        self.db.fail_rate = 0.0
+        return dict(self.db.stats)
+
+    def present(self, collection, ids):
+        """IDs (of `ids`) that exist in `collection`."""
+        found = set()
+        ids = list(ids)
+        for i in range(0, len(ids), 300):
+            refs = [self.db.collection(collection).document(doc_id) for doc_id in ids[i:i + 300]]
+            found.update(snap.id for snap in self.db.get_all(refs) if snap.exists)
+        return found
+
+# --- SYNTHETIC LIBRARY ---
+
+def sentence_pool(rng, size=2000):
+    pool = []
+    for _ in range(size):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(5, 16))]
+        pool.append(" ".join(words).capitalize() + rng.choice(".!?"))
+    return pool
+
+def synthetic_lesson(rng, pool, lesson_id, language, user_id, oversize=False):
+    sentences = [rng.choice(pool) for _ in range(rng.randint(6, 14))]
+    if oversize:
+        sentences = sentences * (MAX_DOCUMENT_BYTES // max(len(" ".join(sentences)), 1) + 2)
+    content = " ".join(sentences)
+    lesson = {
+        "id": lesson_id, "userId": user_id, "title": sentences[0][:60], "language": language,
+        "content": content, "sentences": sentences,
+        "createdAt": (datetime.datetime(2024, 1, 1) + datetime.timedelta(seconds=rng.randint(0, 2592000))).strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+        "imageUrl": "", "type": "video", "difficulty": rng.choice(["beginner", "intermediate", "advanced"]),
+        "genre": rng.choice(["story", "news", "grammar"]), "isFavorite": False, "progress": 0,
+    }
+    if user_id in ("system", "system_native"):
+        lesson["videoUrl"] = f"https://www.youtube.com/watch?v={lesson_id}"
+        start = 0.0
+        lesson["transcript"] = []
+        for text in sentences[:200]:
+            lesson["transcript"].append({"start": round(start, 2), "end": round(start + 3.5, 2), "text": text})
+            start += 3.5
+    else:
+        lesson["audioUrl"] = f"https://example.org/audio/{lesson_id}.mp3"
+    return lesson
+
+def write_library(workdir, directories, total, oversize_share, seed):
+    """
+    Writes ~`total` lessons as assets/<dir>/<lang>.json under `workdir`.
+    Returns (ids, oversize_ids) in file order.
+    """
+    rng = random.Random(seed)
+    pool = sentence_pool(rng)
+    files = [(d, lang) for d in directories for lang in LIBRARY_LANGUAGES]
+    per_file, extra = divmod(total, len(files))
+    ids, oversize_ids = [], set()
+    for n, (directory, lang) in enumerate(files):
+        os.makedirs(os.path.join(workdir, directory), exist_ok=True)
+        prefix = os.path.basename(directory)
+        lessons = []
+        for i in range(per_file + (1 if n < extra else 0)):
+            lesson_id = f"lt_{prefix}_{lang}_{i:06d}"
+            oversize = rng.random() < oversize_share
+            lessons.append(synthetic_lesson(rng, pool, lesson_id, lang, LIBRARY_USER_IDS.get(directory, "system"), oversize))
+            ids.append(lesson_id)
+            if oversize: oversize_ids.add(lesson_id)
+        with open(os.path.join(workdir, directory, f"{lang}.json"), 'w', encoding='utf-8') as f:
+            json.dump(lessons, f, ensure_ascii=False)
+    return ids, oversize_ids
+
+def library_lessons(count, seed, user_ids):
+    """`count` in-memory lessons cycling through `user_ids` (for seeding the backend)."""
+    rng = random.Random(seed)
+    pool = sentence_pool(rng, 500)
+    return [synthetic_lesson(rng, pool, f"lt_seed_{i:07d}", LIBRARY_LANGUAGES[i % len(LIBRARY_LANGUAGES)],
+                             user_ids[i % len(user_ids)]) for i in range(count)]
+
+# --- SCENARIOS ---
+
+def metric_total(snapshot, name):
+    return sum(value for counter, _, value in snapshot['counters'] if counter == name)
+
+def metric_value(snapshot, name, **labels):
+    return sum(value for counter, counter_labels, value in snapshot['counters']
+               if counter == name and all(dict(counter_labels).get(k) == str(v) for k, v in labels.items()))
+
+@contextlib.contextmanager
+def quiet(enabled):
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+def measure(backend, label, docs, fn, verbose=False):
+    """Runs one timed pass; returns its result row (fn's return value under 'detail')."""
+    metrics.collect(reset=True)
+    backend.start()
+    error = None
+    start = time.perf_counter()
+    try:
+        with quiet(not verbose):
+            detail = fn()
+    except Exception as e:
+        detail, error = None, f"{type(e).__name__}: {e}"
+    seconds = time.perf_counter() - start
+    billed = backend.finish()
+    counted = metrics.collect(reset=True)
+    row = {
+        'pass': label,
+        'docs': docs,
+        'seconds': round(seconds, 3),
+        'docsPerSecond': round(docs / seconds, 1) if seconds else 0.0,
+        'reads': metric_total(counted, "firestore_reads_total"),
+        'writes': metric_total(counted, "firestore_writes_total"),
+        'failedWrites': metric_total(counted, "firestore_failed_writes_total"),
+        'batchesOk': metric_value(counted, "batch_commits_total", result="ok"),
+        'batchesFailed': metric_value(counted, "batch_commits_total", result="failed"),
+        'billed': billed,
+        'detail': detail,
+    }
+    if error: row['error'] = error
+    return row
+
+def run_sync(backend, args, workdir):
+    import sync_to_firebase
+    sync_to_firebase.BATCH_LIMIT = args.batch_limit
+
+    print(f"📚 Writing a synthetic library of {args.lessons} lessons...")
+    ids, oversize_ids = write_library(workdir, sync_to_firebase.TARGET_DIRECTORIES, args.lessons,
+                                      args.oversize, args.seed)
+    conn = catalog.open_catalog(os.path.join(workdir, catalog.CATALOG_DB), sync_to_firebase.TARGET_DIRECTORIES)
+
+    backend.reset()
+    rng = random.Random(args.seed)
+    existing = [lesson_id for lesson_id in ids if lesson_id not in oversize_ids and rng.random() < args.existing]
+    if existing:
+        existing_set = set(existing)
+        seeded = []
+        for source in catalog.list_sources(conn):
+            # As a previous sync left them: stamped with their content hash (no related lessons here)
+            seeded.extend(dict(json.loads(data), **{sync_to_firebase.HASH_FIELD: digest})
+                          for lesson_id, digest, _, data in catalog.iter_sync_state(conn, source)
+                          if lesson_id in existing_set)
+        backend.seed(seeded)
+
+    sources = [path for folder in sync_to_firebase.TARGET_DIRECTORIES for path in catalog.list_sources(conn, folder)]
+    expected = [lesson_id for lesson_id in ids if lesson_id not in oversize_ids]
+
+    def sync_pass():
+        totals = [0, 0, 0, 0, 0]
+        for path in sources:
+            for i, n in enumerate(sync_to_firebase.process_file(backend.db, conn, path)):
+                totals[i] += n
+        return dict(zip(('uploaded', 'skipped', 'tooBig', 'nearDuplicate', 'malformed'), totals))
+
+    def missing():
+        return len(expected) - len(backend.present(LESSONS_COLLECTION, expected))
+
+    rows = []
+    print(f"🔥 Sync: cold pass over {len(ids)} lessons ({len(existing)} already remote)...")
+    rows.append(measure(backend, "cold", len(ids), sync_pass, args.verbose))
+    rows[-1]['missing'] = missing()
+    if rows[-1]['missing'] and args.fail_rate:
+        print(f"🔁 Sync: retry pass ({rows[-1]['missing']} missing after failed batches)...")
+        rows.append(measure(backend, "retry", len(ids), sync_pass, args.verbose))
+        rows[-1]['missing'] = missing()
+    print("♻️  Sync: warm pass (nothing changed)...")
+    rows.append(measure(backend, "warm", len(ids), sync_pass, args.verbose))
+    conn.close()
+    return rows
+
+def run_quizzes(backend, args, workdir):
+    import sync_progression_quizzes
+
+    quiz_dir = os.path.join(workdir, "quizzes")
+    os.makedirs(quiz_dir, exist_ok=True)
+    rng = random.Random(args.seed)
+    pool = sentence_pool(rng, 300)
+    names = []
+    for i in range(args.quizzes):
+        name = f"{LIBRARY_LANGUAGES[i % len(LIBRARY_LANGUAGES)]}_u{i // len(LIBRARY_LANGUAGES) + 1:02d}_topic_{i}.json"
+        questions = [{"question": rng.choice(pool), "options": [rng.choice(pool) for _ in range(4)], "answer": 0,
+                      "createdAt": "2025-12-10T10:00:00Z"} for _ in range(20)]
+        with open(os.path.join(quiz_dir, name), 'w', encoding='utf-8') as f:
+            json.dump(questions, f, ensure_ascii=False)
+        names.append(name)
+
+    backend.reset()
+    def quiz_pass():
+        return {'synced': sum(bool(sync_progression_quizzes.process_file(backend.db, os.path.join(quiz_dir, n), n))
+                              for n in names)}
+
+    print(f"🎓 Quizzes: {len(names)} quiz levels...")
+    # The real sentinel needs firebase_admin, which the fake doesn't
+    original_timestamp = firebase_app.server_timestamp
+    if not backend.emulator:
+        firebase_app.server_timestamp = lambda: SERVER_TIMESTAMP
+    try:
+        row = measure(backend, "cold", len(names), quiz_pass, args.verbose)
+    finally:
+        firebase_app.server_timestamp = original_timestamp
+    row['missing'] = len(names) - row['detail']['synced'] if row['detail'] else len(names)
+    return [row]
+
+def run_delete(backend, args, workdir):
+    import delete_text_lessons
+
+    target = delete_text_lessons.TARGET_USER_ID
+    others = [user_id for user_id in LIBRARY_USER_IDS.values() if user_id != target]
+    owners = [target if i / 1000 < args.delete_share else others[i % len(others)] for i in range(1000)]
+    lessons = library_lessons(args.lessons, args.seed, owners)
+    targeted = [l['id'] for l in lessons if l['userId'] == target]
+
+    print(f"🗑️  Delete: seeding {len(lessons)} lessons ({len(targeted)} owned by '{target}')...")
+    backend.reset()
+    backend.seed(lessons)
+    del lessons
+
+    row = measure(backend, "delete", len(targeted), lambda: delete_text_lessons.delete_collection_by_query(backend.db),
+                  args.verbose)
+    row['missing'] = len(backend.present(LESSONS_COLLECTION, targeted)) # i.e. left behind
+    row['summariesLeft'] = len(backend.present(SUMMARY_COLLECTION, targeted))
+    return [row]
+
+def run_export(backend, args, workdir):
+    import export_lessons
+
+    lessons = library_lessons(args.lessons, args.seed, list(LIBRARY_USER_IDS.values()))
+    ids = [l['id'] for l in lessons]
+    print(f"📤 Export: seeding {len(lessons)} lessons...")
+    backend.reset()
+    backend.seed(lessons, with_summaries=False)
+    del lessons
+
+    out_dir = os.path.join(workdir, "export")
+    row = measure(backend, "export", len(ids),
+                  lambda: export_lessons.export(backend.db, out_dir, args.partitions, args.workers)['docs'], args.verbose)
+    exported = {lesson_id for lesson_id, _ in export_lessons.iter_export(out_dir)} if row['detail'] is not None else set()
+    row['missing'] = len(ids) - len(exported.intersection(ids))
+    return [row]
+
+def run_ingest(backend, args, workdir):
+    rows = []
+    rng = random.Random(args.seed)
+    pool = sentence_pool(rng, 500)
+    for module_name, (lookup, prefix) in INGESTERS.items():
+        module = importlib.import_module(module_name)
+
+        video_ids = [f"lt{i:07d}" for i in range(args.ingest_lessons)]
+        existing = [prefix + v for v in video_ids if rng.random() < args.existing]
+        backend.reset()
+        backend.seed([{"id": lesson_id, "userId": "system"} for lesson_id in existing], with_summaries=False)
+
+        def details(video_url, lang_code, genre, *_, **__):
+            lesson_id = prefix + video_url.split("v=")[-1]
+            return synthetic_lesson(rng, pool, lesson_id, lang_code, "system_native")
+
+        # get_db() returns module.db once it is set, so the ingester never connects itself
+        original_db, original_lookup = module.db, getattr(module, lookup)
+        module.db = backend.db
+        setattr(module, lookup, details)
+        try:
+            def ingest_pass():
+                return {'uploaded': sum(bool(module.process_and_upload(f"https://www.youtube.com/watch?v={v}", "es", "story"))
+                                        for v in video_ids)}
+            print(f"📥 Ingest: {module_name} ({len(video_ids)} videos, {len(existing)} already remote)...")
+            row = measure(backend, module_name, len(video_ids), ingest_pass, args.verbose)
+        finally:
+            module.db = original_db
+            setattr(module, lookup, original_lookup)
+        expected = [prefix + v for v in video_ids]
+        row['missing'] = len(expected) - len(backend.present(LESSONS_COLLECTION, expected))
+        rows.append(row)
+    return rows
+
+SCENARIOS = {
+    'sync': run_sync,
+    'quizzes': run_quizzes,
+    'delete': run_delete,
+    'export': run_export,
+    'ingest': run_ingest,
+}
+
+# --- REPORT ---
+
+def print_rows(scenario, rows):
+    print(f"\n   {scenario}")
+    print(f"   {'pass':34} {'docs':>8} {'secs':>8} {'docs/s':>10} {'reads':>8} {'writes':>8} {'failed':>8} {'batches ok/fail':>16} {'missing':>8}")
+    for r in rows:
+        batches = f"{r['batchesOk']}/{r['batchesFailed']}"
+        print(f"   {r['pass']:34} {r['docs']:8} {r['seconds']:8.2f} {r['docsPerSecond']:10.1f} "
+              f"{r['reads']:8} {r['writes']:8} {r['failedWrites']:8} {batches:>16} {r.get('missing', '-'):>8}")
+        if r.get('billed'):
+            b = r['billed']
+            print(f"   {'':34} billed: {b['reads']} reads, {b['writes']} writes, {b['rpcs']} RPCs, "
+                  f"{b['failedCommits']} failed commits")
+        if r.get('error'):
+            print(f"   {'':34} ❌ aborted: {r['error']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-tests the Firestore sync, delete and ingest scripts against a fake or the emulator.")
+    parser.add_argument("--only", type=str, help=f"Comma-separated scenarios ({', '.join(SCENARIOS)})")
+    parser.add_argument("--lessons", type=int, default=LESSONS, help="Synthetic library size (sync, delete, export)")
+    parser.add_argument("--quizzes", type=int, default=QUIZZES)
+    parser.add_argument("--ingest-lessons", type=int, default=INGEST_LESSONS, help="Videos per ingester")
+    parser.add_argument("--existing", type=float, default=EXISTING_SHARE, help="Share already in Firestore")
+    parser.add_argument("--oversize", type=float, default=OVERSIZE_SHARE, help="Share of lessons over 1 MiB")
+    parser.add_argument("--delete-share", type=float, default=DELETE_SHARE)
+    parser.add_argument("--partitions", type=int, default=EXPORT_PARTITIONS, help="Export partitions")
+    parser.add_argument("--workers", type=int, default=EXPORT_WORKERS, help="Export workers")
+    parser.add_argument("--batch-limit", type=int, help="Override sync_to_firebase.BATCH_LIMIT")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Probability that a commit fails (fake only)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added to every RPC (fake only)")
+    parser.add_argument("--emulator", type=str, help="Firestore emulator host:port instead of the fake")
+    parser.add_argument("--project", type=str, default=EMULATOR_PROJECT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Show the scripts' own output")
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    if args.batch_limit is None:
+        import sync_to_firebase
+        args.batch_limit = sync_to_firebase.BATCH_LIMIT
+    only = [n.strip() for n in args.only.split(',')] if args.only else list(SCENARIOS)
+    unknown = [n for n in only if n not in SCENARIOS]
+    if unknown: sys.exit(f"❌ Unknown scenario(s): {', '.join(unknown)}")
+    if args.emulator and (args.fail_rate or args.latency_ms):
+        print("ℹ️  --fail-rate and --latency-ms only apply to the in-process fake.")
+
+    backend = Backend(args)
+    print(f"\n{'='*60}")
+    print(f"🧪 FIRESTORE LOAD TEST ({backend.name})")
+    print(f"{'='*60}\n")
+
+    results = {}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as workdir:
+        # The scripts use relative asset paths; run them against the synthetic tree
+        os.chdir(workdir)
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        try:
+            for name in only:
+                results[name] = SCENARIOS[name](backend, args, workdir)
+        finally:
+            os.chdir(cwd)
+
+    print(f"\n{'='*60}")
+    print("📊 RESULTS")
+    for name, rows in results.items():
+        print_rows(name, rows)
+    print(f"{'='*60}")
+
+    if args.json:
+        report = {
+            'createdAt': datetime.datetime.now().isoformat(),
+            'backend': backend.name,
+            'settings': {k: v for k, v in vars(args).items() if k not in ('json', 'verbose', 'only')},
+            'results': results,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"💾 Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import os
+import json
+import time
+import atexit
+import datetime
+import threading
+import functools
+import contextlib
+
+# --- CONFIGURATION ---
+# Lightweight run metrics for the generators and sync scripts: counters,
+# histograms and per-stage timers, kept in-process and written once at exit
+# as a JSON run report plus a Prometheus textfile (node_exporter's textfile
+# collector can scrape REPORT_DIR directly).
+#
+#   metrics.start_run("sync_to_firebase")        # once, in main()
+#   with metrics.timer("subtitles"): ...          # stage_seconds{stage="subtitles"}
+#   metrics.reject("no_subtitles")                # rejects_total{reason="no_subtitles"}
+#   metrics.add_bytes("download", len(data))      # bytes_total{kind="download"}
+#   metrics.firestore_read(); metrics.firestore_write(2)
+#   metrics.firestore_commit({"lessons": 2}, committed=ok)   # once a batch commit returns or fails
+#
+# Writes count once they are committed: a failed batch commits nothing and
+# is not billed, so its writes go to firestore_failed_writes_total instead.
+#
+# Stage names used across scripts: search, info, subtitles, download, parse,
+# difficulty, file_write, firestore_read, firestore_write.
+REPORT_DIR = os.environ.get("LINGUAFLOW_METRICS_DIR", ".cache/reports")
+PREFIX = "linguaflow"
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [count, sum, min, max, bucket counts...]
+_run = {}
+_extra = {}       # extra report sections (e.g. the profile summary)
+_active = {}      # thread id -> stack of running stages (read by the profiler's sampler)
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+# --- RECORDING ---
+
+def count(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+def observe(name, value, **labels):
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [0, 0.0, value, value] + [0] * len(BUCKETS)
+        h[0] += 1
+        h[1] += value
+        h[2] = min(h[2], value)
+        h[3] = max(h[3], value)
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                h[4 + i] += 1
+                break
+
+@contextlib.contextmanager
+def timer(stage, **labels):
+    """Times the block into stage_seconds{stage=...} (also when it raises)."""
+    stack = _active.setdefault(threading.get_ident(), [])
+    stack.append(stage)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("stage_seconds", time.perf_counter() - start, stage=stage, **labels)
+        stack.pop()
+
+def active_stage(thread_id):
+    """Innermost stage running on a thread, or None."""
+    stack = _active.get(thread_id)
+    return stack[-1] if stack else None
+
+def timed(stage, **labels):
+    """Decorator form of timer()."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(stage, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def reject(reason, **labels):
+    count("rejects_total", reason=reason, **labels)
+
+def add_bytes(kind, value, **labels):
+    count("bytes_total", value, kind=kind, **labels)
+
+def firestore_read(value=1, collection="lessons"):
+    count("firestore_reads_total", value, collection=collection)
+
+def firestore_write(value=1, collection="lessons"):
+    count("firestore_writes_total", value, collection=collection)
+
+def firestore_failed_write(value=1, collection="lessons"):
+    count("firestore_failed_writes_total", value, collection=collection)
+
+def firestore_commit(writes, committed=True):
+    """Counts a batch's {collection: writes} as written, or as failed if the commit raised."""
+    for collection, value in writes.items():
+        if committed: firestore_write(value, collection)
+        else: firestore_failed_write(value, collection)
+
+# --- WORKER PROCESSES ---
+
+def collect(reset=True):
+    """Picklable snapshot of everything recorded so far (pool workers return it to the parent)."""
+    with _lock:
+        data = {
+            'counters': [[name, list(labels), value] for (name, labels), value in _counters.items()],
+            'histograms': [[name, list(labels), list(h)] for (name, labels), h in _histograms.items()],
+        }
+        if reset:
+            _counters.clear()
+            _histograms.clear()
+    return data
+
+def merge(data):
+    """Adds a collect() snapshot from another process."""
+    if not data: return
+    with _lock:
+        for name, labels, value in data['counters']:
+            key = (name, tuple(tuple(l) for l in labels))
+            _counters[key] = _counters.get(key, 0) + value
+        for name, labels, other in data['histograms']:
+            key = (name, tuple(tuple(l) for l in labels))
+            h = _histograms.get(key)
+            if h is None:
+                _histograms[key] = list(other)
+                continue
+            h[0] += other[0]
+            h[1] += other[1]
+            h[2] = min(h[2], other[2])
+            h[3] = max(h[3], other[3])
+            for i in range(4, len(h)):
+                h[i] += other[i]
+
+def _reset_after_fork():
+    # Forked pool workers start empty; their numbers come back through collect()/merge()
+    _counters.clear()
+    _histograms.clear()
+    _active.clear()
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+# --- REPORTS ---
+
+def build_report():
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted(_histograms.items())
+
+    report = dict(_run)
+    finished = time.time()
+    report['finishedAt'] = datetime.datetime.fromtimestamp(finished).isoformat()
+    report['seconds'] = round(finished - _run.get('startTime', finished), 3)
+    report.pop('startTime', None)
+    report.pop('reportDir', None)
+    report.update(_extra)
+
+    report['counters'] = {}
+    for (name, labels), value in counters:
+        report['counters'].setdefault(name, []).append({'labels': dict(labels), 'value': value})
+
+    report['histograms'] = {}
+    report['stages'] = {}
+    for (name, labels), h in histograms:
+        report['histograms'].setdefault(name, []).append({
+            'labels': dict(labels), 'count': h[0], 'sum': round(h[1], 6), 'min': h[2], 'max': h[3],
+            'buckets': {str(bound): n for bound, n in zip(BUCKETS, h[4:])},
+        })
+        if name == "stage_seconds":
+            stage = report['stages'].setdefault(dict(labels)['stage'], {'count': 0, 'seconds': 0.0})
+            stage['count'] += h[0]
+            stage['seconds'] = round(stage['seconds'] + h[1], 3)
+    return report
+
+def _labels(labels):
+    if not labels: return ""
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels.items()) + "}"
+
+def to_prometheus(report):
+    """Prometheus text exposition format (counters and histograms, labelled with the script)."""
+    script = {'script': report.get('script', 'unknown')}
+    lines = []
+    for name, series in report['counters'].items():
+        lines.append(f"# TYPE {PREFIX}_{name} counter")
+        for s in series:
+            lines.append(f"{PREFIX}_{name}{_labels({**script, **s['labels']})} {s['value']}")
+    for name, series in report['histograms'].items():
+        lines.append(f"# TYPE {PREFIX}_{name} histogram")
+        for s in series:
+            labels = {**script, **s['labels']}
+            cumulative = 0
+            for bound in BUCKETS:
+                cumulative += s['buckets'][str(bound)]
+                lines.append(f"{PREFIX}_{name}_bucket{_labels({**labels, 'le': bound})} {cumulative}")
+            lines.append(f"{PREFIX}_{name}_bucket{_labels({**labels, 'le': '+Inf'})} {s['count']}")
+            lines.append(f"{PREFIX}_{name}_sum{_labels(labels)} {s['sum']}")
+            lines.append(f"{PREFIX}_{name}_count{_labels(labels)} {s['count']}")
+    lines.append(f"# TYPE {PREFIX}_run_duration_seconds gauge")
+    lines.append(f"{PREFIX}_run_duration_seconds{_labels(script)} {report['seconds']}")
+    lines.append(f"# TYPE {PREFIX}_run_finished_timestamp_seconds gauge")
+    lines.append(f"{PREFIX}_run_finished_timestamp_seconds{_labels(script)} {int(time.time())}")
+    return "\n".join(lines) + "\n"
+
+def _write_atomic(path, text):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def write_report(report_dir=None):
+    """Writes <script>.json and <script>.prom (latest run of each script). Returns the JSON path."""
+    report_dir = report_dir or _run.get('reportDir', REPORT_DIR)
+    report = build_report()
+    os.makedirs(report_dir, exist_ok=True)
+    base = os.path.join(report_dir, report.get('script', 'run'))
+    _write_atomic(base + ".json", json.dumps(report, ensure_ascii=False, indent=2))
+    _write_atomic(base + ".prom", to_prometheus(report))
+    return base + ".json"
+
+def annotate(section, value):
+    """Adds a top-level section to the run report."""
+    _extra[section] = value
+
+def report_path(script=None, report_dir=None):
+    """Where the report of `script` (default: the current run) is written."""
+    return os.path.join(report_dir or _run.get('reportDir', REPORT_DIR), f"{script or _run.get('script', 'run')}.json")
+
+def start_run(script, report_dir=REPORT_DIR):
+    """Starts recording for this process; the report is written at exit (also after sys.exit)."""
+    if _run: return
+    now = time.time()
+    _run.update({
+        'script': script,
+        'startedAt': datetime.datetime.fromtimestamp(now).isoformat(),
+        'startTime': now,
+        'pid': os.getpid(),
+        'reportDir': report_dir,
+    })
+    atexit.register(_write_at_exit)
+
+def _write_at_exit():
+    try:
+        path = write_report()
+        print(f"📊 Run report: {path}")
+    except Exception as e:
+        print(f"⚠️ Could not write run report: {e}")
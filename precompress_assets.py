@@ -0,0 +1,124 @@
+import os
+import glob
+import gzip
+import time
+import argparse
+import catalog
+
+try:
+    import brotli # pip install brotli (optional)
+except ImportError:
+    brotli = None
+
+# --- CONFIGURATION ---
+# Rewrites every lesson file in canonical form (minified, sorted keys,
+# empty/default fields dropped, see asset_pages.canonical_lesson) via the
+# catalog, then writes .gz / .br variants of every JSON file (monolithic
+# files, pages and manifests) under OUTPUT_DIR, mirroring the asset paths.
+# Static hosting/CDN uploads serve these directly with Content-Encoding.
+#
+# The variants are kept out of assets/ on purpose: Flutter bundles every
+# file in a listed asset folder, so they would double the app size.
+OUTPUT_DIR = "build/precompressed"
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+def json_files(folder):
+    """Every JSON file under `folder` (monolithic files, pages and manifests)."""
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        for filename in sorted(files):
+            if filename.endswith(".json"):
+                yield os.path.join(root, filename)
+
+def lesson_file_bytes(folder):
+    """{path: size} of the top-level lesson files (the report compares these, pages are copies)."""
+    return {path: os.path.getsize(path) for path in glob.glob(os.path.join(folder, "*.json"))}
+
+def is_fresh(source, target):
+    return os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source)
+
+def write_bytes(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def precompress_file(path, output_dir=OUTPUT_DIR, force=False):
+    """Writes <output_dir>/<path>.gz (and .br). Returns (gzip_bytes, brotli_bytes or None)."""
+    target = os.path.join(output_dir, path)
+    gz_path, br_path = target + ".gz", target + ".br"
+
+    raw = None
+    if force or not is_fresh(path, gz_path):
+        with open(path, 'rb') as f: raw = f.read()
+        # mtime=0 keeps the output byte-identical across runs (stable CDN hashes)
+        write_bytes(gz_path, gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0))
+
+    if brotli is None:
+        return os.path.getsize(gz_path), None
+    if force or not is_fresh(path, br_path):
+        if raw is None:
+            with open(path, 'rb') as f: raw = f.read()
+        write_bytes(br_path, brotli.compress(raw, quality=BROTLI_QUALITY))
+    return os.path.getsize(gz_path), os.path.getsize(br_path)
+
+def format_bytes(n):
+    for unit in ("B", "KB", "MB"):
+        if abs(n) < 1024: return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
+
+def main():
+    parser = argparse.ArgumentParser(description="Canonicalises lesson assets and writes gzip/brotli variants.")
+    parser.add_argument("directories", nargs="*", default=catalog.ASSET_DIRECTORIES)
+    parser.add_argument("--output", default=OUTPUT_DIR)
+    parser.add_argument("--force", action="store_true", help="Recompress files even if the variants are newer")
+    args = parser.parse_args()
+
+    print(f"\n{'='*60}")
+    print("🗜️  ASSET PRECOMPRESSION STARTED")
+    print(f"{'='*60}\n")
+    if brotli is None:
+        print("ℹ️  'brotli' not installed: writing gzip variants only.\n")
+
+    start_time = time.time()
+    directories = [d for d in args.directories if os.path.isdir(d)]
+    before = {d: sum(lesson_file_bytes(d).values()) for d in directories}
+
+    # 1. Canonical rewrite of every lesson file (and its pages) from the catalog
+    conn = catalog.open_catalog()
+    sources = [s for d in directories for s in catalog.list_sources(conn, d)]
+    catalog.export_sources(conn, sources)
+    conn.close()
+
+    # 2. Compressed variants of every file + per-directory report on the lesson files
+    print(f"   {'directory':32} {'before':>10} {'minified':>10} {'gzip':>10} {'brotli':>10}")
+    totals = [0, 0, 0, 0]
+    for folder in directories:
+        sizes = lesson_file_bytes(folder)
+        gz_total, br_total = 0, 0
+        for path in json_files(folder):
+            gz_size, br_size = precompress_file(path, args.output, args.force)
+            if path in sizes:
+                gz_total += gz_size
+                br_total += br_size or 0
+
+        row = [before[folder], sum(sizes.values()), gz_total, br_total]
+        totals = [a + b for a, b in zip(totals, row)]
+        br_cell = format_bytes(br_total) if brotli else "-"
+        print(f"   {folder:32} {format_bytes(row[0]):>10} {format_bytes(row[1]):>10} {format_bytes(gz_total):>10} {br_cell:>10}")
+
+    saved = totals[0] - totals[1]
+    print(f"\n{'='*60}")
+    print(f"🎉 DONE in {time.time() - start_time:.1f}s")
+    print(f"📉 Minify/canonicalise saved {format_bytes(saved)} ({saved / max(totals[0], 1):.1%}) in assets/")
+    print(f"🗜️  gzip: {format_bytes(totals[2])} ({1 - totals[2] / max(totals[1], 1):.1%} smaller than minified)")
+    if brotli:
+        print(f"🗜️  brotli: {format_bytes(totals[3])} ({1 - totals[3] / max(totals[1], 1):.1%} smaller than minified)")
+    print(f"📁 Variants: {args.output}/")
+    print(f"{'='*60}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import os
+import sys
+import time
+import atexit
+import pstats
+import cProfile
+import threading
+import tracemalloc
+import metrics
+
+# --- CONFIGURATION ---
+# `--profile` mode for the generators and sync scripts. Writes, next to the
+# run report (see metrics.py):
+#
+#   <script>.prof     cProfile of the whole run (snakeviz, pstats)
+#   <script>.folded   sampled stacks in folded format, one root per stage:
+#                     "subtitles;main (x.py:10);get_video_details (x.py:120) 42"
+#                     -> flamegraph.pl, speedscope or inferno
+#
+# and adds a "profile" section to the JSON report: tracemalloc peak, peak
+# traced memory per stage, samples per stage and the top functions.
+#
+# Profiling is also switched on by LINGUAFLOW_PROFILE=1, which is how
+# `generate_all.py --profile` and process-pool workers pick it up.
+PROFILE_ENV = "LINGUAFLOW_PROFILE"
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+MAX_DEPTH = 128
+TRACEMALLOC_FRAMES = 1
+TOP_FUNCTIONS = 25
+TOP_ALLOCATIONS = 15
+
+_state = {}
+
+def add_argument(parser):
+    parser.add_argument("--profile", action="store_true",
+                        help="Profile this run (cProfile + sampled flamegraph stacks + peak memory, next to the run report)")
+
+def enabled():
+    return os.environ.get(PROFILE_ENV) == "1"
+
+# --- SAMPLER ---
+
+def fold_stack(frame):
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+class Sampler(threading.Thread):
+    """Samples every other thread's stack, rooted at the metrics stage it is in."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.stacks = {}        # folded stack -> samples
+        self.stage_samples = {} # stage -> samples
+        self.stage_memory = {}  # stage -> highest traced memory seen while sampling
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        current = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        frames = sys._current_frames()
+        with self.lock:
+            for thread_id, frame in frames.items():
+                if thread_id == self.ident: continue
+                stage = metrics.active_stage(thread_id) or "other"
+                key = f"{stage};{fold_stack(frame)}"
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+                self.stage_samples[stage] = self.stage_samples.get(stage, 0) + 1
+                self.stage_memory[stage] = max(self.stage_memory.get(stage, 0), current)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def drain(self):
+        with self.lock:
+            data = {'stacks': self.stacks, 'stageSamples': self.stage_samples, 'stageMemory': self.stage_memory}
+            self.stacks, self.stage_samples, self.stage_memory = {}, {}, {}
+        return data
+
+# --- WORKER PROCESSES ---
+
+def start_worker():
+    """Starts sampling + tracemalloc in a pool worker (once per process) when profiling is on."""
+    if not enabled() or 'sampler' in _state: return
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    _state['sampler'] = Sampler()
+    _state['sampler'].start()
+
+def collect():
+    """Picklable samples recorded in this worker so far (returned to the parent next to metrics.collect())."""
+    sampler = _state.get('sampler')
+    if sampler is None: return None
+    data = sampler.drain()
+    data['peak'] = tracemalloc.get_traced_memory()[1]
+    return data
+
+def merge(data):
+    """Adds a worker's collect() to this process' profile."""
+    sampler = _state.get('sampler')
+    if not data or sampler is None: return
+    with sampler.lock:
+        for key, n in data['stacks'].items():
+            sampler.stacks[key] = sampler.stacks.get(key, 0) + n
+        for stage, n in data['stageSamples'].items():
+            sampler.stage_samples[stage] = sampler.stage_samples.get(stage, 0) + n
+        for stage, peak in data['stageMemory'].items():
+            sampler.stage_memory[stage] = max(sampler.stage_memory.get(stage, 0), peak)
+    _state['workerPeak'] = max(_state.get('workerPeak', 0), data['peak'])
+
+def _reset_after_fork():
+    # A forked worker inherits the parent's profiler hook and a dead sampler thread
+    profiler = _state.get('profiler')
+    if profiler is not None: profiler.disable()
+    if tracemalloc.is_tracing(): tracemalloc.stop()
+    _state.clear()
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+# --- RUN ---
+
+def start(requested=False):
+    """
+    Starts profiling the current run if `requested` (the --profile flag) or
+    LINGUAFLOW_PROFILE=1. Call after metrics.start_run(); results are
+    written at exit, before the run report.
+    """
+    if not (requested or enabled()) or 'profiler' in _state: return False
+    os.environ[PROFILE_ENV] = "1" # Inherited by pool workers and child scripts
+
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    _state['sampler'] = Sampler()
+    _state['sampler'].start()
+    _state['profiler'] = cProfile.Profile()
+    _state['started'] = time.perf_counter()
+    _state['profiler'].enable()
+    # atexit runs last-registered first, so this lands before metrics writes the report
+    atexit.register(stop)
+    print("🔬 Profiling enabled.")
+    return True
+
+def top_functions(profiler, limit=TOP_FUNCTIONS):
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, name), (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append({
+            'function': f"{name} ({os.path.basename(filename)}:{line})",
+            'calls': calls, 'ownSeconds': round(own, 4), 'cumulativeSeconds': round(cumulative, 4),
+        })
+    rows.sort(key=lambda r: r['cumulativeSeconds'], reverse=True)
+    return rows[:limit]
+
+def top_allocations(snapshot, limit=TOP_ALLOCATIONS):
+    return [
+        {'site': f"{os.path.basename(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+         'kb': round(stat.size / 1024, 1), 'blocks': stat.count}
+        for stat in snapshot.statistics('lineno')[:limit]
+    ]
+
+def stop():
+    profiler = _state.get('profiler')
+    if profiler is None: return
+    profiler.disable()
+    sampler = _state['sampler']
+    sampler.stop()
+    data = sampler.drain()
+
+    _, peak = tracemalloc.get_traced_memory()
+    allocations = top_allocations(tracemalloc.take_snapshot())
+    tracemalloc.stop()
+
+    base = os.path.splitext(metrics.report_path())[0]
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    profiler.dump_stats(base + ".prof")
+    tmp_path = base + ".folded.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for key, n in sorted(data['stacks'].items()):
+            f.write(f"{key} {n}\n")
+    os.replace(tmp_path, base + ".folded")
+
+    metrics.annotate('profile', {
+        'seconds': round(time.perf_counter() - _state['started'], 3),
+        'sampleInterval': SAMPLE_INTERVAL,
+        'peakTracedKb': round(peak / 1024, 1),
+        'workerPeakTracedKb': round(_state.get('workerPeak', 0) / 1024, 1),
+        'stages': {
+            stage: {'samples': n, 'peakTracedKb': round(data['stageMemory'].get(stage, 0) / 1024, 1)}
+            for stage, n in sorted(data['stageSamples'].items(), key=lambda item: -item[1])
+        },
+        'topFunctions': top_functions(profiler),
+        'topAllocations': allocations,
+        'files': {'cprofile': base + ".prof", 'folded': base + ".folded"},
+    })
+    print(f"🔬 Profile: {base}.prof, {base}.folded (peak traced memory {peak / (1024 * 1024):.1f} MB)")
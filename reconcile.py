@@ -0,0 +1,233 @@
+import os
+import sys
+import time
+import argparse
+import datetime
+import itertools
+from collections import Counter
+import catalog
+import metrics
+import json_io
+import firebase_app
+from lesson_summaries import LESSONS_COLLECTION
+from related_lessons import load_related
+from sync_to_firebase import TARGET_DIRECTORIES, HASH_FIELD, sync_key, prepare_lesson
+
+# --- CONFIGURATION ---
+# Compares the local library (catalog.db) with the `lessons` collection and
+# classifies every lesson ID as local_only, remote_only, differing or
+# identical:
+#
+#   python reconcile.py                           # counts per status
+#   python reconcile.py --report diff.jsonl       # one line per lesson that isn't identical
+#   python reconcile.py --plan repair.json        # then: python sync_to_firebase.py --plan repair.json
+#
+# Local side: the sync_key of every lesson sync would upload, read from the
+# catalog in ID order (no lesson bodies). Remote side: IDs plus the
+# contentHash sync stamps on each upload, paged by document ID with a field
+# mask. Both streams are sorted by ID, so one merge pass classifies
+# everything; memory is one page plus the repair plan.
+#
+# Remote lessons without a contentHash (uploaded before sync stamped one)
+# count as differing, unless --deep fetches them and compares the documents.
+# The repair plan uploads local-only lessons, overwrites differing ones and
+# stamps the hash on --deep matches. Remote-only lessons are reported but
+# never touched: most are users' own lessons or *_firebase uploads.
+SERVICE_ACCOUNT_FILE = "serviceAccountKey.json"
+
+PAGE_SIZE = 1000   # remote IDs per query page
+DEEP_BATCH = 100   # documents per get_all in --deep mode
+
+DOCUMENT_ID = "__name__" # FieldPath.document_id()
+
+LOCAL_ONLY, REMOTE_ONLY, DIFFERING, IDENTICAL = "local_only", "remote_only", "differing", "identical"
+STATUSES = (LOCAL_ONLY, REMOTE_ONLY, DIFFERING, IDENTICAL)
+
+def initialize_firebase():
+    """Initializes Firebase Admin SDK."""
+    if not os.path.exists(SERVICE_ACCOUNT_FILE):
+        print(f"\n❌ ERROR: '{SERVICE_ACCOUNT_FILE}' not found.")
+        sys.exit(1)
+
+    try:
+        return firebase_app.client(SERVICE_ACCOUNT_FILE)
+    except Exception as e:
+        print(f"\n❌ FIREBASE AUTH ERROR: {e}")
+        sys.exit(1)
+
+# --- STREAMS ---
+
+def source_rank(source):
+    """Sync visits TARGET_DIRECTORIES in order and files by path; the first copy of an ID is the one uploaded."""
+    for index, folder in enumerate(TARGET_DIRECTORIES):
+        if source.startswith(folder.rstrip('/') + '/'): return index, source
+    return len(TARGET_DIRECTORIES), source
+
+def iter_local(conn, related):
+    """Yields (lesson_id, content_hash, source) for every lesson sync would upload, in ID order."""
+    rows = catalog.iter_by_id(conn, TARGET_DIRECTORIES)
+    for lesson_id, copies in itertools.groupby(rows, key=lambda row: row[0]):
+        _, source, digest = min(copies, key=lambda row: source_rank(row[1]))
+        yield lesson_id, sync_key(digest, related.get(lesson_id)), source
+
+def iter_remote(db, page_size=PAGE_SIZE):
+    """Yields (lesson_id, content_hash, user_id) for every remote lesson in ID order."""
+    query = db.collection(LESSONS_COLLECTION).select([HASH_FIELD, "userId"]).order_by(DOCUMENT_ID)
+    last = None
+    while True:
+        page_query = query.limit(page_size)
+        if last is not None:
+            page_query = page_query.start_after(last)
+        with metrics.timer("firestore_read"):
+            docs = list(page_query.stream())
+        metrics.firestore_read(max(len(docs), 1)) # an empty page is still billed one read
+        for doc in docs:
+            data = doc.to_dict() or {}
+            yield doc.id, data.get(HASH_FIELD), data.get("userId")
+        if len(docs) < page_size: return
+        last = docs[-1]
+
+def diff(local, remote):
+    """
+    Merge-joins two ID-ordered streams of (lesson_id, content_hash, ...).
+    Yields (lesson_id, status, local_row, remote_row).
+    """
+    local, remote = iter(local), iter(remote)
+    l, r = next(local, None), next(remote, None)
+    previous = None
+    while l is not None or r is not None:
+        if r is None or (l is not None and l[0] < r[0]):
+            lesson_id, status, row = l[0], LOCAL_ONLY, (l, None)
+            l = next(local, None)
+        elif l is None or r[0] < l[0]:
+            lesson_id, status, row = r[0], REMOTE_ONLY, (None, r)
+            r = next(remote, None)
+        else:
+            lesson_id, status, row = l[0], IDENTICAL if l[1] == r[1] else DIFFERING, (l, r)
+            l, r = next(local, None), next(remote, None)
+        # A stream out of order would silently misclassify everything after it
+        if previous is not None and lesson_id <= previous:
+            raise ValueError(f"ID streams are not in the same order ({previous!r} before {lesson_id!r})")
+        previous = lesson_id
+        yield (lesson_id, status) + row
+
+# --- DEEP COMPARE ---
+
+def deep_compare(db, conn, related, pending):
+    """
+    For (lesson_id, source) pairs whose remote copy has no hash, yields
+    (lesson_id, source, identical): whether the remote document is what sync
+    would upload.
+    """
+    refs = [db.collection(LESSONS_COLLECTION).document(lesson_id) for lesson_id, _ in pending]
+    with metrics.timer("firestore_read"):
+        snapshots = {snapshot.id: snapshot for snapshot in db.get_all(refs)}
+    metrics.firestore_read(len(refs))
+    for lesson_id, source in pending:
+        local = prepare_lesson(catalog.load_lesson(conn, source, lesson_id), related.get(lesson_id))
+        snapshot = snapshots.get(lesson_id)
+        remote = (snapshot.to_dict() if snapshot is not None and snapshot.exists else None) or {}
+        remote.pop(HASH_FIELD, None)
+        yield lesson_id, source, remote == local
+
+# --- RECONCILE ---
+
+def reconcile(db, conn, related=None, deep=False, report=None, page_size=PAGE_SIZE):
+    """
+    Classifies every local and remote lesson ID. Returns (counts, actions,
+    remote_only_users): counts per status, the repair plan as
+    {source: {lesson_id: action}}, and remote-only lessons per userId.
+    `report` (a text file) gets one JSON line per lesson that isn't identical.
+    """
+    related = related or {}
+    counts = dict.fromkeys(STATUSES, 0)
+    actions = {}
+    remote_only_users = Counter()
+    pending = [] # (lesson_id, source) awaiting a deep compare
+
+    def record(lesson_id, status, source=None, user_id=None, action=None, reason=None):
+        counts[status] += 1
+        if action:
+            actions.setdefault(source, {})[lesson_id] = action
+        if report is not None and status != IDENTICAL:
+            entry = {'id': lesson_id, 'status': status, 'source': source, 'userId': user_id, 'reason': reason}
+            report.write(json_io.dumps({k: v for k, v in entry.items() if v is not None}) + "\n")
+
+    def flush():
+        for lesson_id, source, identical in deep_compare(db, conn, related, pending):
+            if identical: record(lesson_id, IDENTICAL, source, action="stamp")
+            else: record(lesson_id, DIFFERING, source, action="overwrite", reason="content")
+        pending.clear()
+
+    for lesson_id, status, local, remote in diff(iter_local(conn, related), iter_remote(db, page_size)):
+        if status == LOCAL_ONLY:
+            record(lesson_id, LOCAL_ONLY, local[2], action="upload")
+        elif status == REMOTE_ONLY:
+            record(lesson_id, REMOTE_ONLY, user_id=remote[2])
+            remote_only_users[remote[2]] += 1
+        elif status == IDENTICAL:
+            record(lesson_id, IDENTICAL)
+        elif remote[1] is None and deep:
+            pending.append((lesson_id, local[2]))
+            if len(pending) >= DEEP_BATCH: flush()
+        else:
+            record(lesson_id, DIFFERING, local[2], remote[2], action="overwrite",
+                   reason="content" if remote[1] is not None else "no contentHash")
+    if pending: flush()
+    return counts, actions, remote_only_users
+
+def write_plan(path, counts, actions):
+    """Repair plan for `sync_to_firebase.py --plan`."""
+    json_io.dump(path, {
+        'createdAt': datetime.datetime.now().isoformat(),
+        'collection': LESSONS_COLLECTION,
+        'counts': counts,
+        'actions': actions,
+    }, indent=2)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compares local lessons with Firestore and optionally writes a repair plan for sync.")
+    parser.add_argument("--report", metavar="PATH", help="Write every lesson that isn't identical as JSON lines")
+    parser.add_argument("--plan", metavar="PATH", help="Write a repair plan for sync_to_firebase.py --plan")
+    parser.add_argument("--deep", action="store_true",
+                        help="Fetch and compare remote lessons that have no contentHash instead of counting them as differing")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    args = parser.parse_args()
+    metrics.start_run("reconcile")
+
+    print(f"\n{'='*60}")
+    print("🔎 LOCAL vs FIRESTORE RECONCILIATION")
+    print(f"{'='*60}\n")
+
+    db = initialize_firebase()
+    conn = catalog.open_catalog()
+    start_time = time.time()
+
+    related = load_related()
+    report = open(args.report, 'w', encoding='utf-8') if args.report else None
+    try:
+        counts, actions, remote_only_users = reconcile(db, conn, related, args.deep, report, args.page_size)
+    finally:
+        if report is not None: report.close()
+        conn.close()
+
+    if args.plan:
+        write_plan(args.plan, counts, actions)
+
+    planned = Counter(action for lessons in actions.values() for action in lessons.values())
+    elapsed = time.time() - start_time
+    print(f"{'='*60}")
+    print(f"🎉 RECONCILED {sum(counts.values()):,} lesson IDs in {elapsed:.1f}s")
+    print(f"✅ Identical:   {counts[IDENTICAL]:,}")
+    print(f"⚠️  Differing:   {counts[DIFFERING]:,}")
+    print(f"📤 Local only:  {counts[LOCAL_ONLY]:,}")
+    print(f"☁️  Remote only: {counts[REMOTE_ONLY]:,}")
+    for user_id, count in remote_only_users.most_common(10):
+        print(f"      {user_id or '(no userId)'}: {count:,}")
+    if args.plan:
+        print(f"🛠️  Plan: {planned['upload']:,} upload, {planned['overwrite']:,} overwrite, {planned['stamp']:,} stamp "
+              f"-> python sync_to_firebase.py --plan {args.plan}")
+    print(f"{'='*60}")
+
+if __name__ == "__main__":
+    main()
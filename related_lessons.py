@@ -0,0 +1,182 @@
+import os
+import re
+import json
+import time
+import argparse
+import datetime
+from collections import Counter
+from lazy_imports import lazy_import
+import catalog
+import json_io
+
+# sync_to_firebase only calls load_related(), which needs neither numpy nor scipy
+np = lazy_import("numpy")
+
+# --- CONFIGURATION ---
+# "More like this" is computed offline: every lesson gets the IDs of the
+# TOP_K most similar lessons in the same language (cosine similarity of
+# TF-IDF vectors). sync_to_firebase.py writes them as the `related` field,
+# so the app never computes similarity on device.
+TOP_K = 10
+MIN_SIMILARITY = 0.05     # weaker matches are noise
+DUPLICATE_SIMILARITY = 0.95  # near-identical copies are not useful suggestions
+MIN_DF = 2                # terms seen in a single lesson can't link two lessons
+MAX_DF_RATIO = 0.5        # terms in over half the lessons act as stopwords
+MAX_DF_MIN_LESSONS = 20   # ...but only once a language has enough lessons to tell
+MAX_TOKENS = 5000         # long books are represented by their opening
+TITLE_WEIGHT = 3          # title tokens are counted this many times
+
+# Dense similarity rows per block = BLOCK_CELLS / lessons in the language
+BLOCK_CELLS = 4_000_000
+
+OUTPUT_FILE = ".cache/related_lessons.json"
+
+# What sync_to_firebase uploads (its TARGET_DIRECTORIES), so every related ID exists in Firestore
+TARGET_DIRECTORIES = [
+    "assets/guided_courses",
+    "assets/native_videos",
+    "assets/audio_library",
+    "assets/youtube_audio_library",
+    "assets/text_lessons",
+    "assets/beginner_books",
+]
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# --- LOADING ---
+
+def source_rank(source, directories=TARGET_DIRECTORIES):
+    for index, folder in enumerate(directories):
+        if source.startswith(folder.rstrip('/') + '/'): return index, source
+    return len(directories), source
+
+def load_language(conn, language, directories=TARGET_DIRECTORIES):
+    """{lesson_id: lesson} for one language from the catalog (the copy sync uploads wins: first directory, then path)."""
+    rows = sorted(catalog.iter_language(conn, language, directories), key=lambda row: source_rank(row[1], directories))
+    lessons = {}
+    for lesson_id, _, data in rows:
+        if lesson_id not in lessons:
+            lessons[lesson_id] = json_io.loads(data)
+    return lessons
+
+def lesson_tokens(lesson):
+    body = lesson.get('content') or " ".join(
+        t.get('text', '') for t in lesson.get('transcript') or [] if isinstance(t, dict))
+    title = TOKEN_PATTERN.findall((lesson.get('title') or '').casefold())
+    return title * TITLE_WEIGHT + TOKEN_PATTERN.findall(body.casefold())[:MAX_TOKENS]
+
+# --- TF-IDF ---
+
+def tfidf_matrix(token_lists):
+    """L2-normalised sublinear TF-IDF rows as a CSR matrix (one row per token list)."""
+    from scipy import sparse
+    vocab = {}
+    indptr, indices, data = [0], [], []
+    for tokens in token_lists:
+        counts = Counter(vocab.setdefault(tok, len(vocab)) for tok in tokens)
+        indices.extend(counts.keys())
+        data.extend(counts.values())
+        indptr.append(len(indices))
+
+    n = len(token_lists)
+    matrix = sparse.csr_matrix(
+        (np.array(data, dtype=np.float32), np.array(indices, dtype=np.int64), np.array(indptr, dtype=np.int64)),
+        shape=(n, len(vocab)))
+
+    df = np.bincount(matrix.indices, minlength=matrix.shape[1])
+    keep = df >= MIN_DF
+    if n >= MAX_DF_MIN_LESSONS:
+        keep &= df <= MAX_DF_RATIO * n
+    matrix = matrix[:, np.flatnonzero(keep)].tocsr()
+
+    matrix.data = 1.0 + np.log(matrix.data)
+    idf = (np.log((1.0 + n) / (1.0 + df[keep])) + 1.0).astype(np.float32)
+    matrix = matrix.multiply(idf).tocsr()
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms).dot(matrix).tocsr().astype(np.float32)
+
+def top_k_neighbours(matrix, k=TOP_K):
+    """
+    Yields (row, [(neighbour_row, similarity)]) best first. Similarities are
+    computed a block of rows at a time, so memory stays at BLOCK_CELLS floats.
+    """
+    n = matrix.shape[0]
+    if n < 2: return
+    k = min(k, n - 1)
+    block = max(1, BLOCK_CELLS // n)
+    transposed = matrix.T.tocsc()
+
+    for start in range(0, n, block):
+        end = min(start + block, n)
+        sims = (matrix[start:end] @ transposed).toarray()
+        rows = np.arange(end - start)
+        sims[rows, rows + start] = -1.0
+        sims[sims >= DUPLICATE_SIMILARITY] = -1.0
+
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        scores = np.take_along_axis(scores, order, axis=1)
+
+        for i in rows:
+            keep = scores[i] >= MIN_SIMILARITY
+            yield start + i, list(zip(top[i][keep].tolist(), scores[i][keep].tolist()))
+
+def related_for_language(lessons, k=TOP_K):
+    """{lesson_id: [related ids]} for one language's {lesson_id: lesson}."""
+    ids = list(lessons)
+    matrix = tfidf_matrix([lesson_tokens(lessons[i]) for i in ids])
+    if matrix.shape[1] == 0: return {}
+    return {ids[row]: [ids[j] for j, _ in neighbours]
+            for row, neighbours in top_k_neighbours(matrix, k) if neighbours}
+
+def load_related(path=OUTPUT_FILE):
+    """{lesson_id: [related ids]} written by this script, or {} if it hasn't run."""
+    if not os.path.exists(path): return {}
+    try:
+        return json_io.load(path).get('related', {})
+    except Exception:
+        return {}
+
+def main():
+    parser = argparse.ArgumentParser(description="Computes per-language 'related lessons' (TF-IDF nearest neighbours).")
+    parser.add_argument("--k", type=int, default=TOP_K, help="Related lessons per lesson")
+    parser.add_argument("--output", default=OUTPUT_FILE)
+    args = parser.parse_args()
+
+    print(f"\n{'='*60}")
+    print("🧭 RELATED LESSONS BUILD STARTED")
+    print(f"{'='*60}\n")
+
+    start_time = time.time()
+    conn = catalog.open_catalog()
+    languages = catalog.list_languages(conn, TARGET_DIRECTORIES)
+    related = {}
+    # One language in memory at a time
+    for language in languages:
+        lessons = load_language(conn, language)
+        lang_start = time.time()
+        found = related_for_language(lessons, args.k)
+        related.update(found)
+        print(f"   ✅ {language}: {len(found)}/{len(lessons)} lessons linked ({time.time() - lang_start:.2f}s)")
+    conn.close()
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    tmp_path = args.output + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'generatedAt': datetime.datetime.now().isoformat(), 'k': args.k, 'related': related},
+                  f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, args.output)
+
+    print(f"\n{'='*60}")
+    print(f"🎉 RELATED LESSONS COMPLETE in {time.time() - start_time:.1f}s")
+    print(f"🌍 Languages: {len(languages)}")
+    print(f"🔗 Lessons with suggestions: {len(related)}")
+    print(f"📝 Output: {args.output}")
+    print(f"{'='*60}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import os
+import re
+import glob
+import time
+import sqlite3
+import hashlib
+import argparse
+import json_io
+
+# --- CONFIGURATION ---
+DB_PATH = "search_index.db"
+
+ASSET_DIRECTORIES = [
+    "assets/guided_courses",
+    "assets/native_videos",
+    "assets/course_videos",
+    "assets/storybooks_lessons",
+    "assets/audio_library",
+    "assets/youtube_audio_library",
+    "assets/text_lessons",
+    "assets/beginner_books",
+]
+
+# bm25 column weights: title, content, transcript
+RANK_WEIGHTS = (10.0, 1.0, 1.0)
+
+# unicode61 with remove_diacritics 2 folds "café" / "cafe", "Mädchen" / "madchen"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lessons (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    path TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    title TEXT,
+    language TEXT,
+    genre TEXT,
+    type TEXT,
+    difficulty TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_lessons_path ON lessons(path);
+CREATE INDEX IF NOT EXISTS idx_lessons_facets ON lessons(language, genre);
+CREATE VIRTUAL TABLE IF NOT EXISTS lesson_fts USING fts5(
+    title, content, transcript,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# --- INDEXING ---
+
+def connect(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+def transcript_text(lesson):
+    return " ".join(t.get('text', '') for t in lesson.get('transcript') or [] if isinstance(t, dict))
+
+def lesson_hash(lesson, transcript):
+    digest = hashlib.sha1()
+    for value in (lesson.get('title'), lesson.get('content'), transcript,
+                  lesson.get('language'), lesson.get('genre'), lesson.get('type'), lesson.get('difficulty')):
+        digest.update(str(value or '').encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+def delete_rows(conn, rowids):
+    for rowid in rowids:
+        conn.execute("DELETE FROM lesson_fts WHERE rowid = ?", (rowid,))
+        conn.execute("DELETE FROM lessons WHERE rowid = ?", (rowid,))
+
+def index_file(conn, path):
+    """Upserts every lesson of one asset file. Returns (added_or_updated, removed)."""
+    lessons = json_io.load(path)
+
+    existing = {row[0]: (row[1], row[2]) for row in conn.execute(
+        "SELECT id, rowid, hash FROM lessons WHERE path = ?", (path,))}
+
+    changed = 0
+    seen = set()
+    for lesson in lessons:
+        lesson_id = lesson.get('id')
+        if not lesson_id or lesson_id in seen: continue
+        seen.add(lesson_id)
+
+        transcript = transcript_text(lesson)
+        digest = lesson_hash(lesson, transcript)
+        if existing.get(lesson_id, (None, None))[1] == digest: continue
+
+        # Same id may have been indexed from another file (e.g. yt_ ids); replace it
+        row = conn.execute("SELECT rowid FROM lessons WHERE id = ?", (lesson_id,)).fetchone()
+        if row: delete_rows(conn, [row[0]])
+
+        cur = conn.execute(
+            "INSERT INTO lessons (id, path, hash, title, language, genre, type, difficulty) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (lesson_id, path, digest, lesson.get('title'), lesson.get('language'),
+             lesson.get('genre'), lesson.get('type'), lesson.get('difficulty')))
+        conn.execute(
+            "INSERT INTO lesson_fts (rowid, title, content, transcript) VALUES (?, ?, ?, ?)",
+            (cur.lastrowid, lesson.get('title') or '', lesson.get('content') or '', transcript))
+        changed += 1
+
+    removed = [rowid for lesson_id, (rowid, _) in existing.items() if lesson_id not in seen]
+    delete_rows(conn, removed)
+    return changed, len(removed)
+
+def build_index(db_path=DB_PATH, directories=ASSET_DIRECTORIES, full=False):
+    """Incrementally indexes every top-level lesson file in `directories`."""
+    conn = connect(db_path)
+    if full:
+        with conn:
+            conn.execute("DELETE FROM lesson_fts")
+            conn.execute("DELETE FROM lessons")
+            conn.execute("DELETE FROM files")
+
+    known = {row[0]: (row[1], row[2]) for row in conn.execute("SELECT path, mtime_ns, size FROM files")}
+    current = {}
+    for folder in directories:
+        for path in sorted(glob.glob(os.path.join(folder, "*.json"))):
+            st = os.stat(path)
+            current[path] = (st.st_mtime_ns, st.st_size)
+
+    totals = {'files': 0, 'changed': 0, 'removed': 0}
+    for path, stat in current.items():
+        if known.get(path) == stat: continue
+        try:
+            # One transaction per file: a crash never leaves a half-indexed file
+            with conn:
+                changed, removed = index_file(conn, path)
+                conn.execute("INSERT OR REPLACE INTO files (path, mtime_ns, size) VALUES (?, ?, ?)", (path, *stat))
+        except Exception as e:
+            print(f"   ⚠️ Could not index {path}: {e}")
+            continue
+        totals['files'] += 1
+        totals['changed'] += changed
+        totals['removed'] += removed
+        if changed or removed:
+            print(f"   🔎 {path}: {changed} indexed, {removed} removed")
+
+    # Files that disappeared from assets/
+    for path in known.keys() - current.keys():
+        with conn:
+            rowids = [row[0] for row in conn.execute("SELECT rowid FROM lessons WHERE path = ?", (path,))]
+            delete_rows(conn, rowids)
+            conn.execute("DELETE FROM files WHERE path = ?", (path,))
+        totals['removed'] += len(rowids)
+
+    if totals['changed'] or totals['removed']:
+        conn.execute("INSERT INTO lesson_fts(lesson_fts) VALUES ('optimize')")
+        conn.commit()
+    conn.close()
+    return totals
+
+# --- QUERY API ---
+
+def to_match_query(text):
+    """Turns free text into a safe FTS5 query: every word required, last word as prefix."""
+    tokens = TOKEN_PATTERN.findall(text)
+    if not tokens: return None
+    quoted = [f'"{tok}"' for tok in tokens]
+    quoted[-1] += '*'
+    return " ".join(quoted)
+
+def search(query, language=None, genre=None, limit=20, db_path=DB_PATH, conn=None):
+    """
+    Returns ranked matches as dicts (id, title, language, genre, type,
+    difficulty, score, snippet). Lower bm25 score = better match.
+    """
+    match = to_match_query(query)
+    if not match: return []
+
+    own_conn = conn is None
+    conn = conn or sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(f"""
+            SELECT l.id, l.title, l.language, l.genre, l.type, l.difficulty,
+                   bm25(lesson_fts, {', '.join(map(str, RANK_WEIGHTS))}) AS score,
+                   snippet(lesson_fts, -1, '[', ']', '…', 12)
+            FROM lesson_fts
+            JOIN lessons l ON l.rowid = lesson_fts.rowid
+            WHERE lesson_fts MATCH :match
+              AND (:language IS NULL OR l.language = :language)
+              AND (:genre IS NULL OR l.genre = :genre)
+            ORDER BY score
+            LIMIT :limit
+        """, {'match': match, 'language': language, 'genre': genre, 'limit': limit}).fetchall()
+    finally:
+        if own_conn: conn.close()
+
+    keys = ('id', 'title', 'language', 'genre', 'type', 'difficulty', 'score', 'snippet')
+    return [dict(zip(keys, row)) for row in rows]
+
+def facet_counts(query, db_path=DB_PATH, conn=None):
+    """Returns {'language': {code: n}, 'genre': {name: n}} for a query."""
+    match = to_match_query(query)
+    if not match: return {'language': {}, 'genre': {}}
+
+    own_conn = conn is None
+    conn = conn or sqlite3.connect(db_path)
+    try:
+        facets = {}
+        for column in ('language', 'genre'):
+            facets[column] = dict(conn.execute(f"""
+                SELECT COALESCE(l.{column}, ''), COUNT(*)
+                FROM lesson_fts JOIN lessons l ON l.rowid = lesson_fts.rowid
+                WHERE lesson_fts MATCH ?
+                GROUP BY l.{column} ORDER BY COUNT(*) DESC
+            """, (match,)).fetchall())
+        return facets
+    finally:
+        if own_conn: conn.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline full-text search index (SQLite FTS5) over the lesson library.")
+    parser.add_argument("--db", default=DB_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Create or incrementally update the index from assets/")
+    build.add_argument("--full", action="store_true", help="Drop and rebuild everything")
+
+    query = sub.add_parser("query", help="Search the index")
+    query.add_argument("text")
+    query.add_argument("--lang")
+    query.add_argument("--genre")
+    query.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start_time = time.time()
+        print(f"🔎 Indexing lessons into {args.db}...")
+        totals = build_index(args.db, full=args.full)
+        print(f"✅ Done in {time.time() - start_time:.2f}s: {totals['files']} files scanned, "
+              f"{totals['changed']} lessons indexed, {totals['removed']} removed.")
+        return
+
+    start_time = time.time()
+    results = search(args.text, args.lang, args.genre, args.limit, args.db)
+    elapsed_ms = (time.time() - start_time) * 1000
+    for r in results:
+        print(f"{r['score']:8.2f}  {r['id']:<32} [{r['language']}/{r['genre'] or '-'}] {r['title']}")
+        print(f"          {r['snippet']}")
+    print(f"\n{len(results)} results in {elapsed_ms:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
-import json
 import os
 import sys
 import re
+import argparse
+import metrics
+import firebase_app
+import json_io
 from datetime import datetime
 
 # --- CONFIGURATION ---
@@ -18,10 +19,7 @@ def initialize_firebase():
         print(f"❌ Error: {SERVICE_ACCOUNT_FILE} not found.")
         sys.exit(1)
     try:
-        cred = credentials.Certificate(SERVICE_ACCOUNT_FILE)
-        if not firebase_admin._apps:
-            firebase_admin.initialize_app(cred)
-        return firestore.client()
+        return firebase_app.client(SERVICE_ACCOUNT_FILE)
     except Exception as e:
         print(f"❌ Auth Error: {e}")
         sys.exit(1)
@@ -42,8 +40,7 @@ def process_file(db, filepath, filename):
 
     # 2. Read JSON
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            questions = json.load(f)
+        questions = json_io.load(filepath)
     except Exception as e:
         print(f"   ❌ Error reading JSON: {e}")
         return False
@@ -59,7 +56,7 @@ def process_file(db, filepath, filename):
 
     # 4. Extract 'createdAt' from JSON (From the Generator Script)
     # We look at the first question to find the timestamp for the whole lesson.
-    created_at_val = firestore.SERVER_TIMESTAMP # Default to NOW if missing in JSON
+    created_at_val = firebase_app.server_timestamp() # Default to NOW if missing in JSON
     
     if len(questions) > 0 and isinstance(questions[0], dict):
         raw_date = questions[0].get('createdAt')
@@ -84,18 +81,24 @@ def process_file(db, filepath, filename):
         "questionCount": len(questions),
         "type": "progression_quiz", 
         "createdAt": created_at_val,         # <--- STABLE SORT KEY
-        "updatedAt": firestore.SERVER_TIMESTAMP
+        "updatedAt": firebase_app.server_timestamp()
     }
 
     # 6. Upload
     try:
-        db.collection('quiz_levels').document(doc_id).set(data, merge=True)
+        with metrics.timer("firestore_write"):
+            db.collection('quiz_levels').document(doc_id).set(data, merge=True)
+        metrics.firestore_write(collection="quiz_levels")
         return True
     except Exception as e:
+        metrics.firestore_failed_write(collection="quiz_levels")
         print(f"      ❌ Upload failed: {e}")
         return False
 
 def main():
+    parser = argparse.ArgumentParser(description=f"Uploads the quiz levels in {INPUT_DIR} to the quiz_levels collection.")
+    parser.parse_args()
+    metrics.start_run("sync_progression_quizzes")
     print(f"\n{'='*60}")
     print("🎓 PROGRESSION QUIZ SYNC STARTED")
     print(f"{'='*60}\n")
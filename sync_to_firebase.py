@@ -1,16 +1,33 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
 import json
 import os
 import sys
 import time
+import argparse
+import hashlib
+from collections import Counter
+import catalog
+import metrics
+import profiling
+import firebase_app
+import json_io
+import lesson_schema
+from lesson_summaries import set_lesson, set_summary
+from related_lessons import load_related
 
 # --- CONFIGURATION ---
 SERVICE_ACCOUNT_FILE = "serviceAccountKey.json"
 
-# Safety Limit: Firestore max is 1,048,576 bytes. 
-# We set it to ~950KB to account for metadata overhead.
-MAX_DOC_SIZE_BYTES = 950000 
+# Firestore max is 1,048,576 bytes. lesson_schema measures the document
+# exactly (name, field names and values, per Firestore's storage rules), so
+# no safety margin is needed.
+MAX_DOC_SIZE_BYTES = lesson_schema.MAX_DOCUMENT_SIZE
+
+# Writes per batch (each lesson = lesson doc + summary doc); Firestore's cap is 500
+BATCH_LIMIT = 400
+
+# Every uploaded lesson carries its sync_key, so reconcile.py can compare the
+# library against a listing of just this field
+HASH_FIELD = "contentHash"
 
 # UPDATED PATHS
 TARGET_DIRECTORIES = [
@@ -29,111 +46,275 @@ def initialize_firebase():
         sys.exit(1)
         
     try:
-        cred = credentials.Certificate(SERVICE_ACCOUNT_FILE)
-        if not firebase_admin._apps:
-            firebase_admin.initialize_app(cred)
-        return firestore.client()
+        return firebase_app.client(SERVICE_ACCOUNT_FILE)
     except Exception as e:
         print(f"\n❌ FIREBASE AUTH ERROR: {e}")
         sys.exit(1)
 
 def get_document_size(data):
-    """Approximates the byte size of the JSON document."""
-    # json.dumps creates the string representation, .encode gets actual bytes
-    return len(json.dumps(data).encode('utf-8'))
+    """Exact stored size of the lesson document in Firestore."""
+    return lesson_schema.document_size(data)
 
-def safe_commit(batch):
-    """Commits a batch with error handling so one bad batch doesn't crash the script."""
+def safe_commit(batch, writes):
+    """Commits a batch ({collection: writes} in `writes`) with error handling so one bad batch doesn't crash the script."""
     try:
-        batch.commit()
+        with metrics.timer("firestore_write"):
+            batch.commit()
+        metrics.firestore_commit(writes)
+        metrics.count("batch_commits_total", result="ok")
         return True
     except Exception as e:
+        metrics.firestore_commit(writes, committed=False)
+        metrics.count("batch_commits_total", result="failed")
         print(f"\n❌ BATCH COMMIT FAILED: {e}")
         print("   (Some items in this batch were not saved)")
         return False
 
-def process_file(db, filepath):
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            lessons = json.load(f)
-    except Exception as e:
-        print(f"   ⚠️ Could not read {filepath}: {e}")
-        return 0, 0, 0 # Uploaded, Skipped, TooBig
+def sync_key(lesson_hash, related_ids):
+    """What was last synced for a lesson: its content hash, plus its related list if any."""
+    if related_ids is None: return lesson_hash
+    return hashlib.sha1(f"{lesson_hash}|{json.dumps(related_ids)}".encode('utf-8')).hexdigest()
+
+def prepare_lesson(lesson, related_ids, content_hash=None):
+    """Turns a local lesson into the document that gets uploaded."""
+    # Fix data consistency
+    if 'videoUrl' not in lesson and 'audioUrl' in lesson:
+        lesson['videoUrl'] = lesson['audioUrl']
+    if related_ids is not None:
+        lesson['related'] = related_ids
+    if content_hash is not None:
+        lesson[HASH_FIELD] = content_hash
+    return lesson
+
+def process_file(db, conn, filepath, backfill_summaries=False, skip_ids=frozenset(), related=None, full=False, plan=None):
+    """
+    Syncs one asset file's lessons from the catalog. Only lessons that are
+    new or changed since their last successful sync are checked against
+    Firestore, unless `full` is set. Every lesson is validated (schema and
+    exact size) before the first Firestore call for the file.
+
+    `plan` ({lesson_id: action} for this file, from reconcile.py) syncs
+    exactly those lessons without existence reads: "upload" and "overwrite"
+    replace the remote document, "stamp" only writes its content hash.
+    """
+    related = related or {}
+    lessons = []
+    total = 0
+    for lesson_id, digest, synced_hash, data in catalog.iter_sync_state(conn, filepath):
+        total += 1
+        key = sync_key(digest, related.get(lesson_id))
+        if (lesson_id in plan) if plan is not None else (full or synced_hash != key):
+            lessons.append((json_io.loads(data), digest, key))
+    if not lessons: return 0, 0, 0, 0, 0 # Uploaded, Skipped, TooBig, NearDuplicate, Malformed
 
     uploaded_count = 0
     skipped_count = 0
     too_big_count = 0
+    near_dup_count = 0
+    malformed_count = 0
+    related_updates = 0
+    updated_count = 0
+    stamped = 0
 
     batch = db.batch()
     batch_counter = 0
-    BATCH_LIMIT = 400 
+    batch_writes = Counter() # {collection: writes} in the open batch
+    batch_synced = [] # (lesson_id, sync_key) recorded in the catalog once the batch commits
 
-    print(f"   📂 Processing: {os.path.basename(filepath)} ({len(lessons)} items)")
+    print(f"   📂 Processing: {os.path.basename(filepath)} ({len(lessons)} of {total} items new or changed)")
 
-    for lesson in lessons:
+    # --- 1. SCHEMA + SIZE CHECK (before any network call) ---
+    checked = []
+    for lesson, digest, key in lessons:
         lesson_id = str(lesson.get('id'))
-        
-        # --- 1. SIZE CHECK (Prevents the crash) ---
-        doc_size = get_document_size(lesson)
+
+        if lesson_id in skip_ids:
+            near_dup_count += 1
+            metrics.reject("near_duplicate")
+            continue
+
+        errors, doc_size = lesson_schema.check(prepare_lesson(lesson, related.get(lesson_id), key))
+        if errors:
+            print(f"      ⚠️ SKIPPING MALFORMED DOC: {lesson_id} ({'; '.join(errors)})")
+            malformed_count += 1
+            metrics.reject("malformed")
+            continue
         if doc_size > MAX_DOC_SIZE_BYTES:
             size_mb = doc_size / (1024 * 1024)
             print(f"      ⚠️ SKIPPING HUGE DOC: {lesson_id} ({size_mb:.2f} MB)")
             too_big_count += 1
+            metrics.reject("too_big")
             continue
+        checked.append((lesson, digest, key, doc_size))
 
-        # --- 2. Check Existence ---
+    for lesson, digest, key, doc_size in checked:
+        lesson_id = str(lesson['id'])
+        action = plan.get(lesson_id) if plan is not None else None
         doc_ref = db.collection('lessons').document(lesson_id)
-        doc = doc_ref.get()
 
-        if doc.exists:
+        # --- 2. Check Existence (a reconcile plan has already compared with Firestore) ---
+        doc = None
+        if plan is None:
+            with metrics.timer("firestore_read"):
+                doc = doc_ref.get()
+            metrics.firestore_read()
+
+        related_ids = related.get(lesson_id)
+
+        if action == "stamp":
+            # Same content, uploaded before lessons carried a hash
+            batch.update(doc_ref, {HASH_FIELD: key})
+            batch_writes['lessons'] += 1
+            batch_counter += 1
+            stamped += 1
+            batch_synced.append((lesson_id, key))
+        elif doc is not None and doc.exists and (remote := doc.to_dict()).get(HASH_FIELD) in (
+                key, sync_key(digest, remote.get('related'))):
+            # Already uploaded with this content; at most "more like this" changed
             skipped_count += 1
+            metrics.reject("exists")
+            # Summary mirrors what is stored remotely, not the local copy
+            if backfill_summaries:
+                remote['id'] = lesson_id
+                batch_writes.update(set_summary(db, remote, batch))
+                batch_counter += 1
+            # "More like this" changes as the library grows; refresh just that field (and the hash)
+            if remote.get(HASH_FIELD) != key:
+                update = {HASH_FIELD: key}
+                if related_ids is not None: update['related'] = related_ids
+                batch.update(doc_ref, update)
+                batch_writes['lessons'] += 1
+                batch_counter += 1
+                related_updates += 1
+            batch_synced.append((lesson_id, key))
         else:
-            # Fix data consistency
-            if 'videoUrl' not in lesson and 'audioUrl' in lesson:
-                lesson['videoUrl'] = lesson['audioUrl']
-            
-            # Add to batch
-            batch.set(doc_ref, lesson, merge=True)
-            batch_counter += 1
+            # New, or changed since it was uploaded (a hash from another version, or none
+            # from before sync stamped one): write the local copy. Lesson + lesson_summaries
+            # mirror; a planned overwrite replaces the document.
+            batch_writes.update(set_lesson(db, lesson, batch, merge=action is None))
+            metrics.add_bytes("firestore_write", doc_size)
+            batch_counter += 2
             uploaded_count += 1
+            if doc is not None and doc.exists: updated_count += 1
+            batch_synced.append((lesson_id, key))
 
         # --- 3. Commit Batch ---
         if batch_counter >= BATCH_LIMIT:
-            if safe_commit(batch):
-                print(f"      💾 Committed batch of {BATCH_LIMIT}...")
+            if safe_commit(batch, batch_writes):
+                print(f"      💾 Committed batch of {batch_counter} writes...")
+                catalog.mark_synced(conn, batch_synced)
             
             batch = db.batch() # Reset batch
             batch_counter = 0
+            batch_writes = Counter()
+            batch_synced = []
 
-    # Final commit
-    if batch_counter > 0:
-        safe_commit(batch)
+    # Final commit (existing docs with nothing to write still count as synced)
+    if batch_counter == 0 or safe_commit(batch, batch_writes):
+        catalog.mark_synced(conn, batch_synced)
 
-    return uploaded_count, skipped_count, too_big_count
+    if updated_count:
+        print(f"      ♻️  Updated {updated_count} existing docs whose content changed")
+    if related_updates:
+        print(f"      🧭 Refreshed related lessons on {related_updates} existing docs")
+    if stamped:
+        print(f"      🏷️  Stamped content hashes on {stamped} existing docs")
+
+    return uploaded_count, skipped_count, too_big_count, near_dup_count, malformed_count
+
+def check_library(conn, related=None):
+    """
+    Validates every lesson in TARGET_DIRECTORIES as it would be uploaded,
+    without touching Firestore. Returns (checked, malformed, too_big).
+    """
+    related = related or {}
+    checked = malformed = too_big = 0
+    for folder in TARGET_DIRECTORIES:
+        for filepath in catalog.list_sources(conn, folder):
+            for lesson_id, digest, _, data in catalog.iter_sync_state(conn, filepath):
+                checked += 1
+                content_hash = sync_key(digest, related.get(lesson_id))
+                errors, doc_size = lesson_schema.check(prepare_lesson(json_io.loads(data), related.get(lesson_id), content_hash))
+                if errors:
+                    malformed += 1
+                    print(f"   ⚠️ {filepath}: {lesson_id}: {'; '.join(errors)}")
+                elif doc_size > MAX_DOC_SIZE_BYTES:
+                    too_big += 1
+                    print(f"   ⚠️ {filepath}: {lesson_id}: {doc_size / (1024 * 1024):.2f} MB")
+    return checked, malformed, too_big
 
 def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backfill-summaries", action="store_true",
+                        help="Also write lesson_summaries for lessons that already exist in Firestore")
+    parser.add_argument("--skip-near-duplicates", action="store_true",
+                        help="Don't upload lessons that near-duplicate another local lesson (see dedup_lessons.py)")
+    parser.add_argument("--full", action="store_true",
+                        help="Check every lesson against Firestore, not just ones changed since the last sync")
+    parser.add_argument("--check", action="store_true",
+                        help="Only validate the library (schema and document size); no Firestore access")
+    parser.add_argument("--plan", metavar="PATH",
+                        help="Sync exactly the lessons in a repair plan written by reconcile.py --plan")
+    profiling.add_argument(parser)
+    args = parser.parse_args()
+    metrics.start_run("sync_to_firebase")
+    profiling.start(args.profile)
+
+    if args.check:
+        conn = catalog.open_catalog()
+        start_time = time.time()
+        checked, malformed, too_big = check_library(conn, load_related())
+        conn.close()
+        print(f"\n✅ Checked {checked} lessons in {time.time() - start_time:.2f}s: "
+              f"{malformed} malformed, {too_big} too large.")
+        sys.exit(1 if malformed or too_big else 0)
+
     print(f"\n{'='*60}")
     print("🔥 FIREBASE SYNC STARTED (Safe Mode)")
     print(f"{'='*60}\n")
     
     db = initialize_firebase()
+    conn = catalog.open_catalog()
+    # Backfilling summaries needs to visit lessons that are already synced
+    full = args.full or args.backfill_summaries
     
     total_uploaded = 0
     total_skipped = 0
     total_too_big = 0
+    total_near_dup = 0
+    total_malformed = 0
     start_time = time.time()
 
+    skip_ids = frozenset()
+    if args.skip_near_duplicates:
+        from dedup_lessons import detect_library_duplicates, suppressed_ids # numpy, only needed here
+        entries, clusters = detect_library_duplicates(TARGET_DIRECTORIES)
+        skip_ids = frozenset(suppressed_ids(entries, clusters))
+        print(f"🧬 Near-duplicate check: {len(skip_ids)} lessons will be skipped.\n")
+
+    # Written by related_lessons.py; without it lessons are synced without `related`
+    related = load_related()
+    if related:
+        print(f"🧭 Related lessons loaded for {len(related)} lessons.\n")
+
+    # {source: {lesson_id: action}}
+    plans = json_io.load(args.plan)['actions'] if args.plan else None
+    if plans is not None:
+        print(f"🛠️  Repair plan: {sum(len(p) for p in plans.values())} lessons in {len(plans)} files.\n")
+
     for folder in TARGET_DIRECTORIES:
-        if not os.path.exists(folder):
-            continue
+        for filepath in catalog.list_sources(conn, folder):
+            if plans is not None and filepath not in plans: continue
+            plan = plans[filepath] if plans is not None else None
+            up, skip, big, near_dup, malformed = process_file(db, conn, filepath, args.backfill_summaries, skip_ids,
+                                                              related, full, plan)
+            total_uploaded += up
+            total_skipped += skip
+            total_too_big += big
+            total_near_dup += near_dup
+            total_malformed += malformed
 
-        for filename in os.listdir(folder):
-            if filename.endswith(".json"):
-                filepath = os.path.join(folder, filename)
-                up, skip, big = process_file(db, filepath)
-                total_uploaded += up
-                total_skipped += skip
-                total_too_big += big
+    conn.close()
 
     elapsed = time.time() - start_time
     minutes = int(elapsed // 60)
@@ -144,6 +325,9 @@ def main():
     print(f"✅ Uploaded New: {total_uploaded}")
     print(f"⏭️  Skipped (Duplicate): {total_skipped}")
     print(f"⚠️  Skipped (Too Large): {total_too_big}")
+    print(f"⚠️  Skipped (Malformed): {total_malformed}")
+    if args.skip_near_duplicates:
+        print(f"🧬 Skipped (Near Duplicate): {total_near_dup}")
     print(f"{'='*60}")
 
 if __name__ == "__main__":